@@ -1,290 +1,208 @@
-import json
-from datetime import datetime, timedelta
-import pytz
-from fastapi import APIRouter, HTTPException
-from openai import OpenAI
-import os
-
-# ==== Importar tus lógicas PURAS ====
+from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi.responses import StreamingResponse
+
+# ==== Registro único de herramientas ====
 from app.mcp.agent import (
-    _crear_cliente_logic,
-    _buscar_cliente_logic,
-    _listar_clientes_logic,
-    _crear_contacto_logic,
-    _crear_cita_logic,
+    _crear_citas_lote_logic_async,
+    _crear_contactos_lote_logic_async,
+    herramientas,
 )
 
 # ==== Schemas ====
-from app.schemas.chat import MensajeRequest, MensajeResponse
+from app.schemas.appointment import AppointmentCreate
+from app.schemas.chat import (
+    CONVERSACION_ID_MAX,
+    CONVERSACION_ID_PATRON,
+    MensajeRequest,
+    MensajeResponse,
+)
+from app.schemas.client_contact import ClientContactCreate
+from app.chat.store import get_store
+from app.chat.llm import get_llm_client
+from app.chat.loop import ResultadoTurno, ejecutar_turno, ejecutar_turno_eventos
+from app.db import config
+from app.core.serializacion import a_json
+from app.db.unit_of_work import unidad_de_trabajo
+from app.observability import medir_turno, span
+from app.observability.metricas import ERRORES_TURNO
+from app.services.citas_service import AsyncAppointmentService
+from app.services.client_service import AsyncClienteService
 
 router = APIRouter()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-# ==========================
-# MEMORIA DE CONVERSACIONES
-# ==========================
-conversaciones = {}
 
 # ==========================
-# TOOLS PARA GPT
+# PREPARAR HISTORIAL
 # ==========================
-TOOLS = [
-    {
-        "type": "function",
-        "function": {
-            "name": "crear_cliente",
-            "description": "Registra un nuevo cliente",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "fullName": {"type": "string"},
-                    "fullSurname": {"type": "string"},
-                    "identified": {"type": "string"},
-                },
-                "required": ["fullName", "fullSurname", "identified"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "buscar_cliente",
-            "description": "Busca un cliente por identificación",
-            "parameters": {
-                "type": "object",
-                "properties": {"identified": {"type": "string"}},
-                "required": ["identified"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "listar_clientes",
-            "description": "Lista todos los clientes registrados",
-            "parameters": {"type": "object", "properties": {}},
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "crear_contacto",
-            "description": "Crea un contacto para un cliente",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "clientId": {"type": "integer"},
-                    "phoneNumber": {"type": "string"},
-                    "email": {"type": "string"},
-                    "address": {"type": "string"},
-                },
-                "required": ["clientId", "phoneNumber", "email"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "crear_cita",
-            "description": "Crea una cita para un cliente",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "clientId": {"type": "integer"},
-                    "appointmentDate": {"type": "string"},
-                    "ubicacion": {"type": "string"},
-                    "details": {"type": "string"},
-                    "state": {"type": "string"},
-                    "employedId": {"type": "integer"},
-                },
-                "required": ["clientId", "appointmentDate", "ubicacion"],
-            },
-        },
-    },
-]
+async def _preparar_historial(store, request: MensajeRequest):
+    """Recupera (o inicia) la conversación y agrega el mensaje del usuario."""
+    # Crear o recuperar el ID de conversación
+    conv_id = request.conversacion_id or store.new_id()
+    historial = await store.get(conv_id)
+
+    if historial is None:
+        historial = []
+    elif historial and historial[0]["role"] == "system":
+        # Conversaciones guardadas antes de separar el prompt del historial
+        historial = historial[1:]
+
+    # Añadir mensaje del usuario
+    historial.append({"role": "user", "content": request.mensaje})
+    return conv_id, historial
+
+
+def _sse(evento: str, datos: dict) -> str:
+    return f"event: {evento}\ndata: {a_json(datos)}\n\n"
 
 
 # ==========================
-# EJECUTAR HERRAMIENTAS
+# ENDPOINT PRINCIPAL /chat
 # ==========================
-def ejecutar_herramienta(nombre, args):
+@router.post("/chat", response_model=MensajeResponse)
+async def chat(request: MensajeRequest, client=Depends(get_llm_client)):
     try:
-        if nombre == "crear_cliente":
-            return _crear_cliente_logic(**args)
+        store = get_store()
+        conv_id, historial = await _preparar_historial(store, request)
+
+        with medir_turno("chat"), span("chat", conversacion=conv_id) as traza:
+            # Todas las herramientas del turno comparten sesión y un único commit
+            async with unidad_de_trabajo():
+                resultado = await ejecutar_turno(
+                    client,
+                    historial,
+                    herramientas.openai_tools(),
+                    herramientas.ejecutar,
+                )
 
-        if nombre == "buscar_cliente":
-            return _buscar_cliente_logic(**args)
+            await store.save(conv_id, historial)
+            if traza is not None:
+                traza.anotar(pasos=resultado.pasos, cita_creada=resultado.cita_creada)
 
-        if nombre == "listar_clientes":
-            return _listar_clientes_logic()
+        return MensajeResponse(
+            respuesta=resultado.respuesta,
+            conversacion_id=conv_id,
+            herramientas_usadas=resultado.herramientas_usadas,
+            cita_creada=resultado.cita_creada,
+            datos_cita=resultado.datos_cita,
+        )
 
-        if nombre == "crear_contacto":
-            return _crear_contacto_logic(**args)
+    except Exception as e:
+        ERRORES_TURNO.inc(ruta="chat")
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
-        if nombre == "crear_cita":
-            return _crear_cita_logic(**args)
 
-        return {"status": "error", "message": f"Herramienta '{nombre}' no encontrada"}
+# ==========================
+# ENDPOINT EN STREAMING /chat/stream (SSE)
+# ==========================
+@router.post("/chat/stream")
+async def chat_stream(request: MensajeRequest, client=Depends(get_llm_client)):
+    """Igual que /chat, pero envía eventos SSE a medida que avanza el turno:
+    `delta` (texto), `herramienta_inicio`, `herramienta_fin` y `final`
+    (MensajeResponse sin herramientas_usadas) o `error`.
+    """
+    store = get_store()
+    conv_id, historial = await _preparar_historial(store, request)
+
+    async def eventos():
+        with (
+            medir_turno("chat_stream"),
+            span("chat", conversacion=conv_id, streaming=True),
+        ):
+            async for evento in _eventos_turno():
+                yield evento
+
+    async def _eventos_turno():
+        try:
+            resultado: ResultadoTurno | None = None
+            async with unidad_de_trabajo():
+                async for evento in ejecutar_turno_eventos(
+                    client,
+                    historial,
+                    herramientas.openai_tools(),
+                    herramientas.ejecutar,
+                ):
+                    tipo = evento.pop("tipo")
+                    if tipo == "fin":
+                        resultado = evento["resultado"]
+                    else:
+                        yield _sse(tipo, evento)
+                if resultado is None:  # se revierte lo no confirmado
+                    raise RuntimeError("El turno terminó sin evento 'fin'")
+
+            # El commit del turno ya se hizo: recién ahora se confirma al cliente
+            await store.save(conv_id, historial)
+            final = MensajeResponse(
+                respuesta=resultado.respuesta,
+                conversacion_id=conv_id,
+                cita_creada=resultado.cita_creada,
+                datos_cita=resultado.datos_cita,
+            )
+            yield _sse("final", final.model_dump(exclude={"herramientas_usadas"}))
 
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+        except Exception as e:
+            ERRORES_TURNO.inc(ruta="chat_stream")
+            yield _sse("error", {"detail": f"Error: {str(e)}"})
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ==========================
-# ENDPOINT PRINCIPAL /chat
+# GESTIÓN DE CONVERSACIONES
 # ==========================
-@router.post("/chat", response_model=MensajeResponse)
-async def chat(request: MensajeRequest):
-    try:
-        # Crear o recuperar el ID de conversación
-        conv_id = request.conversacion_id or f"conv_{len(conversaciones)}"
-
-        if conv_id not in conversaciones:
-            conversaciones[conv_id] = []
-            tz_colombia = pytz.timezone("America/Bogota")
-            hoy = datetime.now(tz_colombia)
-            mañana = hoy + timedelta(days=1)
-
-            conversaciones[conv_id] = [
-                {
-                    "role": "system",
-                    "content": f"""Eres un asistente de taller mecánico profesional en Colombia.
-
-🗓️ FECHA Y HORA ACTUAL (Colombia):
-- HOY es: {hoy.strftime("%A %d de %B de %Y")}
-- Hora actual: {hoy.strftime("%I:%M %p")} (formato 12 horas)
-- Hora actual: {hoy.strftime("%H:%M")} (formato 24 horas)
-- Año actual: {hoy.year}
-
-⚠️ REGLAS CRÍTICAS PARA FECHAS Y HORAS:
-
-FORMATO DE FECHA Y HORA:
-- SIEMPRE usa formato 24 horas: YYYY-MM-DD HH:MM:SS
-- SIEMPRE usa el año {hoy.year}
-
-CONVERSIÓN DE HORAS (MUY IMPORTANTE):
-- 12:00 AM = 00:00:00 (medianoche)
-- 1:00 AM = 01:00:00
-- 8:00 AM = 08:00:00
-- 9:00 AM = 09:00:00
-- 10:00 AM = 10:00:00
-- 11:00 AM = 11:00:00
-- 12:00 PM = 12:00:00 (mediodía)
-- 1:00 PM = 13:00:00
-- 2:00 PM = 14:00:00
-- 3:00 PM = 15:00:00 ← SI EL USUARIO DICE "3 PM" USA 15:00:00
-- 4:00 PM = 16:00:00
-- 5:00 PM = 17:00:00
-- 6:00 PM = 18:00:00
-- 7:00 PM = 19:00:00
-- 8:00 PM = 20:00:00
-- 9:00 PM = 21:00:00
-- 10:00 PM = 22:00:00
-- 11:00 PM = 23:00:00
-
-EJEMPLOS CORRECTOS:
-- Usuario dice "3 de la tarde" o "3 PM" → Usa {hoy.strftime("%Y-%m-%d")} 15:00:00
-- Usuario dice "10 de la mañana" o "10 AM" → Usa {hoy.strftime("%Y-%m-%d")} 10:00:00
-- Usuario dice "mediodía" → Usa {hoy.strftime("%Y-%m-%d")} 12:00:00
-
-EJEMPLOS INCORRECTOS (NO HACER):
-- ❌ Usuario dice "3 PM" → NO uses 03:00:00
-- ❌ Usuario dice "3 PM" → NO uses 09:00:00
-- ✅ Usuario dice "3 PM" → SÍ usa 15:00:00
-
-HORARIO DE ATENCIÓN DEL TALLER:
-- Lunes a Viernes: 8:00 AM - 6:00 PM (08:00 - 18:00)
-- Sábados: 8:00 AM - 2:00 PM (08:00 - 14:00)
-- Domingos: Cerrado
-
-FLUJO:
-1. Saluda
-2. Pide identificación
-3. Si no existe: registra (nombre, apellidos, ID, teléfono, email, dirección)
-4. Pregunta: marca, modelo, año del vehículo
-5. Pregunta: qué servicio necesita
-6. Pregunta: fecha y hora (recuerda que HOY es {hoy.strftime("%d/%m/%Y a las %I:%M %p")})
-7. CONFIRMA la hora con el usuario antes de crear la cita
-8. Crea la cita con vehículo en details
-
-Sé profesional y conversacional.""",
-                }
-            ]
-
-        historial = conversaciones[conv_id]
-
-        # Añadir mensaje del usuario
-        historial.append({"role": "user", "content": request.mensaje})
-
-        # ================
-        # PRIMERA LLAMADA
-        # ================
-        response = client.chat.completions.create(
-            model="gpt-4.1", messages=historial, tools=TOOLS
-        )
+@router.post("/reset/{conversacion_id}")
+async def reset(
+    conversacion_id: str = Path(
+        max_length=CONVERSACION_ID_MAX, pattern=CONVERSACION_ID_PATRON
+    ),
+):
+    if not await get_store().delete(conversacion_id):
+        raise HTTPException(status_code=404, detail="Conversación no encontrada")
+    return {"status": "success", "message": "Conversación reiniciada"}
 
-        assistant_msg = response.choices[0].message
-        respuesta_texto = assistant_msg.content or ""
-        tool_calls = assistant_msg.tool_calls
-
-        herramientas_usadas = []
-        cita_creada = False
-        datos_cita = None
-
-        # ==========================
-        # SI EL MODELO QUIERE USAR TOOLS
-        # ==========================
-        if tool_calls:
-            historial.append(
-                {
-                    "role": "assistant",
-                    "content": respuesta_texto,
-                    "tool_calls": [tc.model_dump() for tc in tool_calls],
-                }
-            )
 
-            for call in tool_calls:
-                nombre = call.function.name
-                args = json.loads(call.function.arguments)
+@router.get("/conversaciones")
+async def listar_conversaciones():
+    store = get_store()
+    return {"total": await store.count(), "conversaciones": await store.list_ids()}
 
-                resultado = ejecutar_herramienta(nombre, args)
 
-                herramientas_usadas.append(
-                    {"herramienta": nombre, "parametros": args, "resultado": resultado}
-                )
+# ==========================
+# ALTAS EN LOTE
+# ==========================
+# Las mismas funciones que las herramientas crear_citas_lote / crear_contactos_lote
+@router.post("/citas/lote")
+async def crear_citas_lote(citas: list[AppointmentCreate]):
+    return await _crear_citas_lote_logic_async(citas)
 
-                if nombre == "crear_cita" and resultado.get("status") == "success":
-                    cita_creada = True
-                    datos_cita = resultado.get("data")
 
-                historial.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": call.id,
-                        "content": json.dumps(resultado, ensure_ascii=False),
-                    }
-                )
+@router.post("/contactos/lote")
+async def crear_contactos_lote(contactos: list[ClientContactCreate]):
+    return await _crear_contactos_lote_logic_async(contactos)
 
-            # =================
-            # SEGUNDA LLAMADA (respuesta final)
-            # =================
-            final = client.chat.completions.create(model="gpt-4.1", messages=historial)
 
-            respuesta_texto = final.choices[0].message.content
-            historial.append({"role": "assistant", "content": respuesta_texto})
+# ==========================
+# EXPORTACIONES (NDJSON en streaming)
+# ==========================
+def _exportar(exportador) -> StreamingResponse:
+    """Una línea JSON por fila, leídas con un cursor del lado del servidor."""
 
-        else:
-            historial.append({"role": "assistant", "content": respuesta_texto})
+    async def lineas():
+        async with config.AsyncSessionLocal() as db:
+            async for fila in exportador(db):
+                yield a_json(fila) + "\n"
 
-        conversaciones[conv_id] = historial
+    return StreamingResponse(lineas(), media_type="application/x-ndjson")
 
-        return MensajeResponse(
-            respuesta=respuesta_texto,
-            conversacion_id=conv_id,
-            herramientas_usadas=herramientas_usadas,
-            cita_creada=cita_creada,
-            datos_cita=datos_cita,
-        )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+@router.get("/clientes/exportar")
+async def exportar_clientes():
+    return _exportar(AsyncClienteService.exportar_clientes)
+
+
+@router.get("/citas/exportar")
+async def exportar_citas():
+    return _exportar(AsyncAppointmentService.exportar_citas)
@@ -0,0 +1,248 @@
+"""
+Benchmark de carga: /api/chat y las herramientas MCP con concurrencia.
+
+- El modelo es `llm_falso.ServidorLLM`: responde con tool calls guionizadas
+  y una latencia fija, así que la carga es reproducible y no cuesta tokens.
+- La base es efímera: se crea una base Postgres nueva junto a la de
+  DATABASE_URL, se migra y se siembra con clientes sintéticos, y se elimina
+  al terminar. (SQLite no sirve: la reserva de citas usa advisory locks.)
+- /api/chat se llama dentro del proceso con httpx.ASGITransport (sin red) y
+  las herramientas MCP con un fastmcp.Client en memoria.
+
+Cada petición usa uno de los escenarios (rotando en orden). Reporta
+peticiones/s y latencias p50/p95/p99 por escenario y en total, más el
+desglose medio de un turno de chat (LLM, herramientas, base de datos).
+
+    python -m app.bench.bench_carga [--peticiones 200] [--concurrencia 20]
+        [--latencia-llm 0.3] [--modo chat|mcp|ambos] [--clientes 500]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, make_url, text
+from app.bench.llm_falso import Guion, ServidorLLM, llamadas_del_mensaje
+
+INICIO_CITAS = datetime(2032, 3, 1, 8, 0)  # lunes
+
+
+def _escenarios(clientes: list[int], slots: list[datetime]) -> dict:
+    """Mensaje de usuario de la petición `i` de cada escenario.
+
+    Las líneas `herramienta {json}` son las tool calls que devolverá el
+    LLM falso; en modo MCP se invocan directamente.
+    """
+
+    def llamada(nombre, **args):
+        return f"{nombre} {json.dumps(args)}"
+
+    return {
+        "saludo": lambda i: "Hola, buenas tardes",
+        "buscar_cliente": lambda i: llamada(
+            "buscar_cliente", identified=f"carga-{i % len(clientes)}"
+        ),
+        "consultar_disponibilidad": lambda i: llamada(
+            "consultar_disponibilidad",
+            desde=(INICIO_CITAS + timedelta(days=i % 28)).strftime("%Y-%m-%d"),
+        ),
+        "crear_cita": lambda i: llamada(
+            "crear_cita",
+            clientId=clientes[i % len(clientes)],
+            appointmentDate=slots[i % len(slots)].strftime("%Y-%m-%d %H:%M:%S"),
+            ubicacion="Taller Central",
+        ),
+    }
+
+
+@contextmanager
+def base_efimera(url: str):
+    """Crea una base vacía en el mismo servidor y la elimina al salir."""
+    servidor = make_url(url)
+    nombre = f"bench_carga_{os.getpid()}"
+    admin = create_engine(servidor, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{nombre}"'))
+    try:
+        yield servidor.set(database=nombre).render_as_string(hide_password=False)
+    finally:
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{nombre}" WITH (FORCE)'))
+        admin.dispose()
+
+
+def _sembrar(clientes: int) -> tuple[list[int], list[datetime]]:
+    from app.db.config import engine
+    from app.db.migrations import aplicar
+    from app.services.disponibilidad import get_motor
+
+    aplicar()
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                'INSERT INTO "Client" ("fullName", "fullSurname", identified, "clientState") '
+                "SELECT 'Nombre ' || g, 'Apellido ' || g, 'carga-' || g, true "
+                "FROM generate_series(0, :n - 1) g ORDER BY g"
+            ),
+            {"n": clientes},
+        )
+        ids = list(conn.scalars(text('SELECT id FROM "Client" ORDER BY id')))
+
+    horario = get_motor().horario
+    slots, dia = [], INICIO_CITAS.date()
+    while len(slots) < 2000:
+        slots += horario.slots_del_dia(dia)
+        dia += timedelta(days=1)
+    return ids, slots
+
+
+def _percentiles(latencias: list[float]) -> dict:
+    if len(latencias) < 2:
+        latencias = latencias * 2
+    cortes = statistics.quantiles(latencias, n=100, method="inclusive")
+    return {"p50": cortes[49], "p95": cortes[94], "p99": cortes[98]}
+
+
+async def _carga(llamar, trabajos: list[tuple[str, str]], concurrencia: int):
+    """Ejecuta `trabajos` con `concurrencia` trabajadores que toman de una cola."""
+    pendientes = iter(trabajos)
+    medidas = []
+
+    async def trabajador():
+        for escenario, mensaje in pendientes:
+            inicio = time.perf_counter()
+            ok = await llamar(mensaje)
+            medidas.append((escenario, time.perf_counter() - inicio, ok))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return medidas, time.perf_counter() - inicio
+
+
+async def _llamar_chat(http, mensaje: str) -> bool:
+    respuesta = await http.post("/api/chat", json={"mensaje": mensaje})
+    if respuesta.status_code != 200:
+        return False
+    usadas = respuesta.json()["herramientas_usadas"]
+    return all(u["resultado"].get("status") != "error" for u in usadas)
+
+
+async def _llamar_mcp(mcp, mensaje: str) -> bool:
+    ok = True
+    for nombre, args in llamadas_del_mensaje(mensaje):
+        resultado = await mcp.call_tool(nombre, args, raise_on_error=False)
+        datos = resultado.structured_content or {}
+        ok = ok and not resultado.is_error and datos.get("status") != "error"
+    return ok
+
+
+async def _medir(modo: str, trabajos, concurrencia: int) -> dict:
+    import httpx
+    from fastmcp import Client
+    from app.db.config import async_engine
+    from app.main_api import app
+    from app.mcp.agent import get_agent
+
+    resultados = {}
+    try:
+        if modo in ("chat", "ambos"):
+            transporte = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transporte, base_url="http://bench", timeout=120
+            ) as http:
+                await _llamar_chat(http, trabajos[0][1])  # calentamiento
+                resultados["chat"] = await _carga(
+                    lambda m: _llamar_chat(http, m), trabajos, concurrencia
+                )
+        if modo in ("mcp", "ambos"):
+            # Sin LLM de por medio: el saludo no invoca herramientas
+            con_herramientas = [t for t in trabajos if llamadas_del_mensaje(t[1])]
+            async with Client(get_agent()) as mcp:
+                await _llamar_mcp(mcp, con_herramientas[0][1])
+                resultados["mcp"] = await _carga(
+                    lambda m: _llamar_mcp(mcp, m), con_herramientas, concurrencia
+                )
+    finally:
+        await async_engine.dispose()
+    return resultados
+
+
+def _reportar(nombre: str, medidas: list, duracion: float):
+    print(f"\n{nombre}: {len(medidas)} peticiones en {duracion:.2f} s")
+    grupos = {}
+    for escenario, segundos, ok in medidas:
+        grupos.setdefault(escenario, []).append((segundos, ok))
+    grupos["TOTAL"] = [(s, ok) for _, s, ok in medidas]
+
+    for escenario, filas in grupos.items():
+        latencias = [s * 1000 for s, _ in filas]
+        p = _percentiles(latencias)
+        errores = sum(not ok for _, ok in filas)
+        por_segundo = len(filas) / duracion
+        print(
+            f"  {escenario:<26} {len(filas):5d} pet  {errores:4d} err  "
+            f"{por_segundo:8.1f} pet/s  p50 {p['p50']:8.1f} ms  "
+            f"p95 {p['p95']:8.1f} ms  p99 {p['p99']:8.1f} ms"
+        )
+
+
+def _desglose_chat():
+    from app.observability.metricas import DURACION_TURNO
+
+    medias = {}
+    for (ruta, componente), (cuentas, suma) in DURACION_TURNO.valores.items():
+        if ruta == "chat" and sum(cuentas):
+            medias[componente] = suma / sum(cuentas) * 1000
+    if medias:
+        partes = "  ".join(f"{c} {ms:.1f} ms" for c, ms in sorted(medias.items()))
+        print(f"  turno medio: {partes}")
+
+
+def main(args):
+    guion = Guion(primer_token=args.latencia_llm, entre_chunks=args.entre_chunks)
+    with ServidorLLM(guion) as llm, base_efimera(os.environ["DATABASE_URL"]) as url:
+        # Antes de importar app.*: la configuración se lee al importar
+        os.environ["DATABASE_URL"] = url
+        os.environ["OPENAI_BASE_URL"] = llm.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "bench")
+        os.environ.setdefault("TRACE_EXPORTER", "none")
+
+        clientes, slots = _sembrar(args.clientes)
+        escenarios = _escenarios(clientes, slots)
+        nombres = args.escenarios or list(escenarios)
+        trabajos = [
+            (nombres[i % len(nombres)], escenarios[nombres[i % len(nombres)]](i))
+            for i in range(args.peticiones)
+        ]
+
+        print(
+            f"{args.peticiones} peticiones, concurrencia {args.concurrencia}, "
+            f"LLM falso con {args.latencia_llm * 1000:.0f} ms al primer token, "
+            f"{len(clientes)} clientes"
+        )
+        resultados = asyncio.run(_medir(args.modo, trabajos, args.concurrencia))
+        for nombre, (medidas, duracion) in resultados.items():
+            _reportar(nombre, medidas, duracion)
+            if nombre == "chat":
+                _desglose_chat()
+        print(f"\ncompletions servidos por el LLM falso: {llm.completions}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=(__doc__ or "").split("\n\n")[0])
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--latencia-llm", type=float, default=0.3)
+    parser.add_argument("--entre-chunks", type=float, default=0.005)
+    parser.add_argument("--modo", choices=("chat", "mcp", "ambos"), default="ambos")
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument(
+        "--escenarios",
+        nargs="+",
+        choices=("saludo", "buscar_cliente", "consultar_disponibilidad", "crear_cita"),
+    )
+    main(parser.parse_args())
@@ -0,0 +1,123 @@
+"""
+Benchmark: consultas de disponibilidad sobre un mes de agenda densa.
+
+Genera en memoria un mes con el horario configurado casi lleno (varios
+mecánicos, capacidad > 1) y compara:
+- escaneo ingenuo: por cada slot, contar las citas de la lista que caen en él
+  (lo que haría una consulta sin índice por cada slot),
+- el índice del motor de disponibilidad (ocupación por día y slot),
+- actualizar el índice con una cita nueva frente a reconstruirlo.
+
+No toca la base de datos: todos los días quedan precargados en el índice.
+
+    python -m app.bench.bench_disponibilidad [ocupacion]
+"""
+
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from app.db.config import SessionLocal
+from app.services.disponibilidad import Horario, MotorDisponibilidad, parsear_horario
+
+EMPLEADOS = 6
+CAPACIDAD = 4
+REPETICIONES = 300
+
+
+def _agenda(horario: Horario, dias: list[date], ocupacion: float) -> list:
+    """Citas (fecha, empleado) llenando `ocupacion` de la capacidad de cada slot."""
+    random.seed(7)
+    citas = []
+    for dia in dias:
+        for slot in horario.slots_del_dia(dia):
+            ocupados = sum(random.random() < ocupacion for _ in range(CAPACIDAD))
+            for empleado in random.sample(range(1, EMPLEADOS + 1), ocupados):
+                citas.append(
+                    (slot + timedelta(minutes=random.randint(0, 59)), empleado)
+                )
+    return citas
+
+
+def _ingenuo(horario: Horario, citas: list, desde: datetime, hasta: datetime, empleado):
+    libres = []
+    dia = desde.date()
+    while dia < hasta.date():
+        for slot in horario.slots_del_dia(dia):
+            en_slot = [e for f, e in citas if horario.slot_de(f) == slot]
+            if len(en_slot) < horario.capacidad and (
+                empleado is None or en_slot.count(empleado) < horario.capacidad_empleado
+            ):
+                libres.append(slot)
+        dia += timedelta(days=1)
+    return libres
+
+
+def _medir(funcion) -> dict:
+    muestras = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion()
+        muestras.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "p50_ms": statistics.median(muestras),
+        "p95_ms": statistics.quantiles(muestras, n=20)[-1],
+    }
+
+
+def main(ocupacion: float):
+    horario = Horario(
+        parsear_horario("0-4=08:00-18:00,5=08:00-14:00"),
+        capacidad=CAPACIDAD,
+        capacidad_empleado=1,
+    )
+    inicio_mes = date(2030, 3, 1)
+    dias = [inicio_mes + timedelta(days=n) for n in range(31)]
+    citas = _agenda(horario, dias, ocupacion)
+    slots = sum(len(horario.slots_del_dia(d)) for d in dias)
+    print(
+        f"{len(citas)} citas en {slots} slots ({len(citas) / (slots * CAPACIDAD):.0%} "
+        f"de la capacidad), {EMPLEADOS} mecánicos"
+    )
+
+    motor = MotorDisponibilidad(horario, ttl=3600)
+    carga = time.perf_counter()
+    motor.precargar(dias, citas)
+    print(f"Construir el índice del mes: {(time.perf_counter() - carga) * 1000:.2f} ms")
+
+    db = SessionLocal()  # no se conecta: todos los días están en el índice
+    try:
+        rangos = {
+            "un día": timedelta(days=1),
+            "una semana": timedelta(days=7),
+        }
+        for nombre, duracion in rangos.items():
+            desde = datetime.combine(
+                inicio_mes + timedelta(days=10), datetime.min.time()
+            )
+            hasta = desde + duracion
+            esperado = _ingenuo(horario, citas, desde, hasta, 3)
+            assert motor.slots_libres(db, desde, hasta, 3) == esperado
+
+            ingenuo = _medir(lambda: _ingenuo(horario, citas, desde, hasta, 3))
+            indice = _medir(lambda: motor.slots_libres(db, desde, hasta, 3))
+            print(f"\nDisponibilidad de {nombre} ({len(esperado)} slots libres)")
+            for etiqueta, r in (("escaneo", ingenuo), ("índice", indice)):
+                print(
+                    f"  {etiqueta:<10} p50 {r['p50_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms"
+                )
+            print(f"  mejora p50  {ingenuo['p50_ms'] / indice['p50_ms']:8.1f}x")
+    finally:
+        db.close()
+
+    fecha = datetime(2030, 3, 12, 10, 30)
+    incremental = _medir(lambda: motor.registrar(fecha, 1, 0))
+    recarga = _medir(lambda: motor.precargar(dias, citas))
+    print("\nActualizar tras crear/eliminar una cita")
+    print(f"  incremental p50 {incremental['p50_ms'] * 1000:9.2f} µs")
+    print(f"  recargar mes p50 {recarga['p50_ms'] * 1000:8.2f} µs")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.85)
@@ -0,0 +1,184 @@
+"""
+Benchmark: planes y latencias de las consultas frecuentes con y sin los
+índices de la migración 0002_indices_consultas.
+
+Copia la estructura de las tablas en un esquema temporal (`bench_indices`),
+siembra datos sintéticos con generate_series, mide sin los índices, los
+crea con las mismas sentencias de la migración y vuelve a medir. Al final
+elimina el esquema: las tablas reales no se tocan.
+
+Requiere la base migrada (python -m app.db.migrations).
+
+    python -m app.bench.bench_indices [clientes] [citas]
+"""
+
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from sqlalchemy import text
+from app.db.config import engine
+from app.db.migrations import INDICES_CONSULTAS
+
+ESQUEMA = "bench_indices"
+REPETICIONES = 200
+
+TABLAS = ("Client", "AppointmentScheduling", "ClientContact")
+
+# Las mismas consultas que generan los repositorios
+CONSULTAS = {
+    "clientes activos (página)": (
+        'SELECT id, "fullName", "fullSurname", identified, "createdAt" FROM "Client" '
+        'WHERE "clientState" = true AND id > :cursor ORDER BY id LIMIT 51'
+    ),
+    "citas de un cliente": (
+        'SELECT id, "appointmentDate", ubicacion FROM "AppointmentScheduling" '
+        'WHERE "clientId" = :cliente ORDER BY "appointmentDate" DESC LIMIT 20'
+    ),
+    "citas en un día": (
+        'SELECT id, "appointmentDate", "clientId" FROM "AppointmentScheduling" '
+        'WHERE "appointmentDate" >= :desde AND "appointmentDate" < :hasta'
+    ),
+    "contactos de un cliente": (
+        'SELECT id, "phoneNumber", email FROM "ClientContact" WHERE "clientId" = :cliente'
+    ),
+}
+
+
+def _sembrar(conn, clientes: int, citas: int):
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {ESQUEMA}"))
+    for tabla in TABLAS:
+        conn.execute(
+            text(
+                f'CREATE TABLE {ESQUEMA}."{tabla}" '
+                f'(LIKE public."{tabla}" INCLUDING DEFAULTS INCLUDING IDENTITY)'
+            )
+        )
+    conn.execute(text(f"SET search_path TO {ESQUEMA}, public"))
+
+    # Solo PK y UNIQUE, como estaba el esquema antes de la migración
+    conn.execute(text('ALTER TABLE "Client" ADD PRIMARY KEY (id)'))
+    conn.execute(text('ALTER TABLE "Client" ADD UNIQUE (identified)'))
+    conn.execute(text('ALTER TABLE "AppointmentScheduling" ADD PRIMARY KEY (id)'))
+    conn.execute(text('ALTER TABLE "ClientContact" ADD PRIMARY KEY (id)'))
+
+    # 30% de clientes inactivos, ~2 contactos por cliente, citas en el próximo año
+    conn.execute(
+        text(
+            'INSERT INTO "Client" (id, "fullName", "fullSurname", identified, "clientState") '
+            "SELECT g, 'Nombre ' || g, 'Apellido ' || g, 'bench-' || g, g % 10 >= 3 "
+            "FROM generate_series(1, :n) g"
+        ),
+        {"n": clientes},
+    )
+    conn.execute(
+        text(
+            'INSERT INTO "AppointmentScheduling" '
+            '(id, "appointmentDate", ubicacion, "appointmentState", "clientId") '
+            "SELECT g, date_trunc('hour', now()) + (g % 365) * interval '1 day' "
+            "+ (8 + g % 10) * interval '1 hour', 'Taller', 'ASIGNADA', "
+            "1 + (g::bigint * 7919) % :clientes FROM generate_series(1, :n) g"
+        ),
+        {"n": citas, "clientes": clientes},
+    )
+    conn.execute(
+        text(
+            'INSERT INTO "ClientContact" (id, "phoneNumber", email, "clientId") '
+            "SELECT g, '300' || g, 'c' || g || '@example.com', 1 + g % :clientes "
+            "FROM generate_series(1, :n) g"
+        ),
+        {"n": clientes * 2, "clientes": clientes},
+    )
+    conn.execute(text("ANALYZE"))
+
+
+def _parametros(clientes: int) -> dict:
+    desde = date.today() + timedelta(days=random.randint(0, 364))
+    return {
+        "cursor": random.randint(1, clientes),
+        "cliente": random.randint(1, clientes),
+        "desde": desde,
+        "hasta": desde + timedelta(days=1),
+    }
+
+
+def _plan(conn, sql: str, params: dict) -> tuple[str, float]:
+    """Nodos del plan (tipo + índice) y tiempo de ejecución de EXPLAIN ANALYZE."""
+    fila = conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"), params).scalar()
+    plan = (fila if isinstance(fila, list) else json.loads(fila))[0]
+
+    nodos, pila = [], [plan["Plan"]]
+    while pila:
+        nodo = pila.pop()
+        nombre = nodo["Node Type"]
+        if "Index Name" in nodo:
+            nombre += f" ({nodo['Index Name']})"
+        nodos.append(nombre)
+        pila.extend(nodo.get("Plans", []))
+    return " > ".join(nodos), plan["Execution Time"]
+
+
+def _medir(conn, clientes: int) -> dict:
+    random.seed(42)
+    resultados = {}
+    for nombre, sql in CONSULTAS.items():
+        muestras = []
+        for _ in range(REPETICIONES):
+            params = _parametros(clientes)
+            inicio = time.perf_counter()
+            conn.execute(text(sql), params).all()
+            muestras.append((time.perf_counter() - inicio) * 1000)
+
+        plan, ejecucion = _plan(conn, sql, _parametros(clientes))
+        resultados[nombre] = {
+            "p50_ms": statistics.median(muestras),
+            "p95_ms": statistics.quantiles(muestras, n=20)[-1],
+            "ejecucion_ms": ejecucion,
+            "plan": plan,
+        }
+    return resultados
+
+
+def _imprimir(titulo: str, resultados: dict):
+    print(f"\n{titulo}")
+    for nombre, r in resultados.items():
+        print(
+            f"  {nombre:<28} p50 {r['p50_ms']:8.3f} ms  p95 {r['p95_ms']:8.3f} ms  "
+            f"servidor {r['ejecucion_ms']:8.3f} ms"
+        )
+        print(f"  {'':<28} {r['plan']}")
+
+
+def main(clientes: int, citas: int):
+    print(f"Sembrando {clientes} clientes, {citas} citas y {clientes * 2} contactos…")
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.execute(text("SET statement_timeout = 0"))
+        try:
+            _sembrar(conn, clientes, citas)
+            antes = _medir(conn, clientes)
+            _imprimir("Sin índices (solo PK / UNIQUE)", antes)
+
+            for sentencia in INDICES_CONSULTAS:
+                conn.execute(text(sentencia))
+            conn.execute(text("ANALYZE"))
+            despues = _medir(conn, clientes)
+            _imprimir("Con los índices de 0002_indices_consultas", despues)
+
+            print("\nMejora p50:")
+            for nombre in CONSULTAS:
+                mejora = antes[nombre]["p50_ms"] / despues[nombre]["p50_ms"]
+                print(f"  {nombre:<28} {mejora:6.1f}x")
+        finally:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE"))
+            # La conexión vuelve al pool: search_path y timeout originales
+            conn.execute(text("RESET ALL"))
+
+
+if __name__ == "__main__":
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    citas = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+    main(clientes, citas)
@@ -0,0 +1,152 @@
+"""
+Benchmark: perfil de un cliente en una herramienta vs el camino N+1.
+
+- N+1: lo que hace hoy el modelo, una herramienta (y una sesión) por dato:
+  buscar_cliente, listar_contactos y citas_cliente desde hoy.
+- perfil_cliente: cliente y contactos con joinedload y las próximas citas
+  con LIMIT, en una sola sesión y dos SELECT.
+
+Reporta sentencias SQL por perfil, latencias p50/p95 y el tamaño del JSON
+que llega al prompt. Siembra clientes temporales con contactos y citas y
+los borra al terminar. El caché de buscar_cliente se desactiva para medir
+las idas a la base.
+
+    python -m app.bench.bench_perfil [clientes] [citas_por_cliente]
+"""
+
+import os
+
+os.environ.setdefault("CLIENTES_CACHE", "none")
+
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, select, text
+from app.core.serializacion import a_json
+from app.db.config import engine
+from app.db.unit_of_work import ejecutar_en_sesion_sync
+from app.models.modelos import AppointmentScheduling, Client, ClientContact
+from app.services.citas_service import AppointmentService
+from app.services.client_contact import ClientContactService
+from app.services.client_service import ClienteService
+
+PREFIJO = "bench-perfil-"
+
+
+def _sembrar(clientes: int, citas: int) -> None:
+    """Cada cliente: 2 contactos y `citas` citas, la mitad ya pasadas."""
+    hoy = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                'INSERT INTO "Client" ("fullName", "fullSurname", identified, "clientState") '
+                "SELECT 'Nombre ' || g, 'Apellido ' || g, :prefijo || g, true "
+                "FROM generate_series(0, :n - 1) g"
+            ),
+            {"n": clientes, "prefijo": PREFIJO},
+        )
+        ids = list(
+            conn.scalars(select(Client.id).where(Client.identified.startswith(PREFIJO)))
+        )
+        conn.execute(
+            ClientContact.__table__.insert(),
+            [
+                {
+                    "clientId": i,
+                    "phoneNumber": f"300{i:07d}"[-10:],
+                    "email": f"cliente{i}@correo.co",
+                    "address": f"Calle {k + 1} # {i}",
+                    "createAt": hoy,
+                    "updatedAt": hoy,
+                }
+                for i in ids
+                for k in range(2)
+            ],
+        )
+        conn.execute(
+            AppointmentScheduling.__table__.insert(),
+            [
+                {
+                    "clientId": i,
+                    "appointmentDate": hoy + timedelta(days=7 * (k - citas // 2)),
+                    "ubicacion": "Taller Central",
+                    "appointmentState": "ASIGNADA",
+                    "details": "Revisión general",
+                }
+                for i in ids
+                for k in range(citas)
+            ],
+        )
+
+
+def _limpiar() -> None:
+    with engine.begin() as conn:
+        ids = select(Client.id).where(Client.identified.startswith(PREFIJO))
+        conn.execute(
+            delete(AppointmentScheduling).where(AppointmentScheduling.clientId.in_(ids))
+        )
+        conn.execute(delete(ClientContact).where(ClientContact.clientId.in_(ids)))
+        conn.execute(delete(Client).where(Client.identified.startswith(PREFIJO)))
+
+
+def _n_mas_1(identified: str) -> list[dict]:
+    cliente = ejecutar_en_sesion_sync(ClienteService.buscar_cliente, identified)
+    client_id = cliente["data"]["id"]
+    contactos = ejecutar_en_sesion_sync(
+        ClientContactService.listar_contactos, client_id
+    )
+    citas = ejecutar_en_sesion_sync(
+        AppointmentService.obtener_citas_por_cliente, client_id, datetime.now()
+    )
+    return [cliente, contactos, citas]
+
+
+def _perfil(identified: str) -> list[dict]:
+    return [ejecutar_en_sesion_sync(ClienteService.perfil_cliente, identified)]
+
+
+def _medir(nombre: str, funcion, identificaciones: list[str]) -> None:
+    sentencias = 0
+
+    def contar(*_):
+        nonlocal sentencias
+        sentencias += 1
+
+    funcion(identificaciones[0])  # calentamiento
+    latencias, bytes_json = [], []
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        for identified in identificaciones:
+            inicio = time.perf_counter()
+            respuestas = funcion(identified)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            bytes_json.append(sum(len(a_json(r)) for r in respuestas))
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+
+    cortes = statistics.quantiles(latencias, n=100, method="inclusive")
+    print(
+        f"  {nombre:<15} {sentencias / len(identificaciones):4.1f} SQL/perfil  "
+        f"p50 {cortes[49]:6.2f} ms  p95 {cortes[94]:6.2f} ms  "
+        f"JSON {statistics.mean(bytes_json):6.0f} bytes"
+    )
+
+
+def main(clientes: int, citas: int) -> None:
+    _limpiar()
+    _sembrar(clientes, citas)
+    try:
+        identificaciones = [f"{PREFIJO}{i}" for i in range(clientes)]
+        print(f"{clientes} clientes, 2 contactos y {citas} citas por cliente")
+        _medir("N+1 (3 tools)", _n_mas_1, identificaciones)
+        _medir("perfil_cliente", _perfil, identificaciones)
+    finally:
+        _limpiar()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    citas = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    main(clientes, citas)
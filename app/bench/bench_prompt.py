@@ -0,0 +1,107 @@
+"""
+Micro-benchmark: costo de preparar el prompt de sistema por conversación.
+
+Compara el esquema anterior (pytz.timezone + f-string con strftime en cada
+conversación nueva) con app.chat.prompt (prefijo estático precompilado y
+bloque de fecha cacheado por minuto).
+
+    python -m app.bench.bench_prompt
+"""
+
+import timeit
+from datetime import datetime, timedelta
+import pytz
+from app.chat.prompt import PROMPT_ESTATICO, mensajes_sistema
+
+N = 20_000
+
+
+def prompt_anterior() -> list[dict]:
+    """Copia del armado del prompt que hacía chat() por conversación nueva."""
+    tz_colombia = pytz.timezone("America/Bogota")
+    hoy = datetime.now(tz_colombia)
+    mañana = hoy + timedelta(days=1)
+
+    return [
+        {
+            "role": "system",
+            "content": f"""Eres un asistente de taller mecánico profesional en Colombia.
+
+🗓️ FECHA Y HORA ACTUAL (Colombia):
+- HOY es: {hoy.strftime("%A %d de %B de %Y")}
+- Hora actual: {hoy.strftime("%I:%M %p")} (formato 12 horas)
+- Hora actual: {hoy.strftime("%H:%M")} (formato 24 horas)
+- Año actual: {hoy.year}
+
+⚠️ REGLAS CRÍTICAS PARA FECHAS Y HORAS:
+
+FORMATO DE FECHA Y HORA:
+- SIEMPRE usa formato 24 horas: YYYY-MM-DD HH:MM:SS
+- SIEMPRE usa el año {hoy.year}
+
+CONVERSIÓN DE HORAS (MUY IMPORTANTE):
+- 12:00 AM = 00:00:00 (medianoche)
+- 1:00 AM = 01:00:00
+- 8:00 AM = 08:00:00
+- 9:00 AM = 09:00:00
+- 10:00 AM = 10:00:00
+- 11:00 AM = 11:00:00
+- 12:00 PM = 12:00:00 (mediodía)
+- 1:00 PM = 13:00:00
+- 2:00 PM = 14:00:00
+- 3:00 PM = 15:00:00 ← SI EL USUARIO DICE "3 PM" USA 15:00:00
+- 4:00 PM = 16:00:00
+- 5:00 PM = 17:00:00
+- 6:00 PM = 18:00:00
+- 7:00 PM = 19:00:00
+- 8:00 PM = 20:00:00
+- 9:00 PM = 21:00:00
+- 10:00 PM = 22:00:00
+- 11:00 PM = 23:00:00
+
+EJEMPLOS CORRECTOS:
+- Usuario dice "3 de la tarde" o "3 PM" → Usa {hoy.strftime("%Y-%m-%d")} 15:00:00
+- Usuario dice "10 de la mañana" o "10 AM" → Usa {hoy.strftime("%Y-%m-%d")} 10:00:00
+- Usuario dice "mediodía" → Usa {hoy.strftime("%Y-%m-%d")} 12:00:00
+
+EJEMPLOS INCORRECTOS (NO HACER):
+- ❌ Usuario dice "3 PM" → NO uses 03:00:00
+- ❌ Usuario dice "3 PM" → NO uses 09:00:00
+- ✅ Usuario dice "3 PM" → SÍ usa 15:00:00
+
+HORARIO DE ATENCIÓN DEL TALLER:
+- Lunes a Viernes: 8:00 AM - 6:00 PM (08:00 - 18:00)
+- Sábados: 8:00 AM - 2:00 PM (08:00 - 14:00)
+- Domingos: Cerrado
+
+FLUJO:
+1. Saluda
+2. Pide identificación
+3. Si no existe: registra (nombre, apellidos, ID, teléfono, email, dirección)
+4. Pregunta: marca, modelo, año del vehículo
+5. Pregunta: qué servicio necesita
+6. Pregunta: fecha y hora (recuerda que HOY es {hoy.strftime("%d/%m/%Y a las %I:%M %p")})
+7. CONFIRMA la hora con el usuario antes de crear la cita
+8. Crea la cita con vehículo en details
+
+Sé profesional y conversacional.""",
+        }
+    ]
+
+
+def medir(nombre: str, funcion) -> float:
+    segundos = min(timeit.repeat(funcion, number=N, repeat=5))
+    por_llamada = segundos / N * 1e6
+    print(f"{nombre:<28} {por_llamada:8.2f} µs/conversación")
+    return por_llamada
+
+
+if __name__ == "__main__":
+    print(f"Preparación del prompt de sistema ({N} iteraciones, mejor de 5)\n")
+    antes = medir("anterior (por conversación)", prompt_anterior)
+    despues = medir("app.chat.prompt", mensajes_sistema)
+    print(f"\nMejora: {antes / despues:.1f}x")
+    print(
+        f"Prefijo estático compartido: {len(PROMPT_ESTATICO['content'])} caracteres "
+        "idénticos entre conversaciones (elegible para caché de prompts)"
+    )
@@ -0,0 +1,114 @@
+"""
+Benchmark: reservas concurrentes de citas.
+
+Lanza `reservas` reservas en paralelo (AsyncSession por reserva, como las
+invocaciones MCP) en dos escenarios:
+- todas al mismo slot: contención máxima sobre el advisory lock, debe
+  ganar exactamente una,
+- repartidas en slots distintos: sin contención entre ellas.
+
+Reporta éxitos, reservas/s y latencias. Usa un cliente temporal y borra
+todo lo que crea al terminar.
+
+    python -m app.bench.bench_reservas [reservas]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from app.db.config import AsyncSessionLocal, SessionLocal, async_engine
+from app.models.modelos import AppointmentScheduling, Client
+from app.schemas.appointment import AppointmentCreate
+from app.schemas.client import ClientCreate
+from app.services.citas_service import AsyncAppointmentService
+from app.services.client_service import ClienteService
+from app.services.disponibilidad import get_motor
+
+INICIO = datetime(2032, 3, 1, 8, 0)  # lunes
+
+
+async def _reservar(cliente: int, fecha: datetime) -> tuple[dict, float]:
+    inicio = time.perf_counter()
+    async with AsyncSessionLocal() as sesion:
+        cita = AppointmentCreate(
+            clientId=cliente, appointmentDate=fecha, ubicacion="Taller"
+        )
+        resultado = await AsyncAppointmentService.crear_cita(sesion, cita)
+        await sesion.commit()
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+async def _escenario(cliente: int, fechas: list[datetime]) -> dict:
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(_reservar(cliente, f) for f in fechas))
+    total = time.perf_counter() - inicio
+    latencias = [ms for _, ms in resultados]
+    return {
+        "exitos": sum(r["status"] == "success" for r, _ in resultados),
+        "ocupados": sum(r["status"] == "slot_taken" for r, _ in resultados),
+        "por_segundo": len(fechas) / total,
+        "p50_ms": statistics.median(latencias),
+        "p95_ms": statistics.quantiles(latencias, n=20)[-1],
+    }
+
+
+def _slots(n: int) -> list[datetime]:
+    horario = get_motor().horario
+    slots, dia = [], INICIO.date()
+    while len(slots) < n:
+        slots += horario.slots_del_dia(dia)
+        dia += timedelta(days=1)
+    return slots[:n]
+
+
+async def _medir(cliente: int, reservas: int) -> dict:
+    try:
+        return {
+            "mismo slot": await _escenario(cliente, [INICIO] * reservas),
+            "slots distintos": await _escenario(cliente, _slots(reservas + 1)[1:]),
+        }
+    finally:
+        await async_engine.dispose()
+
+
+def main(reservas: int):
+    with SessionLocal() as db:
+        datos = ClientCreate(
+            fullName="Bench", fullSurname="Reservas", identified="bench-reservas"
+        )
+        cliente = ClienteService.registrar_cliente(db, datos).get("clientId")
+        if cliente is None:
+            cliente = (
+                db.query(Client.id)
+                .filter(Client.identified == "bench-reservas")
+                .scalar()
+            )
+        db.commit()
+
+    print(f"{reservas} reservas concurrentes por escenario")
+    try:
+        resultados = asyncio.run(_medir(int(cliente), reservas))
+    finally:
+        with SessionLocal() as db:
+            db.execute(
+                delete(AppointmentScheduling).where(
+                    AppointmentScheduling.clientId == cliente
+                )
+            )
+            db.execute(delete(Client).where(Client.id == cliente))
+            db.commit()
+
+    for nombre, r in resultados.items():
+        print(
+            f"  {nombre:<16} éxitos {r['exitos']:4d}  ocupados {r['ocupados']:4d}  "
+            f"{r['por_segundo']:8.1f} reservas/s  p50 {r['p50_ms']:8.2f} ms  "
+            f"p95 {r['p95_ms']:8.2f} ms"
+        )
+    assert resultados["mismo slot"]["exitos"] == 1
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,133 @@
+"""
+Servidor compatible con la API de OpenAI (chat.completions en streaming)
+que responde con un guion fijo y latencias configurables.
+
+El guion lo dicta el mensaje del usuario: cada línea con la forma
+`herramienta {"arg": ...}` se devuelve como una tool call (varias líneas,
+llamadas paralelas). Cuando el último mensaje es el resultado de una
+herramienta, o el mensaje no trae llamadas, responde con texto. Así el
+mismo turno produce siempre las mismas llamadas y la carga es reproducible.
+
+    with ServidorLLM(Guion(primer_token=0.2)) as llm:
+        os.environ["OPENAI_BASE_URL"] = llm.base_url
+"""
+
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+@dataclass
+class Guion:
+    primer_token: float = 0.3  # segundos hasta el primer chunk
+    entre_chunks: float = 0.005  # segundos entre chunks
+    respuesta: str = "Listo, ¿te ayudo con algo más?"
+
+
+def llamadas_del_mensaje(mensaje: str) -> list[tuple[str, dict]]:
+    """`herramienta {json}` por línea → [(herramienta, args)]."""
+    llamadas = []
+    for linea in (mensaje or "").splitlines():
+        nombre, _, args = linea.strip().partition(" ")
+        if nombre.isidentifier() and args.startswith("{"):
+            try:
+                llamadas.append((nombre, json.loads(args)))
+            except ValueError:
+                pass
+    return llamadas
+
+
+def _tokens(mensajes: list[dict]) -> int:
+    return sum(len(str(m.get("content") or "")) for m in mensajes) // 4
+
+
+def crear_app(guion: Guion) -> FastAPI:
+    app = FastAPI()
+    app.state.completions = 0
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        cuerpo = await request.json()
+        app.state.completions += 1
+        mensajes = cuerpo["messages"]
+        ultimo = mensajes[-1]
+
+        llamadas = []
+        if cuerpo.get("tools") and ultimo.get("role") == "user":
+            llamadas = llamadas_del_mensaje(ultimo.get("content"))
+
+        base = {
+            "id": f"chatcmpl-{app.state.completions}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": cuerpo["model"],
+        }
+
+        def chunk(delta: dict | None, fin: str | None = None, **extra) -> str:
+            opciones = (
+                []
+                if delta is None
+                else [{"index": 0, "delta": delta, "finish_reason": fin}]
+            )
+            return f"data: {json.dumps({**base, 'choices': opciones, **extra})}\n\n"
+
+        async def eventos():
+            await asyncio.sleep(guion.primer_token)
+            if llamadas:
+                for i, (nombre, args) in enumerate(llamadas):
+                    funcion = {"name": nombre, "arguments": json.dumps(args)}
+                    tc = {"index": i, "id": f"call_{i}", "type": "function"}
+                    yield chunk({"tool_calls": [{**tc, "function": funcion}]})
+                    await asyncio.sleep(guion.entre_chunks)
+                fin, salida = "tool_calls", 10 * len(llamadas)
+            else:
+                palabras = guion.respuesta.split(" ")
+                for palabra in palabras:
+                    yield chunk({"content": palabra + " "})
+                    await asyncio.sleep(guion.entre_chunks)
+                fin, salida = "stop", len(palabras)
+
+            yield chunk({}, fin)
+            usage = {"prompt_tokens": _tokens(mensajes), "completion_tokens": salida}
+            usage["total_tokens"] = usage["prompt_tokens"] + salida
+            yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(eventos(), media_type="text/event-stream")
+
+    return app
+
+
+class ServidorLLM:
+    """Levanta el servidor falso en un hilo (con su propio event loop)."""
+
+    def __init__(self, guion: Guion | None = None, puerto: int = 0):
+        self.app = crear_app(guion or Guion())
+        config = uvicorn.Config(
+            self.app, host="127.0.0.1", port=puerto, log_level="warning"
+        )
+        self._servidor = uvicorn.Server(config)
+        self._hilo = threading.Thread(target=self._servidor.run, daemon=True)
+
+    @property
+    def completions(self) -> int:
+        return self.app.state.completions
+
+    def __enter__(self):
+        self._hilo.start()
+        while not self._servidor.started:
+            if not self._hilo.is_alive():
+                raise RuntimeError("No se pudo iniciar el servidor LLM falso")
+            time.sleep(0.01)
+        (socket,) = self._servidor.servers[0].sockets
+        self.base_url = f"http://127.0.0.1:{socket.getsockname()[1]}/v1"
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.should_exit = True
+        self._hilo.join()
@@ -0,0 +1,156 @@
+"""
+Compactación del historial antes de cada llamada al LLM.
+
+Antepone los mensajes fijos (el prompt de sistema), conserva los últimos
+turnos, recorta los resultados de herramientas antiguos y, opcionalmente,
+resume los turnos descartados. Los fijos cuentan en el presupuesto. El
+historial guardado no se modifica: solo se compacta lo que se envía.
+"""
+
+import json
+from collections.abc import Callable
+from types import EllipsisType
+from app.db.connect import settings
+from app.observability.metricas import (
+    COMPACTACION_LLAMADAS,
+    COMPACTACION_MENSAJES,
+    COMPACTACION_TOKENS,
+)
+
+# Aproximación sin tokenizer: ~4 caracteres por token + overhead por mensaje
+CARACTERES_POR_TOKEN = 4
+TOKENS_POR_MENSAJE = 4
+
+ENCABEZADO_RESUMEN = "Resumen de la conversación anterior:"
+
+
+def estimar_tokens(mensaje: dict) -> int:
+    texto = mensaje.get("content") or ""
+    for call in mensaje.get("tool_calls") or []:
+        funcion = call.get("function", {})
+        texto += funcion.get("name", "") + funcion.get("arguments", "")
+    return len(texto) // CARACTERES_POR_TOKEN + TOKENS_POR_MENSAJE
+
+
+def resumen_extractivo(mensajes: list[dict]) -> str:
+    """Resumen sin LLM: lo que dijo el usuario y los resultados clave de herramientas."""
+    lineas = []
+    for m in mensajes:
+        if m["role"] == "user":
+            lineas.append(f"- Usuario: {m['content'][:200]}")
+        elif m["role"] == "tool":
+            try:
+                resultado = json.loads(m["content"])
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(resultado, dict):
+                continue
+            datos = {
+                k: v
+                for k, v in resultado.items()
+                if k in ("status", "clientId", "contactId", "appointmentId")
+            }
+            lineas.append(f"- Herramienta: {json.dumps(datos, ensure_ascii=False)}")
+    return ENCABEZADO_RESUMEN + "\n" + "\n".join(lineas)
+
+
+RESUMIDORES = {"extractivo": resumen_extractivo, "none": None}
+
+
+def _recortar(mensaje: dict, max_chars: int) -> dict:
+    contenido = mensaje.get("content") or ""
+    if len(contenido) <= max_chars:
+        return mensaje
+    COMPACTACION_MENSAJES.inc(accion="recortados")
+    return {**mensaje, "content": contenido[:max_chars] + "…[recortado]"}
+
+
+def _resumir(descartados: list[dict], resumidor, max_tokens: int) -> dict | None:
+    """Resumen de los turnos descartados que cabe en `max_tokens`.
+
+    Si no cabe entero se conservan las últimas líneas (lo más reciente); si
+    no cabe ni una, no hay resumen.
+    """
+    lineas = resumidor(descartados).split("\n")
+    encabezado, lineas = lineas[0], lineas[1:]
+    disponible = (max_tokens - TOKENS_POR_MENSAJE) * CARACTERES_POR_TOKEN
+    disponible -= len(encabezado)
+
+    conservadas = []
+    for linea in reversed(lineas):
+        disponible -= len(linea) + 1
+        if disponible < 0:
+            break
+        conservadas.append(linea)
+    if not conservadas:
+        return None
+    contenido = "\n".join([encabezado, *reversed(conservadas)])
+    return {"role": "system", "content": contenido}
+
+
+def compactar(
+    historial: list[dict],
+    fijos: list[dict] | None = None,
+    presupuesto: int | None = None,
+    turnos: int | None = None,
+    max_chars_tool: int | None = None,
+    resumidor: Callable[[list[dict]], str] | None | EllipsisType = ...,
+) -> list[dict]:
+    """Retorna `fijos` + el historial compactado dentro del presupuesto de tokens.
+
+    Un turno empieza en un mensaje de usuario, así los pares
+    assistant(tool_calls) / tool nunca quedan separados. Los mensajes fijos
+    y el resumen de los turnos descartados cuentan en el presupuesto; solo
+    el último turno se envía aunque junto a los fijos lo exceda.
+    """
+    presupuesto = presupuesto or settings.CHAT_TOKEN_BUDGET
+    turnos = turnos or settings.CHAT_MAX_TURNS
+    max_chars_tool = max_chars_tool or settings.CHAT_TOOL_CHARS
+    if resumidor is ...:
+        resumidor = RESUMIDORES[settings.CHAT_SUMMARY]
+
+    fijos = fijos or []
+    inicios = [i for i, m in enumerate(historial) if m["role"] == "user"]
+    if not inicios:
+        return fijos + historial
+
+    corte = inicios[max(len(inicios) - turnos, 0)]
+    ultimo_turno = inicios[-1]
+
+    # Los resultados de herramientas de turnos anteriores ya se usaron: se recortan
+    recientes = [
+        _recortar(m, max_chars_tool) if m["role"] == "tool" and i < ultimo_turno else m
+        for i, m in enumerate(historial[corte:], start=corte)
+    ]
+
+    tokens_fijos = sum(estimar_tokens(m) for m in fijos)
+    costos = [estimar_tokens(m) for m in recientes]
+    total = tokens_fijos + sum(costos)
+
+    # Descartar turnos completos (desde el más antiguo) hasta entrar en el presupuesto
+    inicios_recientes = [i - corte for i in inicios if i >= corte]
+    descartar = 0
+    for siguiente in inicios_recientes[1:]:
+        if total <= presupuesto:
+            break
+        total -= sum(costos[descartar:siguiente])
+        descartar = siguiente
+    corte += descartar
+    recientes = recientes[descartar:]
+
+    compactado = list(fijos)
+    # El resumen solo usa lo que sobra del presupuesto
+    if corte and resumidor and total < presupuesto:
+        resumen = _resumir(historial[:corte], resumidor, presupuesto - total)
+        if resumen is not None:
+            compactado.append(resumen)
+            total += estimar_tokens(resumen)
+    compactado.extend(recientes)
+
+    COMPACTACION_LLAMADAS.inc()
+    antes = tokens_fijos + sum(estimar_tokens(m) for m in historial)
+    COMPACTACION_TOKENS.inc(antes, fase="antes")
+    COMPACTACION_TOKENS.inc(total, fase="despues")
+    COMPACTACION_MENSAJES.inc(corte, accion="descartados")
+
+    return compactado
@@ -0,0 +1,19 @@
+"""
+Cliente del modelo para /chat, construido en el primer uso.
+
+Importar `openai` es de lo más caro del arranque, y solo la API lo
+necesita: el servidor MCP, los scripts y las pruebas no lo cargan. Los
+endpoints lo reciben con `Depends(get_llm_client)`, así una prueba puede
+reemplazarlo con `app.dependency_overrides[get_llm_client]`.
+"""
+
+import os
+from functools import lru_cache
+
+
+@lru_cache
+def get_llm_client():
+    from openai import AsyncOpenAI
+
+    # Lee OPENAI_API_KEY y OPENAI_BASE_URL del entorno en este momento
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -0,0 +1,341 @@
+"""
+Bucle de agente para un turno de /chat.
+
+El modelo puede encadenar herramientas (buscar_cliente → crear_cliente →
+crear_contacto → crear_cita) en un solo turno HTTP. Las llamadas que el
+modelo emite en una misma ronda se lanzan a la vez, pero comparten la
+sesión del turno: su acceso a la base se serializa con el lock de la unidad
+de trabajo y solo se solapa lo que hacen fuera de ella.
+
+CHAT_MAX_SECONDS limita el turno completo, llamadas al LLM y herramientas.
+
+Las respuestas del modelo se piden en streaming y el turno se expone como
+una secuencia de eventos (`ejecutar_turno_eventos`), que /chat/stream
+reenvía por SSE y /chat consume completa (`ejecutar_turno`).
+"""
+
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+from app.chat.compaction import compactar
+from app.chat.prompt import PROMPT_CACHE_KEY, mensajes_sistema
+from app.core.serializacion import a_json
+from app.db.connect import settings
+from app.db.unit_of_work import confirmar_ronda, transaccion_perdida
+from app.observability import acumular, iniciar_span
+from app.observability.metricas import LLAMADAS_LLM, TOKENS_LLM
+
+HERRAMIENTA_SIN_TIEMPO = {
+    "status": "error",
+    "message": "La herramienta no terminó dentro del tiempo del turno",
+}
+
+MENSAJE_TIEMPO_AGOTADO = (
+    "Estoy tardando más de lo normal en procesar tu solicitud. "
+    "¿Podrías repetirla en un momento?"
+)
+
+
+@dataclass
+class ResultadoTurno:
+    respuesta: str | None = None
+    herramientas_usadas: list[dict] = field(default_factory=list)
+    cita_creada: bool = False
+    datos_cita: dict | None = None
+    pasos: int = 0
+
+
+async def _con_limite(iterador, limite: float):
+    """Itera un stream asíncrono cortándolo si se supera `limite` (monotonic)."""
+    it = aiter(iterador)
+    while True:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            raise TimeoutError
+        try:
+            yield await asyncio.wait_for(anext(it), timeout=restante)
+        except StopAsyncIteration:
+            return
+
+
+def _medir_llm(inicio: float, error: BaseException | None) -> None:
+    acumular("llm", time.perf_counter() - inicio)
+    LLAMADAS_LLM.inc(resultado="ok" if error is None else type(error).__name__)
+
+
+async def _completar(
+    client, historial: list[dict], tools, limite: float
+) -> AsyncIterator[str | dict]:
+    """Pide un completion en streaming.
+
+    Produce cada fragmento de texto (str) y al final el mensaje del
+    asistente ya ensamblado (dict).
+    """
+    kwargs = {
+        "model": settings.OPENAI_MODEL,
+        "messages": compactar(historial, fijos=mensajes_sistema()),
+        "prompt_cache_key": PROMPT_CACHE_KEY,
+        # El último chunk trae el uso de tokens
+        "stream_options": {"include_usage": True},
+    }
+    if tools:
+        kwargs["tools"] = tools
+
+    # Span sin activar: el generador cede el control entre fragmentos
+    traza = iniciar_span(
+        "llm", modelo=settings.OPENAI_MODEL, mensajes=len(kwargs["messages"])
+    )
+    inicio = time.perf_counter()
+    try:
+        stream = await asyncio.wait_for(
+            client.chat.completions.create(stream=True, **kwargs),
+            timeout=max(limite - time.monotonic(), 0),
+        )
+    except BaseException as e:
+        _medir_llm(inicio, e)
+        if traza is not None:
+            traza.terminar(e)
+        raise
+
+    contenido = []
+    llamadas = {}
+    error = None
+    try:
+        async for chunk in _con_limite(stream, limite):
+            if getattr(chunk, "usage", None):
+                TOKENS_LLM.inc(chunk.usage.prompt_tokens, tipo="entrada")
+                TOKENS_LLM.inc(chunk.usage.completion_tokens, tipo="salida")
+                if traza is not None:
+                    traza.anotar(
+                        tokens_entrada=chunk.usage.prompt_tokens,
+                        tokens_salida=chunk.usage.completion_tokens,
+                    )
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+
+            if delta.content:
+                if traza is not None and not contenido:
+                    traza.anotar(
+                        primer_token_ms=round((time.perf_counter() - inicio) * 1000, 3)
+                    )
+                contenido.append(delta.content)
+                yield delta.content
+
+            # Los tool_calls llegan fragmentados: se ensamblan por índice
+            for tc in delta.tool_calls or []:
+                llamada = llamadas.setdefault(
+                    tc.index,
+                    {
+                        "id": None,
+                        "type": "function",
+                        "function": {"name": "", "arguments": ""},
+                    },
+                )
+                if tc.id:
+                    llamada["id"] = tc.id
+                if tc.function and tc.function.name:
+                    llamada["function"]["name"] += tc.function.name
+                if tc.function and tc.function.arguments:
+                    llamada["function"]["arguments"] += tc.function.arguments
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        await stream.close()
+        _medir_llm(inicio, error)
+        if traza is not None:
+            traza.anotar(herramientas=len(llamadas))
+            traza.terminar(error)
+
+    yield {
+        "role": "assistant",
+        "content": "".join(contenido) or None,
+        "tool_calls": [llamadas[i] for i in sorted(llamadas)],
+    }
+
+
+async def _ejecutar_llamada(indice: int, nombre: str, args, ejecutar):
+    if isinstance(args, Exception):
+        return indice, {"status": "error", "message": f"Argumentos inválidos: {args}"}
+    return indice, await ejecutar(nombre, args)
+
+
+def _parsear_args(call: dict):
+    try:
+        return json.loads(call["function"]["arguments"] or "{}")
+    except ValueError as e:
+        return e
+
+
+async def ejecutar_turno_eventos(
+    client,
+    historial: list[dict],
+    tools: list[dict],
+    ejecutar,
+    max_pasos: int | None = None,
+    max_segundos: float | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Llama al modelo y ejecuta herramientas hasta obtener una respuesta final.
+
+    Produce eventos `{"tipo": ...}`: "delta" (texto del modelo),
+    "herramienta_inicio", "herramienta_fin" y, al cierre, "fin" con el
+    ResultadoTurno. `historial` se modifica en el lugar con los mensajes
+    del turno; `ejecutar(nombre, args)` corre cada herramienta.
+    """
+    max_pasos = max_pasos or settings.CHAT_MAX_STEPS
+    max_segundos = max_segundos or settings.CHAT_MAX_SECONDS
+    limite = time.monotonic() + max_segundos
+    resultado = ResultadoTurno()
+
+    try:
+        while resultado.pasos < max_pasos:
+            mensaje: dict = {}
+            async for fragmento in _completar(client, historial, tools, limite):
+                if isinstance(fragmento, str):
+                    yield {"tipo": "delta", "texto": fragmento}
+                else:
+                    mensaje = fragmento
+
+            resultado.pasos += 1
+            tool_calls = mensaje.pop("tool_calls")
+
+            if not tool_calls:
+                resultado.respuesta = mensaje["content"]
+                historial.append(mensaje)
+                yield {"tipo": "fin", "resultado": resultado}
+                return
+
+            historial.append(
+                {
+                    **mensaje,
+                    "content": mensaje["content"] or "",
+                    "tool_calls": tool_calls,
+                }
+            )
+
+            nombres = [call["function"]["name"] for call in tool_calls]
+            argumentos = [_parsear_args(call) for call in tool_calls]
+            for nombre, args in zip(nombres, argumentos):
+                yield {
+                    "tipo": "herramienta_inicio",
+                    "herramienta": nombre,
+                    "parametros": args if isinstance(args, dict) else {},
+                }
+
+            tareas = [
+                asyncio.create_task(_ejecutar_llamada(i, nombre, args, ejecutar))
+                for i, (nombre, args) in enumerate(zip(nombres, argumentos))
+            ]
+            terminadas: dict[int, dict] = {}
+            agotado = False
+            try:
+                # Cada herramienta se notifica apenas termina
+                restante = max(limite - time.monotonic(), 0)
+                for siguiente in asyncio.as_completed(tareas, timeout=restante):
+                    i, salida = await siguiente
+                    terminadas[i] = salida
+                    yield {
+                        "tipo": "herramienta_fin",
+                        "herramienta": nombres[i],
+                        "resultado": salida,
+                    }
+            except TimeoutError:
+                agotado = True
+            finally:
+                for tarea in tareas:
+                    tarea.cancel()
+                # Las canceladas liberan la sesión del turno (rollback de su
+                # SAVEPOINT) antes de que el turno siga o se cierre
+                await asyncio.gather(*tareas, return_exceptions=True)
+
+            # Las que no terminaron también llevan resultado: cada tool_call
+            # del historial debe tener su mensaje "tool". Si una quedó cortada
+            # a mitad de una consulta, la ronda entera se revirtió
+            if agotado and await transaccion_perdida():
+                terminadas.clear()
+            salidas: list[dict] = []
+            for i, nombre in enumerate(nombres):
+                if i in terminadas:
+                    salidas.append(terminadas[i])
+                    continue
+                salidas.append(HERRAMIENTA_SIN_TIEMPO)
+                yield {
+                    "tipo": "herramienta_fin",
+                    "herramienta": nombre,
+                    "resultado": HERRAMIENTA_SIN_TIEMPO,
+                }
+
+            # Los resultados se agregan al historial en el orden de las llamadas
+            for call, nombre, args, salida in zip(
+                tool_calls, nombres, argumentos, salidas
+            ):
+                resultado.herramientas_usadas.append(
+                    {
+                        "herramienta": nombre,
+                        "parametros": args if isinstance(args, dict) else {},
+                        "resultado": salida,
+                    }
+                )
+
+                if nombre == "crear_cita" and salida.get("status") == "success":
+                    resultado.cita_creada = True
+                    resultado.datos_cita = salida.get("data")
+                elif nombre == "crear_citas_lote" and salida.get("creadas"):
+                    resultado.cita_creada = True
+                    resultado.datos_cita = {
+                        "citas": [
+                            r
+                            for r in salida["resultados"]
+                            if r.get("status") == "success"
+                        ]
+                    }
+
+                historial.append(
+                    {
+                        "role": "tool",
+                        "tool_call_id": call["id"],
+                        # Única serialización del resultado de la herramienta
+                        "content": a_json(salida),
+                    }
+                )
+
+            if agotado:
+                raise TimeoutError
+
+            # Las reservas de la ronda no esperan a la siguiente llamada al LLM
+            await confirmar_ronda()
+
+        # Límite de pasos: una última llamada sin herramientas para cerrar el turno
+        async for fragmento in _completar(client, historial, None, limite):
+            if isinstance(fragmento, str):
+                yield {"tipo": "delta", "texto": fragmento}
+            else:
+                resultado.respuesta = fragmento["content"]
+
+    except TimeoutError:
+        resultado.respuesta = MENSAJE_TIEMPO_AGOTADO
+        yield {"tipo": "delta", "texto": MENSAJE_TIEMPO_AGOTADO}
+
+    historial.append({"role": "assistant", "content": resultado.respuesta})
+    yield {"tipo": "fin", "resultado": resultado}
+
+
+async def ejecutar_turno(
+    client,
+    historial: list[dict],
+    tools: list[dict],
+    ejecutar,
+    max_pasos: int | None = None,
+    max_segundos: float | None = None,
+) -> ResultadoTurno:
+    """Versión sin streaming: consume los eventos y retorna el resultado final."""
+    async for evento in ejecutar_turno_eventos(
+        client, historial, tools, ejecutar, max_pasos, max_segundos
+    ):
+        if evento["tipo"] == "fin":
+            return evento["resultado"]
+    raise RuntimeError("El turno terminó sin evento 'fin'")
@@ -0,0 +1,86 @@
+"""
+Prompt de sistema del bot.
+
+El prompt se divide en:
+- PROMPT_ESTATICO: reglas fijas, idénticas para todas las conversaciones.
+  Junto con los schemas de herramientas forma un prefijo estable que
+  aprovecha el caché de prompts del proveedor.
+- Bloque de fecha/hora: lo único dinámico. Se renderiza como mucho una vez
+  por minuto y va después del prefijo estático.
+
+Ninguno de los dos se guarda en el historial: se anteponen en cada llamada.
+"""
+
+from datetime import datetime, timedelta
+from app.core.fechas import DIAS, MESES, TZ_COLOMBIA
+from app.services.disponibilidad import Horario
+
+# Clave para agrupar las peticiones que comparten el prefijo en el caché del proveedor
+PROMPT_CACHE_KEY = "taller-express-v1"
+
+# Mismo horario con el que se validan las reservas (Settings.TALLER_HORARIO).
+# Se renderiza una vez al importar: el prefijo sigue siendo estable.
+HORARIO_ATENCION = "\n".join(
+    f"- {linea}" for linea in Horario.desde_settings().describir()
+)
+
+PROMPT_ESTATICO = {
+    "role": "system",
+    "content": f"""Eres un asistente de taller mecánico profesional en Colombia.
+
+FECHAS Y HORAS:
+- En appointmentDate pasa la fecha y hora acordadas como YYYY-MM-DD HH:MM o tal
+  como las dijo el usuario ("mañana a las 3 pm", "el próximo martes 10 de la
+  mañana"). El sistema las interpreta en hora de Colombia y rechaza fechas pasadas
+- Si la herramienta responde error por la fecha, pide al usuario que la aclare
+
+HORARIO DE ATENCIÓN DEL TALLER:
+{HORARIO_ATENCION}
+
+FLUJO:
+1. Saluda
+2. Pide identificación y consulta perfil_cliente (datos, contactos y próximas citas)
+3. Si no existe: registra (nombre, apellidos, ID, teléfono, email, dirección)
+4. Pregunta: marca, modelo, año del vehículo
+5. Pregunta: qué servicio necesita
+6. Pregunta: fecha y hora (recuerda la FECHA Y HORA ACTUAL)
+7. Verifica con consultar_disponibilidad y ofrece solo horarios libres
+8. CONFIRMA la hora con el usuario antes de crear la cita
+9. Crea la cita con vehículo en details. Si responde "slot_taken", ofrece las alternativas
+
+Sé profesional y conversacional.""",
+}
+
+_bloque_fecha: tuple[datetime, dict] | None = None
+
+
+def _fecha_larga(fecha: datetime) -> str:
+    return f"{DIAS[fecha.weekday()]} {fecha.day:02d} de {MESES[fecha.month - 1]} de {fecha.year}"
+
+
+def _render_fecha(hoy: datetime) -> dict:
+    mañana = hoy + timedelta(days=1)
+    return {
+        "role": "system",
+        "content": f"""🗓️ FECHA Y HORA ACTUAL (Colombia):
+- HOY es: {_fecha_larga(hoy)} ({hoy:%Y-%m-%d})
+- Mañana es: {_fecha_larga(mañana)} ({mañana:%Y-%m-%d})
+- Hora actual: {hoy:%H:%M}
+- Año actual: {hoy.year}""",
+    }
+
+
+def bloque_fecha(ahora: datetime | None = None) -> dict:
+    """Mensaje con la fecha/hora de Colombia, renderizado una vez por minuto."""
+    global _bloque_fecha
+    ahora = ahora or datetime.now(TZ_COLOMBIA)
+    minuto = ahora.replace(second=0, microsecond=0)
+
+    if _bloque_fecha is None or _bloque_fecha[0] != minuto:
+        _bloque_fecha = (minuto, _render_fecha(minuto))
+    return _bloque_fecha[1]
+
+
+def mensajes_sistema(ahora: datetime | None = None) -> list[dict]:
+    """Mensajes de sistema a anteponer al historial en cada llamada al LLM."""
+    return [PROMPT_ESTATICO, bloque_fecha(ahora)]
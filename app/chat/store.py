@@ -0,0 +1,154 @@
+"""
+Almacenes de historial de conversaciones para el endpoint /chat.
+
+- MemoryConversationStore: por proceso, acotado con LRU + TTL.
+- SQLConversationStore: compartido entre workers usando la base de datos.
+"""
+
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from functools import lru_cache
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from app.core.lru import LRUTTL
+from app.db import config
+from app.db.connect import settings
+from app.models.modelos import Conversation
+
+
+class ConversationStore(ABC):
+    """Interfaz común de los almacenes de conversaciones."""
+
+    def new_id(self) -> str:
+        # uuid4: único entre workers sin coordinación
+        return f"conv_{uuid.uuid4().hex}"
+
+    @abstractmethod
+    async def get(self, conv_id: str) -> list[dict] | None:
+        """Retorna el historial o None si no existe o expiró."""
+
+    @abstractmethod
+    async def save(self, conv_id: str, mensajes: list[dict]) -> None:
+        """Guarda (o reemplaza) el historial y renueva su TTL."""
+
+    @abstractmethod
+    async def delete(self, conv_id: str) -> bool:
+        """Elimina la conversación. Retorna False si no existía."""
+
+    @abstractmethod
+    async def list_ids(self) -> list[str]:
+        """IDs de las conversaciones activas."""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Número de conversaciones activas."""
+
+
+class MemoryConversationStore(ConversationStore):
+    def __init__(self, max_items: int, ttl: float, reloj=time.monotonic):
+        self._datos = LRUTTL(max_items, ttl, reloj)
+
+    async def get(self, conv_id: str) -> list[dict] | None:
+        mensajes = self._datos.get(conv_id)
+        return list(mensajes) if mensajes is not None else None
+
+    async def save(self, conv_id: str, mensajes: list[dict]) -> None:
+        self._datos.set(conv_id, list(mensajes))
+
+    async def delete(self, conv_id: str) -> bool:
+        return self._datos.pop(conv_id)
+
+    async def list_ids(self) -> list[str]:
+        return self._datos.keys()
+
+    async def count(self) -> int:
+        return len(self._datos)
+
+
+class SQLConversationStore(ConversationStore):
+    """Historial en la tabla Conversation; la expiración usa la hora de la DB."""
+
+    def __init__(self, ttl: float, limite_ids: int = 100):
+        self.ttl = timedelta(seconds=ttl)
+        self.limite_ids = limite_ids
+        self._tabla_lista = False
+        self._ultima_purga = 0.0
+
+    async def _preparar(self):
+        if not self._tabla_lista:
+            async with config.async_engine.begin() as conn:
+                await conn.run_sync(Conversation.__table__.create, checkfirst=True)
+            self._tabla_lista = True
+
+    def _vigente(self):
+        return Conversation.updatedAt > func.now() - self.ttl
+
+    async def get(self, conv_id: str) -> list[dict] | None:
+        await self._preparar()
+        async with config.AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(Conversation.mensajes).where(
+                    Conversation.id == conv_id, self._vigente()
+                )
+            )
+
+    async def save(self, conv_id: str, mensajes: list[dict]) -> None:
+        await self._preparar()
+        stmt = insert(Conversation).values(
+            id=conv_id, mensajes=mensajes, updatedAt=func.now()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Conversation.id],
+            set_={"mensajes": stmt.excluded.mensajes, "updatedAt": func.now()},
+        )
+        async with config.AsyncSessionLocal() as db:
+            await db.execute(stmt)
+            await self._purgar(db)
+            await db.commit()
+
+    async def delete(self, conv_id: str) -> bool:
+        await self._preparar()
+        async with config.AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(Conversation).where(Conversation.id == conv_id)
+            )
+            await db.commit()
+            return result.rowcount > 0
+
+    async def list_ids(self) -> list[str]:
+        await self._preparar()
+        async with config.AsyncSessionLocal() as db:
+            result = await db.scalars(
+                select(Conversation.id)
+                .where(self._vigente())
+                .order_by(Conversation.updatedAt.desc())
+                .limit(self.limite_ids)
+            )
+            return list(result)
+
+    async def count(self) -> int:
+        await self._preparar()
+        async with config.AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(func.count()).select_from(Conversation).where(self._vigente())
+            )
+
+    async def _purgar(self, db):
+        # Como mucho una purga cada 10% del TTL por proceso
+        ahora = time.monotonic()
+        if ahora - self._ultima_purga < self.ttl.total_seconds() / 10:
+            return
+        self._ultima_purga = ahora
+        await db.execute(
+            delete(Conversation).where(Conversation.updatedAt <= func.now() - self.ttl)
+        )
+
+
+@lru_cache
+def get_store() -> ConversationStore:
+    """Almacén configurado en Settings (CONVERSATION_STORE)."""
+    if settings.CONVERSATION_STORE == "sql":
+        return SQLConversationStore(settings.CONVERSATION_TTL)
+    return MemoryConversationStore(settings.CONVERSATION_MAX, settings.CONVERSATION_TTL)
@@ -0,0 +1,244 @@
+"""
+Interpretación de fechas de cita en hora de Colombia.
+
+Acepta lo que el usuario (o el modelo) escribe, sin pasar por el prompt:
+- ISO: 2025-12-01 15:00, 2025-12-01T15:00:00, con o sin zona horaria.
+- Numérico colombiano (día/mes/año): 01/12/2025, 1-12-25, 01/12.
+- En palabras: "15 de marzo", "martes 15 de marzo de 2026".
+- Relativo: hoy, mañana, pasado mañana, "el próximo martes", "en 3 días".
+- Hora: 15:00, 3 pm, 3:30 p. m., "3 de la tarde", "10 y media", mediodía.
+  Sin am/pm, de 1 a 7 es de la tarde ("a las 3" → 15:00): el taller abre a
+  las 8. Con cero inicial ("03:00") se toma como 24 horas.
+
+El resultado es la hora local de Bogotá sin tzinfo, como se guarda en la
+base. Las fechas pasadas se rechazan; a una fecha sin año se le asume la
+próxima ocurrencia.
+
+El análisis del texto (regex precompiladas) no depende de la hora actual y
+se cachea por texto normalizado; solo la resolución contra "hoy" se hace
+en cada llamada.
+"""
+
+import re
+import unicodedata
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import NamedTuple
+import pytz
+
+TZ_COLOMBIA = pytz.timezone("America/Bogota")
+
+DIAS = ("lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo")
+MESES = (
+    "enero",
+    "febrero",
+    "marzo",
+    "abril",
+    "mayo",
+    "junio",
+    "julio",
+    "agosto",
+    "septiembre",
+    "octubre",
+    "noviembre",
+    "diciembre",
+)
+
+
+class FechaInvalida(ValueError):
+    """El texto no es una fecha de cita válida (el mensaje va al usuario)."""
+
+
+def _sin_tildes(texto: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c)
+    )
+
+
+_DIA_SEMANA = {_sin_tildes(d): i for i, d in enumerate(DIAS)}
+_MES = {_sin_tildes(m): i for i, m in enumerate(MESES, start=1)} | {"setiembre": 9}
+
+# ==================== EXPRESIONES (PRECOMPILADAS) ====================
+
+_ISO = re.compile(
+    r"\d{4}-\d{2}-\d{2}(?:[t ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:z|[+-]\d{2}:?\d{2})?"
+)
+_MERIDIANO = re.compile(r"(?<![a-z])([ap])\.?\s?m\b\.?")
+_HORA = re.compile(
+    r"(?:\ba\s+las?\s+)?(?<![\d/-])(?P<h>\d{1,2})"
+    r"(?::(?P<m>\d{2})(?::(?P<s>\d{2}))?)?(?![\d/-])"
+    r"(?:\s+y\s+(?P<fraccion>media|cuarto))?"
+    r"(?:\s*(?P<ampm>am|pm)\b|\s+(?:de|en|por)\s+la\s+(?P<franja>manana|tarde|noche))?"
+)
+_HORA_NOMBRE = re.compile(r"(?:\ba\s+la?s?\s+|\bal\s+)?\b(mediodia|medianoche)\b")
+_FECHA_ISO = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_FECHA_NUMERICA = re.compile(r"\b(\d{1,2})[/-](\d{1,2})(?:[/-](\d{4}|\d{2}))?\b")
+_FECHA_TEXTO = re.compile(
+    r"\b(\d{1,2})\s+de\s+(" + "|".join(_MES) + r")\b(?:\s+(?:de|del)\s+(\d{4}))?"
+)
+_RELATIVA = re.compile(r"\b(pasado\s+manana|manana|hoy)\b")
+_EN_DIAS = re.compile(r"\b(?:en|dentro\s+de)\s+(\d{1,3})\s+dias?\b")
+_DIA = re.compile(
+    r"\b(?:(proximo|siguiente|este)\s+)?(" + "|".join(_DIA_SEMANA) + r")\b"
+    r"(?:\s+(que\s+viene|proximo|siguiente))?"
+)
+# Lo que puede sobrar alrededor de la fecha y la hora sin cambiar su sentido
+_RELLENO = re.compile(r"\b(?:el|la|las|los|para|de|del|a|en|y|dia|hora)\b|[,.]")
+
+_OFFSET = {"hoy": 0, "manana": 1, "pasado manana": 2}
+
+
+class _Patron(NamedTuple):
+    """Lo que dice el texto, sin resolver contra la fecha de hoy."""
+
+    anio: int | None = None
+    mes: int | None = None
+    dia: int | None = None
+    en_dias: int | None = None
+    dia_semana: int | None = None
+    proximo: bool = False  # "el próximo martes": nunca hoy
+    hora: time | None = None
+
+
+def _normalizar(texto: str) -> str:
+    texto = " ".join(_sin_tildes(texto).lower().split())
+    return _MERIDIANO.sub(r"\1m", texto)
+
+
+def _hora(m: re.Match) -> time | None:
+    """Hora de un match de _HORA; None si es solo un número suelto."""
+    h, minutos = int(m["h"]), int(m["m"] or 0)
+    if m["fraccion"]:
+        minutos = 30 if m["fraccion"] == "media" else 15
+    explicita = m["m"] or m["fraccion"] or m["ampm"] or m["franja"]
+    if not (explicita or m.group(0).startswith("a ")):
+        return None  # "15" en "15 de marzo" es el día, no la hora
+
+    tarde = m["ampm"] == "pm" or m["franja"] in ("tarde", "noche")
+    if m["ampm"] or m["franja"]:
+        if not 1 <= h <= 12:
+            raise FechaInvalida(f"Hora inválida: {m.group(0).strip()}")
+        if h == 12:
+            h = 0 if m["ampm"] == "am" or m["franja"] == "noche" else 12
+        elif tarde:
+            h += 12
+    elif 1 <= h <= 7 and not m["h"].startswith("0"):
+        h += 12  # "a las 3": nadie agenda a las 3 de la madrugada
+    if h > 23 or minutos > 59:
+        raise FechaInvalida(f"Hora inválida: {m.group(0).strip()}")
+    return time(h, minutos, int(m["s"] or 0))
+
+
+def _extraer_hora(texto: str) -> tuple[time | None, str]:
+    if m := _HORA_NOMBRE.search(texto):
+        hora = time(12) if m[1] == "mediodia" else time(0)
+        return hora, texto[: m.start()] + " " + texto[m.end() :]
+    for m in _HORA.finditer(texto):
+        if (hora := _hora(m)) is not None:
+            return hora, texto[: m.start()] + " " + texto[m.end() :]
+    return None, texto
+
+
+def _extraer_fecha(texto: str) -> tuple[dict, str]:
+    if m := _FECHA_ISO.search(texto):
+        campos = dict(anio=int(m[1]), mes=int(m[2]), dia=int(m[3]))
+    elif m := _FECHA_TEXTO.search(texto):
+        anio = int(m[3]) if m[3] else None
+        campos = dict(anio=anio, mes=_MES[m[2]], dia=int(m[1]))
+    elif m := _FECHA_NUMERICA.search(texto):
+        anio = int(m[3]) if m[3] else None
+        if anio is not None and anio < 100:
+            anio += 2000
+        campos = dict(anio=anio, mes=int(m[2]), dia=int(m[1]))
+    elif m := _EN_DIAS.search(texto):
+        campos = dict(en_dias=int(m[1]))
+    elif m := _RELATIVA.search(texto):
+        campos = dict(en_dias=_OFFSET[" ".join(m[1].split())])
+    elif m := _DIA.search(texto):
+        return (
+            dict(
+                dia_semana=_DIA_SEMANA[m[2]],
+                proximo=bool(m[1] or m[3]) and m[1] != "este",
+            ),
+            texto[: m.start()] + " " + texto[m.end() :],
+        )
+    else:
+        return {}, texto
+
+    resto = texto[: m.start()] + " " + texto[m.end() :]
+    # "martes 15 de marzo": el día de la semana acompaña a la fecha explícita
+    if "mes" in campos and (d := _DIA.search(resto)) and not d[1] and not d[3]:
+        campos["dia_semana"] = _DIA_SEMANA[d[2]]
+        resto = resto[: d.start()] + " " + resto[d.end() :]
+    return campos, resto
+
+
+@lru_cache(maxsize=1024)
+def _analizar(texto: str) -> _Patron:
+    """Texto normalizado → _Patron. Cacheado: no depende de la hora actual."""
+    if _ISO.fullmatch(texto):
+        iso = datetime.fromisoformat(texto.upper().replace("Z", "+00:00"))
+        if iso.tzinfo is not None:
+            iso = iso.astimezone(TZ_COLOMBIA).replace(tzinfo=None)
+        hora = iso.time() if len(texto) > 10 else None
+        return _Patron(iso.year, iso.month, iso.day, hora=hora)
+
+    hora, resto = _extraer_hora(texto)
+    campos, resto = _extraer_fecha(resto)
+    if (hora is None and not campos) or _RELLENO.sub(" ", resto).strip():
+        raise FechaInvalida(
+            f"No se reconoce la fecha '{texto}'. Usa YYYY-MM-DD HH:MM "
+            "o expresiones como 'mañana a las 3 pm'"
+        )
+    return _Patron(hora=hora, **campos)
+
+
+def _resolver(patron: _Patron, hoy: date) -> date:
+    if patron.en_dias is not None:
+        return hoy + timedelta(days=patron.en_dias)
+    if patron.mes is None and patron.dia_semana is not None:
+        dias = (patron.dia_semana - hoy.weekday()) % 7
+        return hoy + timedelta(days=dias or (7 if patron.proximo else 0))
+    if patron.mes is None or patron.dia is None:
+        return hoy  # solo la hora: hoy
+
+    try:
+        fecha = date(patron.anio or hoy.year, patron.mes, patron.dia)
+        if patron.anio is None and fecha < hoy:
+            fecha = fecha.replace(year=hoy.year + 1)
+    except ValueError:
+        raise FechaInvalida(f"La fecha {patron.dia}/{patron.mes} no existe") from None
+
+    if patron.dia_semana not in (None, fecha.weekday()):
+        raise FechaInvalida(
+            f"El {fecha:%Y-%m-%d} es {DIAS[fecha.weekday()]}, "
+            f"no {DIAS[patron.dia_semana]}"
+        )
+    return fecha
+
+
+def ahora_colombia() -> datetime:
+    """Hora actual de Bogotá, sin tzinfo (como se guarda en la base)."""
+    return datetime.now(TZ_COLOMBIA).replace(tzinfo=None)
+
+
+def interpretar_fecha(texto: str, ahora: datetime | None = None) -> datetime:
+    """Fecha y hora de una cita a partir de texto libre, en hora de Bogotá.
+
+    `ahora` (por defecto la hora actual de Bogotá) resuelve lo relativo; si
+    trae tzinfo se convierte a Bogotá. Lanza FechaInvalida si el texto no se
+    reconoce, no trae hora o la fecha ya pasó.
+    """
+    if ahora is None:
+        ahora = ahora_colombia()
+    elif ahora.tzinfo is not None:
+        ahora = ahora.astimezone(TZ_COLOMBIA).replace(tzinfo=None)
+
+    patron = _analizar(_normalizar(texto))
+    if patron.hora is None:
+        raise FechaInvalida("Falta la hora de la cita (por ejemplo 10:00 o 3 pm)")
+
+    fecha = datetime.combine(_resolver(patron, ahora.date()), patron.hora)
+    if fecha < ahora:
+        raise FechaInvalida(f"La fecha {fecha:%Y-%m-%d %H:%M} ya pasó")
+    return fecha
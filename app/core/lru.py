@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUTTL:
+    """Diccionario acotado con expulsión LRU y expiración por TTL.
+
+    Por defecto el TTL es deslizante: cada lectura renueva la expiración y
+    mueve la clave al final. Con `deslizante=False` la expiración queda fija
+    desde el `set` y las lecturas no reordenan (la expulsión es por orden de
+    escritura). En ambos casos el orden coincide con el de expiración y la
+    purga solo mira el frente.
+    """
+
+    def __init__(
+        self, max_items: int, ttl: float, reloj=time.monotonic, deslizante=True
+    ):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.deslizante = deslizante
+        self._reloj = reloj
+        self._datos: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave, default=None):
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is None:
+                return default
+
+            ahora = self._reloj()
+            if item[0] <= ahora:
+                del self._datos[clave]
+                return default
+
+            if not self.deslizante:
+                return item[1]
+            self._datos[clave] = (ahora + self.ttl, item[1])
+            self._datos.move_to_end(clave)
+            return item[1]
+
+    def set(self, clave, valor):
+        with self._lock:
+            ahora = self._reloj()
+            self._datos[clave] = (ahora + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            self._purgar(ahora)
+
+    def pop(self, clave) -> bool:
+        with self._lock:
+            return self._datos.pop(clave, None) is not None
+
+    def keys(self) -> list:
+        with self._lock:
+            self._purgar(self._reloj())
+            return list(self._datos.keys())
+
+    def __len__(self):
+        with self._lock:
+            self._purgar(self._reloj())
+            return len(self._datos)
+
+    def _purgar(self, ahora: float):
+        while self._datos:
+            expira, _ = next(iter(self._datos.values()))
+            if expira > ahora and len(self._datos) <= self.max_items:
+                break
+            self._datos.popitem(last=False)
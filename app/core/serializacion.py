@@ -0,0 +1,28 @@
+"""
+Serialización JSON en los bordes.
+
+Los servicios y herramientas retornan dicts; se convierten a texto una sola
+vez, al salir: mensaje `tool` para el LLM, eventos SSE y líneas NDJSON.
+
+Usa orjson si está instalado (`pip install orjson`) y, si no, el módulo json
+estándar. Ambos producen la misma salida compacta (sin espacios, UTF-8 sin
+escapar) y convierten fechas y otros tipos con str().
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+if orjson is not None:
+    _OPCIONES = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def a_json(datos) -> str:
+        return orjson.dumps(datos, default=str, option=_OPCIONES).decode()
+
+else:
+
+    def a_json(datos) -> str:
+        return json.dumps(datos, ensure_ascii=False, default=str, separators=(",", ":"))
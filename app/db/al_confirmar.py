@@ -0,0 +1,70 @@
+"""
+Datos diferidos hasta el commit de la sesión.
+
+Los cachés en memoria (disponibilidad, clientes) solo deben enterarse de un
+cambio cuando se confirma: si lo aplicaran antes, otra petición podría ver
+un dato que después se revierte.
+
+`diferir(db, tipo, dato)` anota el dato junto con la transacción (o el
+SAVEPOINT) activa. Si esa transacción se revierte el dato se descarta; con
+el commit de la transacción exterior se entrega, agrupado por tipo, a la
+función registrada con `@al_confirmar(tipo)`. Mientras tanto
+`pendientes(db, tipo)` permite a quien lee saltarse el caché para los datos
+que la propia sesión cambió.
+"""
+
+from typing import Callable
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_PENDIENTES = "pendientes_al_confirmar"
+_ACCIONES: dict[str, Callable[[list], None]] = {}
+
+
+def al_confirmar(tipo: str):
+    """Registra la función que recibe los datos de `tipo` tras cada commit."""
+
+    def decorador(funcion):
+        _ACCIONES[tipo] = funcion
+        return funcion
+
+    return decorador
+
+
+def diferir(db: Session, tipo: str, dato) -> None:
+    transaccion = db.get_nested_transaction() or db.get_transaction()
+    db.info.setdefault(_PENDIENTES, []).append((transaccion, tipo, dato))
+
+
+def pendientes(db: Session, tipo: str) -> list:
+    """Datos de `tipo` anotados en la sesión y aún sin confirmar."""
+    return [dato for _, t, dato in db.info.get(_PENDIENTES, ()) if t == tipo]
+
+
+def _desciende(transaccion, ancestro) -> bool:
+    while transaccion is not None:
+        if transaccion is ancestro:
+            return True
+        transaccion = transaccion.parent
+    return False
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar(session, revertida):
+    anotados = session.info.get(_PENDIENTES)
+    if anotados:
+        session.info[_PENDIENTES] = [
+            a for a in anotados if not _desciende(a[0], revertida)
+        ]
+
+
+@event.listens_for(Session, "after_commit")
+def _entregar(session):
+    if session.in_nested_transaction():
+        return  # savepoint liberado: se entrega con el commit exterior
+
+    por_tipo: dict[str, list] = {}
+    for _, tipo, dato in session.info.pop(_PENDIENTES, []):
+        por_tipo.setdefault(tipo, []).append(dato)
+    for tipo, datos in por_tipo.items():
+        _ACCIONES[tipo](datos)
@@ -1,27 +1,146 @@
-import os
+"""
+Motores y fábricas de sesiones, construidos en el primer uso.
+
+Importar este módulo no valida la configuración ni crea motores: eso ocurre
+en `get_engine()` / `get_async_engine()` (o en el lifespan de la API). Así
+las pruebas, los procesos hijos y el servidor MCP solo pagan lo que usan, y
+un .env incompleto falla con un mensaje claro al conectarse, no al importar.
+
+Los nombres de siempre (`engine`, `async_engine`, `SessionLocal`,
+`AsyncSessionLocal`) siguen disponibles como atributos perezosos del módulo;
+dentro de la app se usan las fábricas en el momento de abrir la sesión.
+"""
+
+from functools import lru_cache
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.db.connect import settings
+from app.db.pool_metrics import estado_pool, escuchar_eventos, pool_con_metricas
+from app.observability import instrumentar_engine
+
+
+def _opciones_engine(poolclass) -> dict:
+    """Parámetros comunes de ambos motores, tomados de Settings."""
+    return {
+        "poolclass": poolclass,
+        "pool_pre_ping": True,
+        "echo": settings.DB_ECHO,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
+# Las métricas viven fuera de los motores: /metrics las lee aunque no existan
+_pool_sync, metricas_pool = pool_con_metricas()
+_pool_async, metricas_pool_async = pool_con_metricas(async_=True)
+
+
+# ==== Motor síncrono (psycopg2): MCP y scripts ====
+@lru_cache
+def get_engine():
+    settings.validate()
+    connect_args = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = (
+            f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        )
+
+    motor = create_engine(
+        str(settings.DATABASE_URL),
+        connect_args=connect_args,
+        **_opciones_engine(_pool_sync),
+    )
+    escuchar_eventos(motor, metricas_pool)
+    instrumentar_engine(motor)
+    return motor
+
+
+@lru_cache
+def get_sessionmaker() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+# ==== Motor asíncrono (asyncpg) sobre la misma base de datos, para /chat ====
+@lru_cache
+def get_async_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine
 
-settings.validate()
+    settings.validate()
+    connect_args = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {
+            "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)
+        }
 
-engine = create_engine(
-    str(settings.DATABASE_URL),
-    pool_pre_ping=True,
-    echo=True,
-    pool_size=5,
-    max_overflow=10,
-)
+    motor = create_async_engine(
+        make_url(str(settings.DATABASE_URL)).set(drivername="postgresql+asyncpg"),
+        connect_args=connect_args,
+        **_opciones_engine(_pool_async),
+    )
+    escuchar_eventos(motor.sync_engine, metricas_pool_async)
+    instrumentar_engine(motor.sync_engine)
+    return motor
+
+
+@lru_cache
+def get_async_sessionmaker():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(
+        bind=get_async_engine(), autoflush=False, expire_on_commit=False
+    )
+
+
+_PEREZOSOS = {
+    "engine": get_engine,
+    "SessionLocal": get_sessionmaker,
+    "async_engine": get_async_engine,
+    "AsyncSessionLocal": get_async_sessionmaker,
+}
+
+
+def __getattr__(nombre: str):
+    # `from app.db.config import engine` construye el motor recién aquí
+    if nombre in _PEREZOSOS:
+        return _PEREZOSOS[nombre]()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
 def get_db():
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def cerrar_motores() -> None:
+    """Cierra los pools de los motores que llegaron a construirse."""
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+
+
+def estado_pools() -> dict:
+    """Ocupación y métricas de los pools de los motores ya construidos."""
+    estado = {}
+    if get_engine.cache_info().currsize:
+        estado["sync"] = estado_pool(get_engine(), metricas_pool)
+    if get_async_engine.cache_info().currsize:
+        estado["async"] = estado_pool(
+            get_async_engine().sync_engine, metricas_pool_async
+        )
+    return estado
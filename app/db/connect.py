@@ -7,6 +7,50 @@ load_dotenv()
 class Settings:
     DATABASE_URL: str | None = os.getenv("DATABASE_URL")
 
+    # Motor y pool de conexiones (se aplican a los motores sync y async)
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+    # Almacén de conversaciones: "memory" (por proceso) o "sql" (compartido)
+    CONVERSATION_STORE: str = os.getenv("CONVERSATION_STORE", "memory")
+    CONVERSATION_TTL: int = int(os.getenv("CONVERSATION_TTL", "3600"))
+    CONVERSATION_MAX: int = int(os.getenv("CONVERSATION_MAX", "1000"))
+
+    # Modelo y límites del bucle de herramientas por turno de /chat
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4.1")
+    CHAT_MAX_STEPS: int = int(os.getenv("CHAT_MAX_STEPS", "6"))
+    CHAT_MAX_SECONDS: float = float(os.getenv("CHAT_MAX_SECONDS", "60"))
+
+    # Compactación del historial enviado al LLM
+    CHAT_TOKEN_BUDGET: int = int(os.getenv("CHAT_TOKEN_BUDGET", "6000"))
+    CHAT_MAX_TURNS: int = int(os.getenv("CHAT_MAX_TURNS", "8"))
+    CHAT_TOOL_CHARS: int = int(os.getenv("CHAT_TOOL_CHARS", "400"))
+    CHAT_SUMMARY: str = os.getenv("CHAT_SUMMARY", "extractivo")
+
+    # Agenda del taller. Días: 0=lunes … 6=domingo; los que no aparecen, cerrado
+    TALLER_HORARIO: str = os.getenv("TALLER_HORARIO", "0-4=08:00-18:00,5=08:00-14:00")
+    TALLER_SLOT_MINUTOS: int = int(os.getenv("TALLER_SLOT_MINUTOS", "60"))
+    TALLER_CAPACIDAD: int = int(os.getenv("TALLER_CAPACIDAD", "1"))
+    TALLER_CAPACIDAD_EMPLEADO: int = int(os.getenv("TALLER_CAPACIDAD_EMPLEADO", "1"))
+    DISPONIBILIDAD_TTL: float = float(os.getenv("DISPONIBILIDAD_TTL", "60"))
+    # Espera máxima por el lock de un slot antes de responder slot_taken
+    SLOT_LOCK_TIMEOUT_MS: int = int(os.getenv("SLOT_LOCK_TIMEOUT_MS", "2000"))
+
+    # Caché de buscar_cliente: memory (por proceso), redis (compartido) o none
+    CLIENTES_CACHE: str = os.getenv("CLIENTES_CACHE", "memory")
+    CLIENTES_CACHE_MAX: int = int(os.getenv("CLIENTES_CACHE_MAX", "10000"))
+    CLIENTES_CACHE_TTL: float = float(os.getenv("CLIENTES_CACHE_TTL", "300"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # Trazas: fracción de turnos registrados y destino (jsonl | none)
+    TRACE_SAMPLE: float = float(os.getenv("TRACE_SAMPLE", "0.05"))
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "jsonl")
+    TRACE_FILE: str = os.getenv("TRACE_FILE", "trazas.jsonl")
+
     def validate(self):
         if not self.DATABASE_URL:
             raise ValueError("DATABASE_URL no está definida en el archivo .env")
@@ -14,5 +58,26 @@ class Settings:
         if not self.DATABASE_URL.startswith("postgresql://"):
             raise ValueError("DATABASE_URL debe comenzar con 'postgresql://'")
 
+        if self.DB_POOL_SIZE < 1 or self.DB_MAX_OVERFLOW < 0:
+            raise ValueError("DB_POOL_SIZE debe ser >= 1 y DB_MAX_OVERFLOW >= 0")
+
+        if self.CONVERSATION_STORE not in ("memory", "sql"):
+            raise ValueError("CONVERSATION_STORE debe ser 'memory' o 'sql'")
+
+        if self.TALLER_SLOT_MINUTOS < 1 or self.TALLER_CAPACIDAD < 1:
+            raise ValueError("TALLER_SLOT_MINUTOS y TALLER_CAPACIDAD deben ser >= 1")
+
+        if self.CLIENTES_CACHE not in ("memory", "redis", "none"):
+            raise ValueError("CLIENTES_CACHE debe ser 'memory', 'redis' o 'none'")
+
+        if not 0.0 <= self.TRACE_SAMPLE <= 1.0:
+            raise ValueError("TRACE_SAMPLE debe estar entre 0 y 1")
+
+        if self.TRACE_EXPORTER not in ("jsonl", "memoria", "none"):
+            raise ValueError("TRACE_EXPORTER debe ser 'jsonl', 'memoria' o 'none'")
+
+        if self.CHAT_SUMMARY not in ("extractivo", "none"):
+            raise ValueError("CHAT_SUMMARY debe ser 'extractivo' o 'none'")
+
 
 settings = Settings()
@@ -0,0 +1,149 @@
+"""
+Migraciones del esquema.
+
+Cada migración tiene un id ordenable y se registra en `schema_migrations`
+al aplicarse, así se ejecuta una sola vez por base de datos.
+
+Las migraciones no transaccionales (CREATE INDEX CONCURRENTLY) corren en
+autocommit para no bloquear escrituras sobre tablas en uso; por eso sus
+sentencias deben ser idempotentes (IF NOT EXISTS). Un CREATE INDEX
+CONCURRENTLY que falla o se interrumpe deja el índice marcado INVALID, e
+IF NOT EXISTS lo daría por hecho: antes de cada uno se borra el índice si
+quedó inválido.
+
+    python -m app.db.migrations            # aplica las pendientes
+    python -m app.db.migrations --estado   # lista aplicadas / pendientes
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import text
+from app.db import config
+from app.db.config import Base
+
+
+@dataclass(frozen=True)
+class Migracion:
+    id: str
+    descripcion: str
+    sentencias: tuple[str, ...] = ()
+    funcion: Callable | None = None
+    transaccional: bool = True
+
+
+def _esquema_inicial(conn):
+    import app.models.modelos  # noqa: F401  (registra las tablas en Base)
+
+    Base.metadata.create_all(conn, checkfirst=True)
+
+
+# Índices para los patrones de consulta reales (ver app/repository):
+# - listados de clientes activos paginados por id
+# - citas por cliente ordenadas por fecha / rangos de fechas (disponibilidad)
+# - contactos por cliente
+INDICES_CONSULTAS = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_client_activos_id "
+    'ON "Client" (id) WHERE "clientState" = true',
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cita_cliente_fecha "
+    'ON "AppointmentScheduling" ("clientId", "appointmentDate")',
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cita_fecha "
+    'ON "AppointmentScheduling" ("appointmentDate")',
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacto_cliente "
+    'ON "ClientContact" ("clientId")',
+)
+
+MIGRACIONES = (
+    Migracion(
+        "0001_esquema_inicial",
+        "Tablas a partir de los modelos",
+        funcion=_esquema_inicial,
+    ),
+    Migracion(
+        "0002_indices_consultas",
+        "Índices compuestos y parciales para las consultas frecuentes",
+        sentencias=INDICES_CONSULTAS,
+        transaccional=False,
+    ),
+)
+
+
+def _asegurar_tabla(conn):
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "id VARCHAR(100) PRIMARY KEY, "
+            "aplicada TIMESTAMP NOT NULL DEFAULT now())"
+        )
+    )
+
+
+def aplicadas(eng=None) -> set[str]:
+    eng = eng or config.engine
+    with eng.begin() as conn:
+        _asegurar_tabla(conn)
+        return set(conn.execute(text("SELECT id FROM schema_migrations")).scalars())
+
+
+def pendientes(eng=None) -> list[Migracion]:
+    hechas = aplicadas(eng)
+    return [m for m in MIGRACIONES if m.id not in hechas]
+
+
+_CREAR_INDICE = re.compile(r"CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)")
+
+
+def _borrar_si_invalido(conn, indice: str) -> None:
+    """Borra `indice` si quedó INVALID por un CREATE INDEX CONCURRENTLY fallido."""
+    invalido = conn.execute(
+        text(
+            "SELECT NOT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :indice AND pg_table_is_visible(c.oid)"
+        ),
+        {"indice": indice},
+    ).scalar()
+    if invalido:
+        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{indice}"'))
+
+
+def _ejecutar(conn, migracion: Migracion):
+    if migracion.funcion:
+        migracion.funcion(conn)
+    for sentencia in migracion.sentencias:
+        if m := _CREAR_INDICE.match(sentencia):
+            _borrar_si_invalido(conn, m[1])
+        conn.execute(text(sentencia))
+
+
+def aplicar(eng=None) -> list[str]:
+    """Aplica en orden las migraciones pendientes. Retorna los ids aplicados."""
+    eng = eng or config.engine
+    registrar = text("INSERT INTO schema_migrations (id) VALUES (:id)")
+    ids = []
+
+    for migracion in pendientes(eng):
+        if migracion.transaccional:
+            with eng.begin() as conn:
+                _ejecutar(conn, migracion)
+                conn.execute(registrar, {"id": migracion.id})
+        else:
+            with eng.connect() as conn:
+                conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                _ejecutar(conn, migracion)
+                conn.execute(registrar, {"id": migracion.id})
+        ids.append(migracion.id)
+
+    return ids
+
+
+if __name__ == "__main__":
+    if "--estado" in sys.argv:
+        hechas = aplicadas()
+        for m in MIGRACIONES:
+            marca = "✅" if m.id in hechas else "⏳"
+            print(f"{marca} {m.id}  {m.descripcion}")
+    else:
+        ids = aplicar()
+        print("\n".join(f"✅ {i}" for i in ids) or "Sin migraciones pendientes")
@@ -0,0 +1,118 @@
+"""
+Métricas del pool de conexiones.
+
+Permiten distinguir si la latencia de /chat viene de esperar una conexión
+libre (pool agotado) o de la base de datos en sí. Se miden:
+- checkouts y tiempo de espera para obtener una conexión,
+- checkouts servidos con conexiones de overflow y pico de overflow,
+- timeouts del pool, conexiones nuevas e invalidaciones.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.observability.metricas import acumular
+from app.observability.trazas import registrar
+
+
+@dataclass
+class MetricasPool:
+    checkouts: int = 0
+    checkouts_overflow: int = 0
+    espera_total: float = 0.0
+    espera_max: float = 0.0
+    overflow_max: int = 0
+    timeouts: int = 0
+    conexiones_creadas: int = 0
+    invalidaciones: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def registrar_checkout(self, espera: float, overflow: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+            if overflow > 0:
+                self.checkouts_overflow += 1
+                self.overflow_max = max(self.overflow_max, overflow)
+
+    def to_dict(self) -> dict:
+        promedio = self.espera_total / self.checkouts if self.checkouts else 0.0
+        return {
+            "checkouts": self.checkouts,
+            "checkouts_overflow": self.checkouts_overflow,
+            "espera_total_ms": round(self.espera_total * 1000, 3),
+            "espera_promedio_ms": round(promedio * 1000, 3),
+            "espera_max_ms": round(self.espera_max * 1000, 3),
+            "overflow_max": self.overflow_max,
+            "timeouts": self.timeouts,
+            "conexiones_creadas": self.conexiones_creadas,
+            "invalidaciones": self.invalidaciones,
+        }
+
+
+class _PoolConMetricas(QueuePool):
+    """Mide cuánto tarda cada checkout en obtener una conexión.
+
+    Va antes del pool concreto en las bases (ver `pool_con_metricas`), así
+    `super()._do_get()` llega a QueuePool o a AsyncAdaptedQueuePool.
+    """
+
+    metricas: MetricasPool
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            self.metricas.timeouts += 1
+            raise
+        espera = time.perf_counter() - inicio
+        self.metricas.registrar_checkout(espera, self.overflow())
+        acumular("db", espera)
+        registrar("db.checkout", espera, overflow=max(self.overflow(), 0))
+        return conexion
+
+
+def pool_con_metricas(async_: bool = False) -> tuple[type, MetricasPool]:
+    """Crea una clase de pool con su propio objeto de métricas.
+
+    La métrica vive en la clase (no en la instancia) para sobrevivir a
+    `pool.recreate()`, que instancia `self.__class__`.
+    """
+    metricas = MetricasPool()
+    base = AsyncAdaptedQueuePool if async_ else QueuePool
+    clase = type(
+        f"{base.__name__}ConMetricas", (_PoolConMetricas, base), {"metricas": metricas}
+    )
+    return clase, metricas
+
+
+def escuchar_eventos(engine, metricas: MetricasPool) -> None:
+    """Cuenta conexiones nuevas e invalidaciones a partir de los eventos del pool."""
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        metricas.conexiones_creadas += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        metricas.invalidaciones += 1
+
+    @event.listens_for(engine, "soft_invalidate")
+    def _soft_invalidate(dbapi_connection, connection_record, exception):
+        metricas.invalidaciones += 1
+
+
+def estado_pool(engine, metricas: MetricasPool) -> dict:
+    """Foto del pool: ocupación actual más los contadores acumulados."""
+    pool = engine.pool
+    return {
+        "tamaño": pool.size(),
+        "en_uso": pool.checkedout(),
+        "disponibles": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        **metricas.to_dict(),
+    }
@@ -0,0 +1,151 @@
+"""
+Unidad de trabajo por petición.
+
+Un turno de /chat abre una `unidad_de_trabajo()`: todas las herramientas
+que el modelo ejecute en ese turno comparten la misma AsyncSession (una
+sola conexión del pool). Lo hecho en cada ronda de herramientas se confirma
+(`confirmar_ronda`) antes de volver a llamar al modelo, para no retener los
+locks de los slots mientras el LLM responde; el resto se confirma al final.
+Si el turno falla, se revierte lo que no se haya confirmado. El commit y el
+rollback finales toman el lock de la unidad, igual que las herramientas.
+
+Cada herramienta corre dentro de un SAVEPOINT: si devuelve un resultado con
+status "error" o lanza una excepción, solo se deshace su parte.
+
+Una AsyncSession no admite operaciones concurrentes, así que las
+herramientas que el modelo pide en paralelo se serializan al tocar la base
+de datos (la espera del LLM sigue siendo lo dominante en un turno).
+
+Los repositorios y servicios nunca hacen commit: solo `flush`.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import config
+
+
+class UnidadDeTrabajo:
+    def __init__(self, sesion: AsyncSession):
+        self.sesion = sesion
+        self.lock = asyncio.Lock()
+        self.operaciones = 0
+        self.revertidas = 0
+
+
+_actual: ContextVar[UnidadDeTrabajo | None] = ContextVar(
+    "unidad_de_trabajo", default=None
+)
+
+
+def unidad_actual() -> UnidadDeTrabajo | None:
+    return _actual.get()
+
+
+@asynccontextmanager
+async def unidad_de_trabajo():
+    """Abre (o reutiliza, si ya hay una activa) la unidad de trabajo del contexto."""
+    existente = _actual.get()
+    if existente is not None:
+        yield existente
+        return
+
+    async with config.AsyncSessionLocal() as sesion:
+        uow = UnidadDeTrabajo(sesion)
+        token = _actual.set(uow)
+        try:
+            yield uow
+            async with uow.lock:
+                await sesion.commit()
+        except BaseException:
+            async with uow.lock:
+                await sesion.rollback()
+            raise
+        finally:
+            _actual.reset(token)
+
+
+async def confirmar_ronda() -> None:
+    """Confirma lo hecho hasta ahora en la unidad de trabajo activa (si hay una)."""
+    uow = _actual.get()
+    if uow is None:
+        return
+    async with uow.lock:
+        if uow.sesion.in_transaction():
+            await uow.sesion.commit()
+
+
+async def transaccion_perdida() -> bool:
+    """True si lo no confirmado de la unidad activa se perdió (y se revirtió).
+
+    Cancelar una herramienta a mitad de una consulta invalida la conexión
+    (SQLAlchemy la descarta): lo hecho desde el último commit ya no se puede
+    confirmar. Se revierte para que la sesión vuelva a ser usable.
+    """
+    uow = _actual.get()
+    if uow is None:
+        return False
+    async with uow.lock:
+        if not uow.sesion.in_transaction():
+            return False
+        if not (await uow.sesion.connection()).invalidated:
+            return False
+        await uow.sesion.rollback()
+        return True
+
+
+def _fallo(resultado) -> bool:
+    return isinstance(resultado, dict) and resultado.get("status") == "error"
+
+
+async def ejecutar_en_sesion(funcion, *args) -> dict:
+    """Ejecuta `await funcion(sesion, *args)` dentro de la unidad de trabajo.
+
+    Con una unidad activa usa un SAVEPOINT sobre la sesión compartida; sin
+    ella abre una transacción propia (p. ej. una invocación MCP).
+    """
+    uow = _actual.get()
+
+    if uow is None:
+        async with config.AsyncSessionLocal() as sesion:
+            resultado = await funcion(sesion, *args)
+            if _fallo(resultado):
+                await sesion.rollback()
+            else:
+                await sesion.commit()
+            return resultado
+
+    async with uow.lock:
+        savepoint = await uow.sesion.begin_nested()
+        try:
+            resultado = await funcion(uow.sesion, *args)
+        except BaseException:
+            await savepoint.rollback()
+            uow.revertidas += 1
+            raise
+
+        if _fallo(resultado):
+            await savepoint.rollback()
+            uow.revertidas += 1
+        else:
+            await savepoint.commit()
+        uow.operaciones += 1
+        return resultado
+
+
+def ejecutar_en_sesion_sync(funcion, *args) -> dict:
+    """Equivalente síncrono: una transacción por llamada (scripts y pruebas)."""
+    sesion = config.SessionLocal()
+    try:
+        resultado = funcion(sesion, *args)
+        if _fallo(resultado):
+            sesion.rollback()
+        else:
+            sesion.commit()
+        return resultado
+    except BaseException:
+        sesion.rollback()
+        raise
+    finally:
+        sesion.close()
@@ -1,11 +1,42 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from sqlalchemy import text
 from app.api.bot_router import router
+from app.chat.llm import get_llm_client
+from app.chat.store import get_store
+from app.db import config
+from app.db.config import estado_pools
+from app.observability import metricas
+from app.services.cache_clientes import get_cache_clientes
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Construye el motor async y el cliente del modelo al arrancar el worker.
+
+    Importar la app no crea nada (ver app.db.config y app.chat.llm). Si la
+    configuración está incompleta el worker arranca igual: /health/db
+    reporta el error y /chat falla con él.
+    """
+    for fabrica in (config.get_async_engine, get_llm_client):
+        try:
+            fabrica()
+        except Exception as e:
+            logger.error("Arranque incompleto (%s): %s", fabrica.__name__, e)
+    yield
+    await config.cerrar_motores()
+
 
 app = FastAPI(
     title="Taller Express Bot API",
     description="API REST para el bot de agendamiento de citas",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS para frontend
@@ -29,10 +60,37 @@ def root():
             "chat": "POST /api/chat",
             "reset": "POST /api/reset/{conversacion_id}",
             "conversaciones": "GET /api/conversaciones",
+            "exportar_clientes": "GET /api/clientes/exportar",
+            "exportar_citas": "GET /api/citas/exportar",
+            "citas_lote": "POST /api/citas/lote",
+            "contactos_lote": "POST /api/contactos/lote",
+            "health_db": "GET /health/db",
+            "metrics": "GET /metrics",
         },
     }
 
 
+@app.get("/health/db")
+async def health_db():
+    """Verifica la conexión y expone el estado de los pools de conexiones."""
+    try:
+        async with config.async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        status = "success"
+    except Exception as e:
+        status = f"error: {e}"
+    return {"status": status, "pools": estado_pools()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas en el formato de texto de Prometheus."""
+    metricas.CONVERSACIONES.fijar(await get_store().count())
+    metricas.fijar_pools(estado_pools())
+    metricas.CACHE_CLIENTES_ITEMS.fijar(len(get_cache_clientes().backend))
+    return Response(metricas.exponer(), media_type=metricas.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,17 +1,25 @@
-import json
-from datetime import datetime
-from fastmcp import FastMCP
-from app.db.config import get_db
+from datetime import datetime, timedelta
+from functools import lru_cache
+from app.db.unit_of_work import ejecutar_en_sesion, ejecutar_en_sesion_sync
+from app.core.fechas import FechaInvalida, interpretar_fecha
+from app.mcp.registry import ToolRegistry
+from app.observability import anotar
 from app.schemas.appointment import AppointmentCreate, AppointmentState
-from app.services.citas_service import AppointmentService
-from app.services.client_service import ClienteService
+from app.services.citas_service import AppointmentService, AsyncAppointmentService
+from app.services.client_service import ClienteService, AsyncClienteService
+from app.services.disponibilidad import (
+    AsyncDisponibilidadService,
+    DisponibilidadService,
+    get_motor,
+)
 from app.schemas.client import ClientCreate
-from app.services.client_contact import ClientContactService
+from app.services.client_contact import ClientContactService, AsyncClientContactService
 from app.schemas.client_contact import ClientContactCreate
-import re
 
+herramientas = ToolRegistry()
 
-agent = FastMCP("Sistema de Gestión de Citas")
+# Tope de filas por llamada: todo lo que retorna una herramienta va al prompt
+MAX_PAGINA_HERRAMIENTA = 20
 
 # ==================== FUNCIONES DE LÓGICA (SIN DECORADORES) ====================
 # Estas funciones son "puras" y pueden ser importadas en otros módulos
@@ -19,61 +27,82 @@ agent = FastMCP("Sistema de Gestión de Citas")
 
 def _crear_cliente_logic(fullName: str, fullSurname: str, identified: str) -> dict:
     """Lógica para crear un nuevo cliente"""
-    db = next(get_db())
     try:
         data = ClientCreate(
             fullName=fullName, fullSurname=fullSurname, identified=identified
         )
-        response = ClienteService.registrar_cliente(db, data)
-        return response
+        return ejecutar_en_sesion_sync(ClienteService.registrar_cliente, data)
     except Exception as e:
         return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
 
 
 def _buscar_cliente_logic(identified: str) -> dict:
     """Lógica para buscar un cliente por identificación"""
-    db = next(get_db())
     try:
-        response = ClienteService.buscar_cliente(db, identified)
-        return response
+        return ejecutar_en_sesion_sync(ClienteService.buscar_cliente, identified)
     except Exception as e:
         return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
 
 
-def _listar_clientes_logic() -> dict:
-    """Lógica para listar todos los clientes activos"""
-    db = next(get_db())
+def _perfil_cliente_logic(identified: str) -> dict:
+    """Lógica para obtener cliente, contactos y próximas citas"""
     try:
-        response = ClienteService.listar_clientes(db)
-        return response
+        return ejecutar_en_sesion_sync(ClienteService.perfil_cliente, identified)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def _listar_clientes_logic(cursor: int | None = None, limite: int = 20) -> dict:
+    """Lógica para listar clientes activos, paginado"""
+    try:
+        limite = min(limite, MAX_PAGINA_HERRAMIENTA)
+        return ejecutar_en_sesion_sync(ClienteService.listar_clientes, cursor, limite)
     except Exception as e:
         return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
 
 
 def _crear_contacto_logic(
     clientId: int, phoneNumber: str, email: str, address: str = ""
 ) -> dict:
     """Lógica para crear un contacto para un cliente"""
-    db = next(get_db())
     try:
         data = ClientContactCreate(
             clientId=clientId, phoneNumber=phoneNumber, email=email, address=address
         )
-        response = ClientContactService.crear_contacto(db, data)
-        return json.loads(response)
+        return ejecutar_en_sesion_sync(ClientContactService.crear_contacto, data)
     except Exception as e:
         return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
 
 
-# En app/mcp/agent.py
+def _preparar_cita(
+    clientId: int,
+    appointmentDate: str,
+    ubicacion: str,
+    details: str | None = None,
+    state: str = "ASIGNADA",
+    employedId: int | None = None,
+) -> AppointmentCreate | dict:
+    """Valida fecha y horario de atención. Retorna los datos de la cita o un dict de error."""
+    try:
+        fecha_cita = interpretar_fecha(appointmentDate)
+    except FechaInvalida as e:
+        anotar(fecha_recibida=appointmentDate, fecha_rechazada=str(e))
+        return {"status": "error", "message": str(e)}
+    anotar(fecha_recibida=appointmentDate, fecha_cita=f"{fecha_cita:%Y-%m-%d %H:%M}")
+
+    # Validar horario de atención (configurable, ver Settings.TALLER_HORARIO)
+    error = get_motor().horario.validar(fecha_cita)
+    if error:
+        return {"status": "error", "message": error}
+
+    return AppointmentCreate(
+        clientId=clientId,
+        appointmentDate=fecha_cita,  # datetime: asyncpg no acepta strings
+        ubicacion=ubicacion,
+        details=details,
+        state=AppointmentState(state),
+        employedId=employedId,
+    )
 
 
 def _crear_cita_logic(
@@ -84,131 +113,149 @@ def _crear_cita_logic(
     state: str = "ASIGNADA",
     employedId: int | None = None,
 ) -> dict:
-    db = next(get_db())
-    try:
-        print(f"📅 Fecha recibida: {appointmentDate}")
-
-        # Validar y corregir fecha/hora
-        try:
-            # Parsear fecha
-            fecha_cita = None
-            formato_usado = None
-
-            for fmt in ["%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"]:
-                try:
-                    fecha_cita = datetime.strptime(appointmentDate, fmt)
-                    formato_usado = fmt
-                    break
-                except:
-                    continue
-
-            if fecha_cita is None:
-                return {
-                    "status": "error",
-                    "message": "Formato de fecha inválido. Use: YYYY-MM-DD HH:MM:SS",
-                }
-
-            print(f"📅 Fecha parseada: {fecha_cita}")
-            print(f"🕐 Hora: {fecha_cita.hour}:{fecha_cita.minute}")
-
-            # Corregir año si es necesario
-            año_actual = datetime.now().year
-            if fecha_cita.year < año_actual:
-                print(f"⚠️ Corrigiendo año de {fecha_cita.year} a {año_actual}")
-                fecha_cita = fecha_cita.replace(year=año_actual)
-
-            # Si la fecha ya pasó, moverla al año siguiente
-            if fecha_cita < datetime.now():
-                print(f"⚠️ Fecha en el pasado, moviendo a {año_actual + 1}")
-                fecha_cita = fecha_cita.replace(year=año_actual + 1)
-
-            # ← VALIDAR HORARIO DE ATENCIÓN
-            hora = fecha_cita.hour
-            dia_semana = fecha_cita.weekday()  # 0=Lunes, 6=Domingo
-
-            if dia_semana == 6:  # Domingo
-                return {
-                    "status": "error",
-                    "message": "El taller está cerrado los domingos. Por favor elija otro día.",
-                }
-
-            if dia_semana == 5:  # Sábado
-                if hora < 8 or hora >= 14:
-                    return {
-                        "status": "error",
-                        "message": "Los sábados atendemos de 8:00 AM a 2:00 PM. Por favor elija otra hora.",
-                    }
-            else:  # Lunes a Viernes
-                if hora < 8 or hora >= 18:
-                    return {
-                        "status": "error",
-                        "message": "Nuestro horario es de 8:00 AM a 6:00 PM. Por favor elija otra hora.",
-                    }
-
-            appointmentDate = fecha_cita.strftime("%Y-%m-%d %H:%M:%S")
-            print(f"✅ Fecha final: {appointmentDate}")
-
-        except Exception as e:
-            print(f"❌ Error procesando fecha: {str(e)}")
-            return {"status": "error", "message": f"Error procesando fecha: {str(e)}"}
+    try:
+        data = _preparar_cita(
+            clientId, appointmentDate, ubicacion, details, state, employedId
+        )
+        if isinstance(data, dict):
+            return data
 
         # Crear cita
-        data = AppointmentCreate(
-            clientId=clientId,
-            appointmentDate=appointmentDate,
-            ubicacion=ubicacion,
-            details=details,
-            state=AppointmentState(state),
-            employedId=employedId,
+        return ejecutar_en_sesion_sync(AppointmentService.crear_cita, data)
+
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def _fecha_opcional(valor: str | None) -> datetime | None:
+    """Convierte 'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS' (None se mantiene)."""
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def _hasta_opcional(valor: str | None) -> datetime | None:
+    """Límite exclusivo para 'hasta': un día sin hora (YYYY-MM-DD) se incluye entero."""
+    if not valor:
+        return None
+    fin = datetime.fromisoformat(valor)
+    if len(valor.strip()) == 10:
+        fin += timedelta(days=1)
+    return fin
+
+
+def _citas_cliente_logic(
+    clientId: int,
+    desde: str | None = None,
+    hasta: str | None = None,
+    cursor: str | None = None,
+    limite: int = 10,
+) -> dict:
+    """Lógica para consultar el historial de citas de un cliente"""
+    try:
+        rango = _fecha_opcional(desde), _hasta_opcional(hasta)
+    except ValueError:
+        return {"status": "error", "message": "Fecha inválida. Use: YYYY-MM-DD"}
+    try:
+        return ejecutar_en_sesion_sync(
+            AppointmentService.obtener_citas_por_cliente,
+            clientId,
+            *rango,
+            cursor,
+            min(limite, MAX_PAGINA_HERRAMIENTA),
         )
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
 
-        result = AppointmentService.crear_cita(db, data)
-        return json.loads(result)
 
+def _rango_disponibilidad(
+    desde: str, hasta: str | None
+) -> tuple[datetime, datetime | None]:
+    """'hasta' es un día inclusive: la consulta llega hasta el final de ese día."""
+    return datetime.fromisoformat(desde), _hasta_opcional(hasta)
+
+
+def _consultar_disponibilidad_logic(
+    desde: str,
+    hasta: str | None = None,
+    employedId: int | None = None,
+    limite: int = 12,
+) -> dict:
+    """Lógica para consultar horarios libres en la agenda del taller"""
+    try:
+        rango = _rango_disponibilidad(desde, hasta)
+    except ValueError:
+        return {"status": "error", "message": "Fecha inválida. Use: YYYY-MM-DD"}
+    try:
+        return ejecutar_en_sesion_sync(
+            DisponibilidadService.consultar,
+            *rango,
+            employedId,
+            min(limite, MAX_PAGINA_HERRAMIENTA),
+        )
     except Exception as e:
         return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
 
 
-# ==================== HERRAMIENTAS MCP (CON DECORADORES) ====================
-# Estas son las herramientas para FastMCP/Claude Desktop
+# ==================== FUNCIONES DE LÓGICA ASÍNCRONAS ====================
+# Variantes para /chat y MCP: usan AsyncSession y no bloquean el event loop.
+# Dentro de un turno de /chat comparten la unidad de trabajo del turno.
 
 
-@agent.tool(
-    description="Registra un nuevo cliente en el sistema. Requiere: fullName, fullSurname, identified"
-)
-def crear_cliente(fullName: str, fullSurname: str, identified: str) -> dict:
-    """Crea un nuevo cliente"""
-    return _crear_cliente_logic(fullName, fullSurname, identified)
+async def _crear_cliente_logic_async(
+    fullName: str, fullSurname: str, identified: str
+) -> dict:
+    """Versión asíncrona de _crear_cliente_logic"""
+    try:
+        data = ClientCreate(
+            fullName=fullName, fullSurname=fullSurname, identified=identified
+        )
+        return await ejecutar_en_sesion(AsyncClienteService.registrar_cliente, data)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
 
 
-@agent.tool(description="Busca un cliente por su número de identificación")
-def buscar_cliente(identified: str) -> dict:
-    """Busca un cliente por identificación"""
-    return _buscar_cliente_logic(identified)
+async def _buscar_cliente_logic_async(identified: str) -> dict:
+    """Versión asíncrona de _buscar_cliente_logic"""
+    try:
+        return await ejecutar_en_sesion(AsyncClienteService.buscar_cliente, identified)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
 
 
-@agent.tool(description="Lista todos los clientes registrados en el sistema")
-def listar_clientes() -> dict:
-    """Lista todos los clientes activos"""
-    return _listar_clientes_logic()
+async def _perfil_cliente_logic_async(identified: str) -> dict:
+    """Versión asíncrona de _perfil_cliente_logic"""
+    try:
+        return await ejecutar_en_sesion(AsyncClienteService.perfil_cliente, identified)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
 
 
-@agent.tool(
-    description="Crea un contacto para un cliente. Requiere: clientId, phoneNumber, email, address (opcional)"
-)
-def crear_contacto(
+async def _listar_clientes_logic_async(
+    cursor: int | None = None, limite: int = 20
+) -> dict:
+    """Versión asíncrona de _listar_clientes_logic"""
+    try:
+        limite = min(limite, MAX_PAGINA_HERRAMIENTA)
+        return await ejecutar_en_sesion(
+            AsyncClienteService.listar_clientes, cursor, limite
+        )
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def _crear_contacto_logic_async(
     clientId: int, phoneNumber: str, email: str, address: str = ""
 ) -> dict:
-    """Crea un contacto para un cliente"""
-    return _crear_contacto_logic(clientId, phoneNumber, email, address)
+    """Versión asíncrona de _crear_contacto_logic"""
+    try:
+        data = ClientContactCreate(
+            clientId=clientId, phoneNumber=phoneNumber, email=email, address=address
+        )
+        return await ejecutar_en_sesion(AsyncClientContactService.crear_contacto, data)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
 
 
-@agent.tool(
-    description="Crea una cita para un cliente. Requiere: clientId, appointmentDate (YYYY-MM-DD HH:MM:SS), ubicacion, details (opcional), state (opcional), employedId (opcional)"
-)
-def crear_cita(
+async def _crear_cita_logic_async(
     clientId: int,
     appointmentDate: str,
     ubicacion: str,
@@ -216,7 +263,208 @@ def crear_cita(
     state: str = "ASIGNADA",
     employedId: int | None = None,
 ) -> dict:
-    """Crea una nueva cita"""
-    return _crear_cita_logic(
-        clientId, appointmentDate, ubicacion, details, state, employedId
-    )
+    """Versión asíncrona de _crear_cita_logic"""
+    try:
+        data = _preparar_cita(
+            clientId, appointmentDate, ubicacion, details, state, employedId
+        )
+        if isinstance(data, dict):
+            return data
+
+        return await ejecutar_en_sesion(AsyncAppointmentService.crear_cita, data)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def _preparar_lote(citas: list[AppointmentCreate]) -> list[AppointmentCreate | dict]:
+    """_preparar_cita para cada cita del lote (datos validados o dict de error)."""
+    return [
+        _preparar_cita(
+            c.clientId,
+            str(c.appointmentDate),
+            c.ubicacion,
+            c.details,
+            c.state.value,
+            c.employedId,
+        )
+        for c in citas
+    ]
+
+
+async def _crear_citas_lote_logic_async(citas: list[AppointmentCreate]) -> dict:
+    """Crea varias citas en una transacción; un resultado por cita, en orden"""
+    if len(citas) > MAX_PAGINA_HERRAMIENTA:
+        return {
+            "status": "error",
+            "message": f"Máximo {MAX_PAGINA_HERRAMIENTA} citas por lote",
+        }
+    try:
+        preparadas = _preparar_lote(citas)
+        validas = [p for p in preparadas if not isinstance(p, dict)]
+        if not validas:
+            return {
+                "status": "error",
+                "message": "Ninguna cita del lote es válida",
+                "creadas": 0,
+                "resultados": preparadas,
+            }
+
+        lote = await ejecutar_en_sesion(
+            AsyncAppointmentService.crear_citas_lote, validas
+        )
+        if "resultados" not in lote:
+            return lote
+
+        # Reintercala los rechazos de la validación en su posición
+        creadas = iter(lote["resultados"])
+        resultados = [p if isinstance(p, dict) else next(creadas) for p in preparadas]
+        if len(validas) < len(citas) and lote["creadas"]:
+            lote["status"] = "partial"
+        return {
+            **lote,
+            "message": f"{lote['creadas']} de {len(citas)} citas creadas",
+            "resultados": resultados,
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def _crear_contactos_lote_logic_async(
+    contactos: list[ClientContactCreate],
+) -> dict:
+    """Registra varios contactos en una transacción; un resultado por contacto"""
+    if len(contactos) > MAX_PAGINA_HERRAMIENTA:
+        return {
+            "status": "error",
+            "message": f"Máximo {MAX_PAGINA_HERRAMIENTA} contactos por lote",
+        }
+    try:
+        return await ejecutar_en_sesion(
+            AsyncClientContactService.crear_contactos_lote, contactos
+        )
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def _citas_cliente_logic_async(
+    clientId: int,
+    desde: str | None = None,
+    hasta: str | None = None,
+    cursor: str | None = None,
+    limite: int = 10,
+) -> dict:
+    """Versión asíncrona de _citas_cliente_logic"""
+    try:
+        rango = _fecha_opcional(desde), _hasta_opcional(hasta)
+    except ValueError:
+        return {"status": "error", "message": "Fecha inválida. Use: YYYY-MM-DD"}
+    try:
+        return await ejecutar_en_sesion(
+            AsyncAppointmentService.obtener_citas_por_cliente,
+            clientId,
+            *rango,
+            cursor,
+            min(limite, MAX_PAGINA_HERRAMIENTA),
+        )
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def _consultar_disponibilidad_logic_async(
+    desde: str,
+    hasta: str | None = None,
+    employedId: int | None = None,
+    limite: int = 12,
+) -> dict:
+    """Versión asíncrona de _consultar_disponibilidad_logic"""
+    try:
+        rango = _rango_disponibilidad(desde, hasta)
+    except ValueError:
+        return {"status": "error", "message": "Fecha inválida. Use: YYYY-MM-DD"}
+    try:
+        return await ejecutar_en_sesion(
+            AsyncDisponibilidadService.consultar,
+            *rango,
+            employedId,
+            min(limite, MAX_PAGINA_HERRAMIENTA),
+        )
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+# ==================== HERRAMIENTAS (REGISTRO ÚNICO) ====================
+# Las mismas funciones asíncronas sirven a FastMCP/Claude Desktop y a /chat
+
+herramientas.tool(
+    "crear_cliente",
+    "Registra un nuevo cliente en el sistema",
+)(_crear_cliente_logic_async)
+
+herramientas.tool(
+    "buscar_cliente",
+    "Busca un cliente por su número de identificación",
+)(_buscar_cliente_logic_async)
+
+herramientas.tool(
+    "perfil_cliente",
+    "Datos de un cliente por su identificación junto con sus contactos y sus "
+    "próximas citas, en una sola llamada",
+)(_perfil_cliente_logic_async)
+
+herramientas.tool(
+    "listar_clientes",
+    "Lista clientes registrados, paginado. Para la siguiente página pasa "
+    f"cursor=siguiente_cursor. Máximo {MAX_PAGINA_HERRAMIENTA} por página",
+)(_listar_clientes_logic_async)
+
+herramientas.tool(
+    "crear_contacto",
+    "Crea un contacto (teléfono, email, dirección) para un cliente",
+)(_crear_contacto_logic_async)
+
+herramientas.tool(
+    "crear_cita",
+    "Crea una cita para un cliente. appointmentDate: YYYY-MM-DD HH:MM o tal como "
+    "lo dijo el usuario ('mañana a las 3 pm', 'el próximo martes 10 de la mañana')",
+)(_crear_cita_logic_async)
+
+herramientas.tool(
+    "crear_citas_lote",
+    "Crea varias citas en una sola llamada (p. ej. varios vehículos de un mismo "
+    f"cliente). Máximo {MAX_PAGINA_HERRAMIENTA}. Devuelve un resultado por cita, "
+    "en el mismo orden; las que no quepan traen alternativas",
+)(_crear_citas_lote_logic_async)
+
+herramientas.tool(
+    "crear_contactos_lote",
+    "Crea varios contactos (teléfono, email, dirección) en una sola llamada. "
+    f"Máximo {MAX_PAGINA_HERRAMIENTA}",
+)(_crear_contactos_lote_logic_async)
+
+herramientas.tool(
+    "citas_cliente",
+    "Citas de un cliente ordenadas por fecha. desde/hasta (YYYY-MM-DD, hasta "
+    "inclusive) son opcionales: para las próximas citas usa desde=hoy. Para la siguiente "
+    "página pasa cursor=siguiente_cursor",
+)(_citas_cliente_logic_async)
+
+herramientas.tool(
+    "consultar_disponibilidad",
+    "Horarios libres del taller desde una fecha (YYYY-MM-DD o YYYY-MM-DD HH:MM:SS). "
+    "hasta (YYYY-MM-DD, inclusive) es opcional: por defecto solo ese día. "
+    "employedId filtra por mecánico",
+)(_consultar_disponibilidad_logic_async)
+
+
+@lru_cache
+def get_agent():
+    """Servidor FastMCP con todas las herramientas.
+
+    Se construye al pedirlo: /chat solo usa `herramientas`, así la API no
+    importa fastmcp.
+    """
+    from fastmcp import FastMCP
+
+    agent = FastMCP("Sistema de Gestión de Citas")
+    herramientas.registrar_en(agent)
+    return agent
@@ -0,0 +1,198 @@
+"""
+Registro único de herramientas.
+
+Cada herramienta se declara una sola vez como función asíncrona tipada.
+A partir de su firma se generan:
+- el schema de "tools" para la API de OpenAI (/chat),
+- el registro en FastMCP (Claude Desktop),
+- un validador pydantic precompilado para los argumentos.
+
+El despacho es una búsqueda en un dict por nombre.
+"""
+
+import functools
+import inspect
+import time
+import typing
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
+from app.observability import acumular, span
+from app.observability.metricas import LLAMADAS_HERRAMIENTA
+
+
+@dataclass(frozen=True)
+class Herramienta:
+    nombre: str
+    descripcion: str
+    funcion: Callable[..., Awaitable[dict]]
+    modelo: type[BaseModel]
+    schema: dict
+
+
+def _modelo_argumentos(nombre: str, funcion: Callable) -> type[BaseModel]:
+    """Construye el modelo pydantic de los argumentos a partir de la firma."""
+    hints = typing.get_type_hints(funcion)
+    campos = {}
+    for param in inspect.signature(funcion).parameters.values():
+        default = ... if param.default is inspect.Parameter.empty else param.default
+        campos[param.name] = (hints.get(param.name, Any), default)
+
+    # Los argumentos extra que invente el modelo se ignoran en vez de fallar
+    return create_model(
+        f"Args_{nombre}", __config__=ConfigDict(extra="ignore"), **campos
+    )
+
+
+def _compactar_schema(schema: dict) -> dict:
+    """Quita del JSON schema lo que no aporta al LLM (titles, `anyOf` con null).
+
+    Los modelos anidados (`$ref` a `$defs`) se copian en su lugar: el schema
+    de una herramienta queda autocontenido.
+    """
+    return _compactar_objeto(schema, schema.get("$defs", {}))
+
+
+def _compactar_objeto(schema: dict, defs: dict) -> dict:
+    propiedades = {
+        campo: _compactar_propiedad(prop, defs)
+        for campo, prop in schema.get("properties", {}).items()
+    }
+    compacto = {"type": "object", "properties": propiedades}
+    if schema.get("required"):
+        compacto["required"] = schema["required"]
+    return compacto
+
+
+def _compactar_propiedad(prop: dict, defs: dict) -> dict:
+    if "$ref" in prop:
+        prop = {**defs[prop["$ref"].rsplit("/", 1)[-1]], **prop}
+        del prop["$ref"]
+    if prop.get("type") == "object" and "properties" in prop:
+        return _compactar_objeto(prop, defs)
+
+    prop = {k: v for k, v in prop.items() if k != "title"}
+    opciones = prop.pop("anyOf", None)
+    if opciones:
+        no_nulos = [o for o in opciones if o.get("type") != "null"]
+        tipos = {o.get("type") for o in no_nulos}
+        if len(no_nulos) == 1:
+            prop.update(no_nulos[0])
+        elif len(tipos) == 1 and None not in tipos:
+            prop["type"] = tipos.pop()  # p. ej. datetime | str: basta "string"
+        else:
+            prop["anyOf"] = no_nulos
+    if prop.get("default") is None:
+        prop.pop("default", None)
+    if "items" in prop:
+        prop["items"] = _compactar_propiedad(prop["items"], defs)
+    return prop
+
+
+def _con_traza(h: Herramienta):
+    """Envuelve la función en un span conservando su firma (FastMCP la inspecciona)."""
+
+    @functools.wraps(h.funcion)
+    async def con_traza(*args, **kwargs):
+        with span("herramienta", herramienta=h.nombre, origen="mcp") as traza:
+            resultado = await h.funcion(*args, **kwargs)
+            if traza is not None and isinstance(resultado, dict):
+                traza.anotar(status=resultado.get("status"))
+            return resultado
+
+    return con_traza
+
+
+class ToolRegistry:
+    def __init__(self):
+        self._herramientas: dict[str, Herramienta] = {}
+        self._openai: list[dict] | None = None
+
+    def tool(self, nombre: str, descripcion: str):
+        """Decorador que registra una función asíncrona como herramienta."""
+
+        def decorador(funcion):
+            if nombre in self._herramientas:
+                raise ValueError(f"Herramienta '{nombre}' ya registrada")
+            if not inspect.iscoroutinefunction(funcion):
+                raise TypeError(f"La herramienta '{nombre}' debe ser async")
+
+            modelo = _modelo_argumentos(nombre, funcion)
+            self._herramientas[nombre] = Herramienta(
+                nombre=nombre,
+                descripcion=descripcion,
+                funcion=funcion,
+                modelo=modelo,
+                schema=_compactar_schema(modelo.model_json_schema()),
+            )
+            self._openai = None
+            return funcion
+
+        return decorador
+
+    def __contains__(self, nombre: str) -> bool:
+        return nombre in self._herramientas
+
+    def __len__(self) -> int:
+        return len(self._herramientas)
+
+    def nombres(self) -> list[str]:
+        return list(self._herramientas)
+
+    def openai_tools(self) -> list[dict]:
+        """Schemas para el parámetro `tools` de chat.completions (se arma una vez)."""
+        if self._openai is None:
+            self._openai = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": h.nombre,
+                        "description": h.descripcion,
+                        "parameters": h.schema,
+                    },
+                }
+                for h in self._herramientas.values()
+            ]
+        return self._openai
+
+    def registrar_en(self, mcp) -> None:
+        """Registra todas las herramientas en una instancia de FastMCP."""
+        for h in self._herramientas.values():
+            mcp.tool(name=h.nombre, description=h.descripcion)(_con_traza(h))
+
+    async def ejecutar(self, nombre: str, args: dict) -> dict:
+        """Valida los argumentos y ejecuta la herramienta `nombre`."""
+        inicio = time.perf_counter()
+        with span("herramienta", herramienta=nombre) as traza:
+            resultado = await self._ejecutar(nombre, args)
+            if traza is not None:
+                traza.anotar(status=resultado.get("status"))
+
+        acumular("herramientas", time.perf_counter() - inicio)
+        # Los nombres que invente el modelo no abren series nuevas
+        LLAMADAS_HERRAMIENTA.inc(
+            herramienta=nombre if nombre in self._herramientas else "desconocida",
+            status=resultado.get("status"),
+        )
+        return resultado
+
+    async def _ejecutar(self, nombre: str, args: dict) -> dict:
+        herramienta = self._herramientas.get(nombre)
+        if herramienta is None:
+            return {
+                "status": "error",
+                "message": f"Herramienta '{nombre}' no encontrada",
+            }
+
+        try:
+            validados = herramienta.modelo.model_validate(args)
+        except ValidationError as e:
+            errores = "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+            )
+            return {"status": "error", "message": f"Argumentos inválidos: {errores}"}
+
+        try:
+            return await herramienta.funcion(**dict(validados))
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
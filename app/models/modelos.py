@@ -7,8 +7,11 @@ from sqlalchemy import (
     DateTime,
     Text,
     ForeignKey,
+    Index,
+    JSON,
     true,
 )
+from sqlalchemy import text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.config import Base
@@ -24,6 +27,12 @@ class AppointmentState(PyEnum):
 
 class Client(Base):
     __tablename__ = "Client"
+    # Índices declarados también en app/db/migrations.py (0002_indices_consultas)
+    __table_args__ = (
+        Index(
+            "ix_client_activos_id", "id", postgresql_where=text('"clientState" = true')
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     fullName = Column(String(100), nullable=False)
@@ -43,6 +52,10 @@ class Client(Base):
 
 class AppointmentScheduling(Base):
     __tablename__ = "AppointmentScheduling"
+    __table_args__ = (
+        Index("ix_cita_cliente_fecha", "clientId", "appointmentDate"),
+        Index("ix_cita_fecha", "appointmentDate"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     appointmentDate = Column(DateTime, nullable=False)
@@ -61,6 +74,7 @@ class AppointmentScheduling(Base):
 
 class ClientContact(Base):
     __tablename__ = "ClientContact"
+    __table_args__ = (Index("ix_contacto_cliente", "clientId"),)
 
     id = Column(Integer, primary_key=True, index=True)
     phoneNumber = Column(String(20), nullable=False)
@@ -73,3 +87,11 @@ class ClientContact(Base):
     clientId = Column(Integer, ForeignKey("Client.id"), nullable=False)
 
     author = relationship("Client", back_populates="clientContact")
+
+
+class Conversation(Base):
+    __tablename__ = "Conversation"
+
+    id = Column(String(64), primary_key=True)
+    mensajes = Column(JSON, nullable=False)
+    updatedAt = Column(DateTime, server_default=func.now(), nullable=False, index=True)
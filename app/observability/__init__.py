@@ -0,0 +1,46 @@
+"""
+Observabilidad: trazas muestreadas de /chat (LLM, herramientas, base de datos)
+y métricas agregadas para /metrics.
+
+    from app.observability import span, anotar
+
+    with span("herramienta", nombre="crear_cita"):
+        ...
+"""
+
+from app.observability.exportadores import (
+    Exportador,
+    ExportadorJSONL,
+    ExportadorMemoria,
+)
+from app.observability.trazas import (
+    Span,
+    anotar,
+    configurar,
+    iniciar_span,
+    registrar,
+    restaurar,
+    span,
+    span_actual,
+    vaciar,
+)
+from app.observability.db import instrumentar_engine
+from app.observability.metricas import acumular, medir_turno
+
+__all__ = [
+    "Exportador",
+    "ExportadorJSONL",
+    "ExportadorMemoria",
+    "Span",
+    "acumular",
+    "anotar",
+    "configurar",
+    "iniciar_span",
+    "instrumentar_engine",
+    "medir_turno",
+    "registrar",
+    "restaurar",
+    "span",
+    "span_actual",
+    "vaciar",
+]
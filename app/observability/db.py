@@ -0,0 +1,37 @@
+"""
+Spans de consultas SQL a partir de los eventos del motor.
+
+Solo se miden las consultas hechas dentro de una traza muestreada o de un
+turno de chat (para el tiempo de base de datos de /metrics); fuera de ellos
+los eventos cuestan dos lecturas de ContextVar.
+"""
+
+import time
+from sqlalchemy import event
+from app.observability.metricas import acumular, turno_actual
+from app.observability.trazas import registrar, span_actual
+
+# Largo máximo de la sentencia guardada en el span
+MAX_SQL = 200
+
+
+def instrumentar_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if span_actual() is not None or turno_actual() is not None:
+            context._inicio_consulta = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_inicio_consulta", None)
+        if inicio is None:
+            return
+        duracion = time.perf_counter() - inicio
+        acumular("db", duracion)
+        if span_actual() is not None:
+            registrar(
+                "db.consulta",
+                duracion,
+                sql=" ".join(statement.split())[:MAX_SQL],
+                filas=cursor.rowcount,
+            )
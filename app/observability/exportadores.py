@@ -0,0 +1,46 @@
+"""
+Exportadores de spans.
+
+Un exportador recibe lotes de spans (dicts) desde el hilo del tracer, así
+que puede hacer I/O bloqueante. Para enviar las trazas a otro sistema basta
+con una clase con `exportar(spans)` y `trazas.configurar(exportador=...)`.
+"""
+
+import threading
+from typing import Protocol
+from app.core.serializacion import a_json
+
+
+class Exportador(Protocol):
+    def exportar(self, spans: list[dict]) -> None: ...
+
+
+class ExportadorJSONL:
+    """Una línea JSON por span, agregadas al final de `ruta`."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+    def exportar(self, spans: list[dict]) -> None:
+        with open(self.ruta, "a", encoding="utf-8") as archivo:
+            archivo.write("".join(a_json(s) + "\n" for s in spans))
+
+
+class ExportadorMemoria:
+    """Guarda los spans en una lista (pruebas y depuración)."""
+
+    def __init__(self):
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()
+
+    def exportar(self, spans: list[dict]) -> None:
+        with self._lock:
+            self.spans.extend(spans)
+
+
+def crear_exportador(tipo: str, ruta: str) -> Exportador | None:
+    if tipo == "jsonl":
+        return ExportadorJSONL(ruta)
+    if tipo == "memoria":
+        return ExportadorMemoria()
+    return None  # "none": trazas desactivadas
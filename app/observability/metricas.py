@@ -0,0 +1,286 @@
+"""
+Métricas agregadas en el formato de texto de Prometheus (expuestas en /metrics).
+
+A diferencia de las trazas, que se muestrean, las métricas cubren todas las
+peticiones; por eso cada observación es apenas una suma bajo un lock. La
+duración de un turno de /chat se reparte por componente acumulando en un
+ContextVar el tiempo del LLM, de las herramientas y de la base de datos:
+
+    with medir_turno("chat"):
+        ...  # _completar, ToolRegistry.ejecutar y los eventos del motor suman
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: dict) -> tuple:
+        return tuple(str(etiquetas[n]) for n in self.etiquetas)
+
+    def lineas(self) -> list[str]:
+        return [
+            f"# HELP {self.nombre} {self.ayuda}",
+            f"# TYPE {self.nombre} {self.tipo}",
+        ]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple[str, ...] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.valores: dict[tuple, float] = {}
+
+    def inc(self, valor: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self.valores[clave] = self.valores.get(clave, 0) + valor
+
+    def fijar(self, valor: float, **etiquetas) -> None:
+        """Copia un valor medido en otro lado (p. ej. los contadores del pool)."""
+        self.valores[self._clave(etiquetas)] = valor
+
+    def lineas(self) -> list[str]:
+        lineas = super().lineas()
+        with self._lock:
+            valores = list(self.valores.items())
+        for clave, valor in sorted(valores):
+            lineas.append(
+                f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+            )
+        return lineas
+
+
+class Medidor(Contador):
+    """Valor instantáneo; se fija al momento del scrape."""
+
+    tipo = "gauge"
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS_SEGUNDOS,
+    ):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinación de etiquetas: [cuentas por bucket (+Inf al final), suma]
+        self.valores: dict[tuple, list] = {}
+
+    def observar(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self.valores.get(clave)
+            if serie is None:
+                serie = self.valores[clave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def lineas(self) -> list[str]:
+        lineas = super().lineas()
+        with self._lock:
+            series = [
+                (c, list(cuentas), suma) for c, (cuentas, suma) in self.valores.items()
+            ]
+        for clave, cuentas, suma in sorted(series):
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets + (float("inf"),), cuentas):
+                acumulado += cuenta
+                le = f'le="{_numero(limite)}"'
+                lineas.append(
+                    f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}"
+                )
+            etiquetas = _etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {acumulado}")
+        return lineas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas: list[_Metrica] = []
+
+    def _agregar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas=()) -> Contador:
+        return self._agregar(Contador(nombre, ayuda, tuple(etiquetas)))
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas=()) -> Medidor:
+        return self._agregar(Medidor(nombre, ayuda, tuple(etiquetas)))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas=(), **kw) -> Histograma:
+        return self._agregar(Histograma(nombre, ayuda, tuple(etiquetas), **kw))
+
+    def exponer(self) -> str:
+        return "\n".join(l for m in self._metricas for l in m.lineas()) + "\n"
+
+
+registro = Registro()
+
+# ==========================
+# MÉTRICAS DE LA APLICACIÓN
+# ==========================
+DURACION_TURNO = registro.histograma(
+    "taller_chat_duracion_segundos",
+    "Duración de un turno de chat por componente (total, llm, herramientas, db)",
+    ("ruta", "componente"),
+)
+ERRORES_TURNO = registro.contador(
+    "taller_chat_errores_total", "Turnos de chat que terminaron en error", ("ruta",)
+)
+LLAMADAS_LLM = registro.contador(
+    "taller_llm_llamadas_total", "Completions pedidos al modelo", ("resultado",)
+)
+TOKENS_LLM = registro.contador(
+    "taller_llm_tokens_total", "Tokens consumidos según response.usage", ("tipo",)
+)
+LLAMADAS_HERRAMIENTA = registro.contador(
+    "taller_herramienta_llamadas_total",
+    "Ejecuciones de herramientas por nombre y status del resultado",
+    ("herramienta", "status"),
+)
+CONVERSACIONES = registro.medidor(
+    "taller_conversaciones", "Conversaciones vigentes en el almacén"
+)
+POOL_CONEXIONES = registro.medidor(
+    "taller_pool_conexiones",
+    "Conexiones del pool por estado (en_uso, disponibles, overflow, tamaño)",
+    ("pool", "estado"),
+)
+POOL_CHECKOUTS = registro.contador(
+    "taller_pool_checkouts_total", "Conexiones entregadas por el pool", ("pool",)
+)
+POOL_ESPERA = registro.contador(
+    "taller_pool_espera_segundos_total",
+    "Tiempo acumulado esperando una conexión libre",
+    ("pool",),
+)
+POOL_TIMEOUTS = registro.contador(
+    "taller_pool_timeouts_total", "Checkouts que agotaron pool_timeout", ("pool",)
+)
+CACHE_CLIENTES = registro.contador(
+    "taller_cache_clientes_total",
+    "Lecturas del caché de clientes (acierto, fallo, omitido)",
+    ("resultado",),
+)
+CACHE_CLIENTES_ITEMS = registro.medidor(
+    "taller_cache_clientes_items", "Clientes guardados en el caché del proceso"
+)
+COMPACTACION_LLAMADAS = registro.contador(
+    "taller_compactacion_llamadas_total", "Historiales compactados antes del LLM"
+)
+COMPACTACION_TOKENS = registro.contador(
+    "taller_compactacion_tokens_total",
+    "Tokens estimados del historial antes y después de compactar",
+    ("fase",),
+)
+COMPACTACION_MENSAJES = registro.contador(
+    "taller_compactacion_mensajes_total",
+    "Mensajes descartados o resultados de herramientas recortados al compactar",
+    ("accion",),
+)
+
+
+def fijar_pools(pools: dict) -> None:
+    """Copia la foto de `estado_pools()` a las métricas del pool."""
+    for pool, estado in pools.items():
+        for campo in ("en_uso", "disponibles", "overflow", "tamaño"):
+            POOL_CONEXIONES.fijar(estado[campo], pool=pool, estado=campo)
+        POOL_CHECKOUTS.fijar(estado["checkouts"], pool=pool)
+        POOL_ESPERA.fijar(estado["espera_total_ms"] / 1000, pool=pool)
+        POOL_TIMEOUTS.fijar(estado["timeouts"], pool=pool)
+
+
+def exponer() -> str:
+    return registro.exponer()
+
+
+# ==========================
+# TIEMPOS POR TURNO
+# ==========================
+@dataclass
+class TiemposTurno:
+    llm: float = 0.0
+    herramientas: float = 0.0
+    db: float = 0.0
+
+
+_turno: ContextVar[TiemposTurno | None] = ContextVar("tiempos_turno", default=None)
+
+
+def turno_actual() -> TiemposTurno | None:
+    return _turno.get()
+
+
+def acumular(componente: str, segundos: float) -> None:
+    """Suma `segundos` al componente del turno en curso (si hay uno)."""
+    tiempos = _turno.get()
+    if tiempos is not None:
+        setattr(tiempos, componente, getattr(tiempos, componente) + segundos)
+
+
+@contextmanager
+def medir_turno(ruta: str):
+    """Mide el bloque como un turno de chat y observa sus componentes al salir.
+
+    El tiempo de herramientas (y el de la base, que ocurre dentro de ellas) es
+    la suma de cada llamada. Las de una ronda se lanzan a la vez pero su acceso
+    a la base se serializa en la sesión del turno, así que solo lo que hacen
+    fuera de la base se solapa y puede llevar la suma por encima del total.
+    """
+    tiempos = TiemposTurno()
+    token = _turno.set(tiempos)
+    inicio = time.perf_counter()
+    try:
+        yield tiempos
+    finally:
+        _turno.reset(token)
+        DURACION_TURNO.observar(
+            time.perf_counter() - inicio, ruta=ruta, componente="total"
+        )
+        for componente in ("llm", "herramientas", "db"):
+            DURACION_TURNO.observar(
+                getattr(tiempos, componente), ruta=ruta, componente=componente
+            )
@@ -0,0 +1,226 @@
+"""
+Trazas con spans anidados y muestreo por traza.
+
+Una traza empieza en el primer span sin padre (un turno de /chat o una
+herramienta invocada por MCP) y ahí se decide, con probabilidad
+`TRACE_SAMPLE`, si se registra completa o no se registra. Las trazas no
+muestreadas solo pagan una consulta a un ContextVar por span.
+
+Los spans terminados se encolan y un hilo en segundo plano los entrega en
+lotes al exportador: el camino de la petición nunca hace I/O.
+"""
+
+import atexit
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from app.db.connect import settings
+from app.observability.exportadores import Exportador, crear_exportador
+
+# Máximo de spans en cola: si el exportador no da abasto se descartan
+MAX_COLA = 10_000
+LOTE = 200
+
+
+@dataclass
+class Span:
+    nombre: str
+    traza: str
+    id: str
+    padre: str | None
+    inicio: float = field(default_factory=time.time)
+    atributos: dict = field(default_factory=dict)
+    duracion_ms: float | None = None
+    error: str | None = None
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def anotar(self, **atributos) -> None:
+        self.atributos.update(atributos)
+
+    def terminar(self, error: BaseException | None = None) -> None:
+        self.duracion_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        _tracer.encolar(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "traza": self.traza,
+            "span": self.id,
+            "padre": self.padre,
+            "nombre": self.nombre,
+            "inicio": self.inicio,
+            "duracion_ms": self.duracion_ms,
+            "atributos": self.atributos,
+            "error": self.error,
+        }
+
+
+# Marca de "esta traza no se muestrea": sus spans hijos tampoco se registran
+_NO_MUESTREADA = object()
+_actual: ContextVar = ContextVar("span_actual", default=None)
+
+
+def _id(bits: int = 64) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Tracer:
+    def __init__(self, exportador: Exportador | None, muestreo: float):
+        self.exportador = exportador
+        self.muestreo = muestreo
+        self.descartados = 0
+        self._cola: queue.Queue = queue.Queue(maxsize=MAX_COLA)
+        self._hilo: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def encolar(self, span: Span) -> None:
+        if self.exportador is None:
+            return
+        self._arrancar()
+        try:
+            self._cola.put_nowait(span)
+        except queue.Full:
+            self.descartados += 1
+
+    def _arrancar(self) -> None:
+        if self._hilo is not None or self.exportador is None:
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(
+                    target=self._exportar,
+                    args=(self.exportador,),
+                    name="exportador-trazas",
+                    daemon=True,
+                )
+                self._hilo.start()
+
+    def _exportar(self, exportador: Exportador) -> None:
+        while True:
+            lote = [self._cola.get()]
+            while len(lote) < LOTE:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                exportador.exportar([s.to_dict() for s in lote])
+            except Exception:
+                self.descartados += len(lote)
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+
+    def vaciar(self) -> None:
+        """Espera a que se exporten los spans encolados."""
+        if self._hilo is not None:
+            self._cola.join()
+
+
+_tracer = Tracer(
+    crear_exportador(settings.TRACE_EXPORTER, settings.TRACE_FILE),
+    settings.TRACE_SAMPLE,
+)
+atexit.register(lambda: _tracer.vaciar())
+
+
+def configurar(
+    exportador: Exportador | None = None, muestreo: float | None = None
+) -> Tracer:
+    """Reemplaza el exportador y/o la tasa de muestreo. Retorna el tracer anterior."""
+    global _tracer
+    anterior = _tracer
+    anterior.vaciar()
+    _tracer = Tracer(
+        exportador if exportador is not None else anterior.exportador,
+        muestreo if muestreo is not None else anterior.muestreo,
+    )
+    return anterior
+
+
+def restaurar(tracer: Tracer) -> None:
+    global _tracer
+    _tracer.vaciar()
+    _tracer = tracer
+
+
+def vaciar() -> None:
+    _tracer.vaciar()
+
+
+def iniciar_span(nombre: str, /, **atributos) -> Span | None:
+    """Crea un span hijo del actual sin activarlo (para generadores).
+
+    Sin span activo inicia una traza nueva, sujeta al muestreo. Retorna
+    None si la traza no se registra.
+    """
+    padre = _actual.get()
+    if padre is _NO_MUESTREADA:
+        return None
+    if padre is None:
+        if _tracer.exportador is None or random.random() >= _tracer.muestreo:
+            return None
+        return Span(nombre, traza=_id(128), id=_id(), padre=None, atributos=atributos)
+    return Span(
+        nombre, traza=padre.traza, id=_id(), padre=padre.id, atributos=atributos
+    )
+
+
+@contextmanager
+def span(nombre: str, /, **atributos):
+    """Span activo durante el bloque: los spans creados dentro son sus hijos."""
+    nuevo = iniciar_span(nombre, **atributos)
+    if nuevo is None and _actual.get() is not None:
+        yield None  # traza no muestreada: nada que registrar
+        return
+
+    token = _actual.set(nuevo if nuevo is not None else _NO_MUESTREADA)
+    try:
+        yield nuevo
+    except BaseException as e:
+        if nuevo is not None:
+            nuevo.terminar(e)
+            nuevo = None
+        raise
+    finally:
+        _actual.reset(token)
+        if nuevo is not None:
+            nuevo.terminar()
+
+
+def span_actual() -> Span | None:
+    actual = _actual.get()
+    return None if actual is _NO_MUESTREADA else actual
+
+
+def anotar(**atributos) -> None:
+    """Agrega atributos al span activo (si la traza se está registrando)."""
+    actual = span_actual()
+    if actual is not None:
+        actual.anotar(**atributos)
+
+
+def registrar(nombre: str, duracion: float, /, **atributos) -> None:
+    """Registra un span ya medido (en segundos) como hijo del span activo.
+
+    Nunca inicia una traza: las mediciones de bajo nivel (checkout del pool,
+    consultas) solo se registran dentro de una traza muestreada.
+    """
+    padre = span_actual()
+    if padre is None:
+        return
+    hecho = Span(
+        nombre,
+        traza=padre.traza,
+        id=_id(),
+        padre=padre.id,
+        inicio=time.time() - duracion,
+        atributos=atributos,
+    )
+    hecho.duracion_ms = round(duracion * 1000, 3)
+    _tracer.encolar(hecho)
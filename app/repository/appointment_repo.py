@@ -1,14 +1,100 @@
+from datetime import datetime
+from sqlalchemy import and_, func, insert, literal, or_, select, tuple_
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
-from app.models.modelos import AppointmentScheduling
+from app.models.modelos import AppointmentScheduling, AppointmentState
+from app.repository.errors import es_espera_agotada
+
+COLUMNAS_LISTADO = (
+    AppointmentScheduling.id,
+    AppointmentScheduling.appointmentDate,
+    AppointmentScheduling.ubicacion,
+    AppointmentScheduling.appointmentState,
+    AppointmentScheduling.clientId,
+)
 
 
 class AppointmentRepository:
     @staticmethod
-    def create(db: Session, appointment: AppointmentScheduling):
-        db.add(appointment)
-        db.commit()
-        db.refresh(appointment)
-        return appointment
+    def insert(db: Session, **valores) -> int:
+        """INSERT ... RETURNING id. Si el cliente no existe lanza IntegrityError (FK)."""
+        stmt = (
+            insert(AppointmentScheduling)
+            .values(**valores)
+            .returning(AppointmentScheduling.id)
+        )
+        return db.execute(stmt).scalar_one()
+
+    @staticmethod
+    def insert_many(db: Session, filas: list[dict]) -> list[int]:
+        """Un INSERT ... VALUES de varias filas RETURNING id, en el orden de `filas`."""
+        if not filas:
+            return []
+        stmt = insert(AppointmentScheduling).returning(
+            AppointmentScheduling.id, sort_by_parameter_order=True
+        )
+        return list(db.execute(stmt, filas).scalars())
+
+    @staticmethod
+    def lock_slot(db: Session, clave: tuple[int, int], espera_ms: int) -> bool:
+        """Advisory lock de transacción sobre un slot de la agenda.
+
+        Serializa las reservas del mismo slot entre procesos; se libera
+        solo con el commit o rollback de la transacción. Espera como mucho
+        `espera_ms` (SET LOCAL lock_timeout, vigente hasta el fin de la
+        transacción) y retorna False si se agota o hay un deadlock. Corre
+        en su propio SAVEPOINT para que ese error no aborte la transacción.
+        """
+        try:
+            with db.begin_nested():
+                db.execute(
+                    select(
+                        func.set_config("lock_timeout", f"{espera_ms}ms", True),
+                        func.pg_advisory_xact_lock(*clave),
+                    )
+                )
+        except DBAPIError as e:
+            if not es_espera_agotada(e):
+                raise
+            return False
+        return True
+
+    @staticmethod
+    def insert_if_capacity(
+        db: Session,
+        desde: datetime,
+        hasta: datetime,
+        capacidad: int,
+        capacidad_empleado: int,
+        **valores,
+    ) -> int | None:
+        """INSERT ... SELECT ... WHERE quedan cupos en [desde, hasta) RETURNING id.
+
+        Retorna None si el slot está lleno (en total o para `employedId`).
+        Debe ejecutarse con el lock del slot tomado: así el conteo ve todas
+        las reservas confirmadas antes de obtenerlo.
+        """
+        cita = AppointmentScheduling
+        en_slot = (
+            cita.appointmentDate >= desde,
+            cita.appointmentDate < hasta,
+            cita.appointmentState != AppointmentState.CANCELADA,
+        )
+        condicion = select(func.count()).where(*en_slot).scalar_subquery() < capacidad
+        if valores.get("employedId") is not None:
+            del_empleado = (
+                select(func.count())
+                .where(*en_slot, cita.employedId == valores["employedId"])
+                .scalar_subquery()
+            )
+            condicion &= del_empleado < capacidad_empleado
+
+        columnas = list(valores)
+        fila = select(
+            *(literal(v, cita.__table__.c[c].type) for c, v in valores.items())
+        ).where(condicion)
+        stmt = insert(cita).from_select(columnas, fila).returning(cita.id)
+        return db.execute(stmt).scalar_one_or_none()
 
     @staticmethod
     def get_by_id(db: Session, appointment_id: int):
@@ -19,8 +105,23 @@ class AppointmentRepository:
         )
 
     @staticmethod
-    def list(db: Session):
-        return db.query(AppointmentScheduling).all()
+    def list_query(after_id: int | None = None):
+        """SELECT de citas (solo columnas del listado) ordenado por id."""
+        stmt = select(*COLUMNAS_LISTADO).order_by(AppointmentScheduling.id)
+        if after_id is not None:
+            stmt = stmt.where(AppointmentScheduling.id > after_id)
+        return stmt
+
+    @staticmethod
+    def list_page(db: Session, after_id: int | None = None, limit: int = 50):
+        """Una página de citas a partir del cursor `after_id`."""
+        return db.execute(AppointmentRepository.list_query(after_id).limit(limit)).all()
+
+    @staticmethod
+    def iter_all(db: Session, batch: int = 1000):
+        """Recorre todas las citas con un cursor del lado del servidor."""
+        stmt = AppointmentRepository.list_query().execution_options(yield_per=batch)
+        yield from db.execute(stmt)
 
     @staticmethod
     def delete(db: Session, appointment_id: int):
@@ -28,13 +129,72 @@ class AppointmentRepository:
         if not cita:
             return None
         db.delete(cita)
-        db.commit()
-        return True
+        db.flush()
+        return cita
 
     @staticmethod
-    def get_all_by_id(db: Session, id_u: int):
-        return (
-            db.query(AppointmentScheduling)
-            .filter(AppointmentScheduling.id == id_u)
-            .all()
+    def list_by_client(
+        db: Session,
+        client_id: int,
+        desde: datetime | None = None,
+        hasta: datetime | None = None,
+        after: tuple[datetime, int] | None = None,
+        limit: int = 20,
+    ):
+        """Citas de un cliente ordenadas por (fecha, id).
+
+        Usa el índice ix_cita_cliente_fecha (clientId, appointmentDate).
+        `after` es el cursor (fecha, id) de la última cita ya vista.
+        """
+        cita = AppointmentScheduling
+        stmt = select(
+            cita.id,
+            cita.appointmentDate,
+            cita.ubicacion,
+            cita.details,
+            cita.appointmentState,
+            cita.employedId,
+        ).where(cita.clientId == client_id)
+
+        if desde is not None:
+            stmt = stmt.where(cita.appointmentDate >= desde)
+        if hasta is not None:
+            stmt = stmt.where(cita.appointmentDate < hasta)
+        if after is not None:
+            fecha, id_ = after
+            stmt = stmt.where(
+                tuple_(cita.appointmentDate, cita.id)
+                > tuple_(literal(fecha), literal(id_))
+            )
+
+        stmt = stmt.order_by(cita.appointmentDate, cita.id).limit(limit)
+        return db.execute(stmt).all()
+
+    @staticmethod
+    def list_in_range(db: Session, desde: datetime, hasta: datetime):
+        """(fecha, empleado) de las citas no canceladas en [desde, hasta).
+
+        Alimenta el índice de disponibilidad; usa ix_cita_fecha.
+        """
+        cita = AppointmentScheduling
+        stmt = select(cita.appointmentDate, cita.employedId).where(
+            cita.appointmentDate >= desde,
+            cita.appointmentDate < hasta,
+            cita.appointmentState != AppointmentState.CANCELADA,
+        )
+        return db.execute(stmt).all()
+
+    @staticmethod
+    def list_in_slots(db: Session, slots: list[datetime], duracion):
+        """(fecha, empleado) de las citas no canceladas dentro de `slots`."""
+        cita = AppointmentScheduling
+        stmt = select(cita.appointmentDate, cita.employedId).where(
+            cita.appointmentState != AppointmentState.CANCELADA,
+            or_(
+                *(
+                    and_(cita.appointmentDate >= s, cita.appointmentDate < s + duracion)
+                    for s in slots
+                )
+            ),
         )
+        return db.execute(stmt).all()
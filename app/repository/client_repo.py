@@ -1,21 +1,29 @@
 from re import fullmatch
-from sqlalchemy.orm import Session, identity
+from sqlalchemy import func, select, true
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, identity, joinedload
 from app.schemas.client import ClientCreate, ClientResponse
-from app.models.modelos import Client
+from app.models.modelos import AppointmentScheduling, AppointmentState, Client
 from datetime import datetime
 
 
-def create_client(db: Session, data: ClientCreate):
-    client = Client(
-        fullName=data.fullName,
-        fullSurname=data.fullSurname,
-        identified=data.identified,
-        updatedAt=datetime.utcnow(),
+def insert_client(db: Session, data: ClientCreate) -> int | None:
+    """INSERT ... ON CONFLICT (identified) DO NOTHING RETURNING id.
+
+    Una sola sentencia: retorna el id nuevo o None si la identificación ya existe.
+    """
+    stmt = (
+        insert(Client)
+        .values(
+            fullName=data.fullName,
+            fullSurname=data.fullSurname,
+            identified=data.identified,
+            updatedAt=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=[Client.identified])
+        .returning(Client.id)
     )
-    db.add(client)
-    db.commit()
-    db.refresh(client)
-    return client
+    return db.execute(stmt).scalar()
 
 
 def get_client_by_id(db: Session, client_id: int):
@@ -24,3 +32,77 @@ def get_client_by_id(db: Session, client_id: int):
 
 def get_client_by_identified(db: Session, identified: str):
     return db.query(Client).filter(Client.identified == identified).first()
+
+
+def existing_client_ids(db: Session, ids) -> set[int]:
+    """Cuáles de `ids` son clientes registrados (una consulta)."""
+    return set(db.scalars(select(Client.id).where(Client.id.in_(set(ids)))))
+
+
+# ==== Listados: proyección de columnas + paginación por cursor (keyset) ====
+COLUMNAS_LISTADO = (
+    Client.id,
+    Client.fullName,
+    Client.fullSurname,
+    Client.identified,
+    Client.createdAt,
+)
+
+
+def active_clients_query(after_id: int | None = None):
+    """SELECT de clientes activos ordenado por id, a partir de `after_id`."""
+    stmt = (
+        select(*COLUMNAS_LISTADO)
+        .where(Client.clientState == true())
+        .order_by(Client.id)
+    )
+    if after_id is not None:
+        stmt = stmt.where(Client.id > after_id)
+    return stmt
+
+
+def list_active_clients(db: Session, after_id: int | None = None, limit: int = 50):
+    """Una página de clientes activos (filas, no entidades ORM)."""
+    return db.execute(active_clients_query(after_id).limit(limit)).all()
+
+
+def iter_active_clients(db: Session, batch: int = 1000):
+    """Recorre todos los clientes activos con un cursor del lado del servidor."""
+    stmt = active_clients_query().execution_options(yield_per=batch)
+    yield from db.execute(stmt)
+
+
+# ==== Perfil: cliente + contactos + próximas citas en dos SELECT ====
+def get_client_profile(
+    db: Session, identified: str, desde: datetime, max_citas: int
+) -> tuple[Client, list[AppointmentScheduling], int] | None:
+    """Cliente con sus contactos y sus primeras `max_citas` citas no canceladas
+    desde `desde`, más el total de esas citas.
+
+    Los contactos van con LEFT JOIN junto al cliente; las citas en una segunda
+    consulta con LIMIT y count(*) OVER (), así no se multiplican por los
+    contactos ni se cargan las que no se van a mostrar.
+    """
+    stmt = (
+        select(Client)
+        .where(Client.identified == identified)
+        .options(joinedload(Client.clientContact))
+        # La sesión de un turno puede tener ya al cliente con otras colecciones
+        .execution_options(populate_existing=True)
+    )
+    cliente = db.scalars(stmt).unique().one_or_none()
+    if cliente is None:
+        return None
+
+    stmt = (
+        select(AppointmentScheduling, func.count().over())
+        .where(
+            AppointmentScheduling.clientId == cliente.id,
+            AppointmentScheduling.appointmentDate >= desde,
+            AppointmentScheduling.appointmentState != AppointmentState.CANCELADA,
+        )
+        .order_by(AppointmentScheduling.appointmentDate, AppointmentScheduling.id)
+        .limit(max_citas)
+    )
+    filas = db.execute(stmt).all()
+    return cliente, [cita for cita, _ in filas], filas[0][1] if filas else 0
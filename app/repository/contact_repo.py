@@ -1,20 +1,35 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.models.modelos import ClientContact
 from app.schemas.client_contact import ClientContactCreate
 from datetime import datetime
 
 
-def create_client_contact(db: Session, data: ClientContactCreate):
+def insert_client_contact(db: Session, data: ClientContactCreate) -> int:
+    """INSERT ... RETURNING id. Si el cliente no existe lanza IntegrityError (FK)."""
     now = datetime.utcnow()  # fecha actual en UTC
-    contact = ClientContact(
-        clientId=data.clientId,
-        phoneNumber=data.phoneNumber,
-        email=data.email,
-        address=data.address,
-        createAt=now,
-        updatedAt=now,
+    stmt = (
+        insert(ClientContact)
+        .values(
+            clientId=data.clientId,
+            phoneNumber=data.phoneNumber,
+            email=data.email,
+            address=data.address,
+            createAt=now,
+            updatedAt=now,
+        )
+        .returning(ClientContact.id)
     )
-    db.add(contact)
-    db.commit()
-    db.refresh(contact)
-    return contact
+    return db.execute(stmt).scalar_one()
+
+
+def insert_client_contacts(db: Session, datos: list[ClientContactCreate]) -> list[int]:
+    """Un INSERT ... VALUES de varias filas RETURNING id, en el orden de `datos`."""
+    if not datos:
+        return []
+    now = datetime.utcnow()
+    stmt = insert(ClientContact).returning(
+        ClientContact.id, sort_by_parameter_order=True
+    )
+    filas = [{**d.model_dump(), "createAt": now, "updatedAt": now} for d in datos]
+    return list(db.execute(stmt, filas).scalars())
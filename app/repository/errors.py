@@ -0,0 +1,19 @@
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+# Códigos SQLSTATE de PostgreSQL (psycopg2 y asyncpg exponen `pgcode`)
+FOREIGN_KEY_VIOLATION = "23503"
+UNIQUE_VIOLATION = "23505"
+LOCK_NOT_AVAILABLE = "55P03"  # lock_timeout agotado
+DEADLOCK_DETECTED = "40P01"
+
+
+def es_violacion(error: IntegrityError, codigo: str) -> bool:
+    return getattr(error.orig, "pgcode", None) == codigo
+
+
+def es_espera_agotada(error: DBAPIError) -> bool:
+    """La espera por un lock se cortó (lock_timeout o deadlock)."""
+    return getattr(error.orig, "pgcode", None) in (
+        LOCK_NOT_AVAILABLE,
+        DEADLOCK_DETECTED,
+    )
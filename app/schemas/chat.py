@@ -1,11 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
+# Mismo límite que Conversation.id (String(64)); new_id() genera "conv_<hex>"
+CONVERSACION_ID_MAX = 64
+CONVERSACION_ID_PATRON = r"^[A-Za-z0-9_-]+$"
+
 
 # Modelos Pydantic
 class MensajeRequest(BaseModel):
     mensaje: str
-    conversacion_id: Optional[str] = None
+    conversacion_id: Optional[str] = Field(
+        None, max_length=CONVERSACION_ID_MAX, pattern=CONVERSACION_ID_PATRON
+    )
 
 
 class MensajeResponse(BaseModel):
@@ -3,7 +3,7 @@ Servidor MCP para el Bot de Taller Express
 Expone las herramientas a través del protocolo MCP
 """
 
-from app.mcp.agent import agent
+from app.mcp.agent import get_agent
 
 if __name__ == "__main__":
-    agent.run()
+    get_agent().run()
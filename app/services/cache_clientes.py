@@ -0,0 +1,211 @@
+"""
+Caché read-through de `buscar_cliente`, por número de identificación.
+
+Casi toda conversación empieza buscando al cliente, y el mismo número se
+vuelve a buscar en el mismo chat y en los reintentos. Se guardan tanto los
+encontrados como los "not_found" (el caso típico antes de registrarlo).
+
+Invalidación:
+- `invalidar_cliente(db, identified)` al crear o modificar un cliente; las
+  altas y cambios hechos con el ORM se detectan solos (eventos del mapper).
+  Se aplica tras el commit (ver app.db.al_confirmar) y, mientras tanto, la
+  sesión que hizo el cambio lee de la base, que sí lo ve.
+- Cada invalidación sube un contador de generación. Una lectura anota la
+  generación antes de ir a la base y solo guarda si no cambió: así una
+  lectura lenta que empezó antes de un commit no deja el dato viejo.
+
+El almacenamiento es enchufable: en memoria (por proceso, con expiración
+fija desde que se guarda) o Redis (compartido entre workers), según
+CLIENTES_CACHE.
+"""
+
+import json
+import threading
+import time
+from functools import lru_cache
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.core.lru import LRUTTL
+from app.core.serializacion import a_json
+from app.db.al_confirmar import al_confirmar, diferir, pendientes
+from app.db.connect import settings
+from app.models.modelos import Client
+from app.observability.metricas import CACHE_CLIENTES
+
+# Solo se guardan respuestas definitivas; los errores se reintentan
+CACHEABLES = ("success", "not_found")
+
+
+class BackendMemoria:
+    def __init__(self, max_items: int, ttl: float, reloj=time.monotonic):
+        # Expiración fija: las invalidaciones no llegan a otros procesos (ni
+        # desde la importación por CLI) y el TTL es lo que acota el dato viejo,
+        # aunque la clave se siga leyendo
+        self._datos = LRUTTL(max_items, ttl, reloj, deslizante=False)
+        self._generacion = 0
+        # Serializa "comparar generación y guardar" contra las invalidaciones
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> dict | None:
+        return self._datos.get(clave)
+
+    def generacion(self, clave: str) -> int:
+        return self._generacion
+
+    def guardar(self, clave: str, valor: dict, generacion: int) -> bool:
+        with self._lock:
+            if generacion != self._generacion:
+                return False
+            self._datos.set(clave, valor)
+            return True
+
+    def invalidar(self, claves: list[str]) -> None:
+        with self._lock:
+            self._generacion += 1
+            for clave in claves:
+                self._datos.pop(clave)
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+
+# Guarda solo si la generación de la clave no cambió desde la lectura
+_GUARDAR_SI = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[2] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+class BackendRedis:
+    """Compartido entre workers. La generación es por clave (INCR en Redis)."""
+
+    def __init__(self, url: str, ttl: float, prefijo: str = "taller:cliente:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "CLIENTES_CACHE=redis requiere `pip install redis`"
+            ) from e
+
+        self._redis = redis.Redis.from_url(url)
+        self._guardar_si = self._redis.register_script(_GUARDAR_SI)
+        self.ttl_ms = int(ttl * 1000)
+        self.prefijo = prefijo
+
+    def _claves(self, clave: str) -> tuple[str, str]:
+        return f"{self.prefijo}{clave}", f"{self.prefijo}gen:{clave}"
+
+    def obtener(self, clave: str) -> dict | None:
+        valor = self._redis.get(self._claves(clave)[0])
+        return None if valor is None else json.loads(valor)
+
+    def generacion(self, clave: str) -> int:
+        return int(self._redis.get(self._claves(clave)[1]) or 0)
+
+    def guardar(self, clave: str, valor: dict, generacion: int) -> bool:
+        argumentos = [a_json(valor), str(generacion), self.ttl_ms]
+        return bool(self._guardar_si(keys=self._claves(clave), args=argumentos))
+
+    def invalidar(self, claves: list[str]) -> None:
+        with self._redis.pipeline() as pipe:  # MULTI/EXEC
+            for clave in claves:
+                dato, generacion = self._claves(clave)
+                pipe.incr(generacion)
+                pipe.delete(dato)
+            pipe.execute()
+
+    def __len__(self) -> int:
+        return 0  # no se cuenta: el keyspace es compartido
+
+
+class CacheClientes:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def leer(self, db: Session, identified: str) -> dict | None:
+        """Resultado guardado, o None si hay que ir a la base."""
+        if identified in pendientes(db, _INVALIDACIONES):
+            CACHE_CLIENTES.inc(resultado="omitido")
+            return None
+        valor = self.backend.obtener(identified)
+        CACHE_CLIENTES.inc(resultado="fallo" if valor is None else "acierto")
+        if valor is None:
+            return None
+        # Copia: quien recibe el dict puede modificarlo
+        if "data" in valor:
+            return {**valor, "data": dict(valor["data"])}
+        return dict(valor)
+
+    def generacion(self, identified: str) -> int:
+        return self.backend.generacion(identified)
+
+    def guardar(
+        self, db: Session, identified: str, resultado: dict, generacion: int
+    ) -> None:
+        # Lo que la sesión leyó con cambios propios sin confirmar no se comparte
+        if resultado.get("status") not in CACHEABLES:
+            return
+        if identified in pendientes(db, _INVALIDACIONES):
+            return
+        self.backend.guardar(identified, resultado, generacion)
+
+
+class _SinCache:
+    def obtener(self, clave):
+        return None
+
+    def generacion(self, clave):
+        return 0
+
+    def guardar(self, clave, valor, generacion):
+        return False
+
+    def invalidar(self, claves):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+@lru_cache
+def get_cache_clientes() -> CacheClientes:
+    if settings.CLIENTES_CACHE == "redis":
+        backend = BackendRedis(settings.REDIS_URL, settings.CLIENTES_CACHE_TTL)
+    elif settings.CLIENTES_CACHE == "memory":
+        backend = BackendMemoria(
+            settings.CLIENTES_CACHE_MAX, settings.CLIENTES_CACHE_TTL
+        )
+    else:
+        backend = _SinCache()
+    return CacheClientes(backend)
+
+
+# ==== Invalidación al confirmar la transacción ====
+_INVALIDACIONES = "clientes"
+
+
+def invalidar_cliente(db: Session, identified: str) -> None:
+    """Anota que `identified` cambió; se invalida con el commit."""
+    diferir(db, _INVALIDACIONES, identified)
+
+
+@al_confirmar(_INVALIDACIONES)
+def _invalidar(identificaciones: list) -> None:
+    get_cache_clientes().backend.invalidar(list(dict.fromkeys(identificaciones)))
+
+
+@event.listens_for(Client, "after_insert")
+@event.listens_for(Client, "after_update")
+@event.listens_for(Client, "after_delete")
+def _cliente_modificado(mapper, connection, cliente):
+    db = object_session(cliente)
+    if db is None:
+        return
+    # Si cambió la identificación, también la anterior
+    historial = inspect(cliente).attrs.identified.history
+    for identified in {cliente.identified, *historial.deleted}:
+        if identified is not None:
+            invalidar_cliente(db, identified)
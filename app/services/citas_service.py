@@ -1,56 +1,269 @@
-import json
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.db.connect import settings
 from app.schemas.appointment import AppointmentCreate
 from app.models.modelos import AppointmentScheduling
 from app.models.modelos import Client
 from app.models.enums.appointment_state import AppointmentState
 from app.repository.appointment_repo import AppointmentRepository
+from app.repository.client_repo import existing_client_ids
+from app.repository.errors import FOREIGN_KEY_VIOLATION, es_violacion
+from app.services.disponibilidad import (
+    DisponibilidadService,
+    Horario,
+    Ocupacion,
+    clave_slot,
+    get_motor,
+    registrar_cambio,
+)
+from app.services.paginacion import limitar, paginar
+
+
+def _cita_listado(c) -> dict:
+    return {
+        "id": c.id,
+        "date": str(c.appointmentDate),
+        "ubicacion": c.ubicacion,
+        "state": c.appointmentState.value,
+        "clientId": c.clientId,
+    }
+
+
+def _cursor_cita(c) -> str:
+    return f"{c.appointmentDate.isoformat()}_{c.id}"
+
+
+def _leer_cursor_cita(cursor: str) -> tuple[datetime, int]:
+    fecha, id_ = cursor.rsplit("_", 1)
+    return datetime.fromisoformat(fecha), int(id_)
+
+
+def _fecha(valor: datetime | str) -> datetime:
+    return datetime.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def _valores(data: AppointmentCreate, fecha: datetime) -> dict:
+    """Columnas del INSERT de una cita."""
+    return dict(
+        appointmentDate=fecha,
+        ubicacion=data.ubicacion,
+        details=data.details,
+        appointmentState=data.state.value,
+        clientId=data.clientId,
+        employedId=data.employedId,
+    )
+
+
+# Otra transacción tiene el lock del slot más de SLOT_LOCK_TIMEOUT_MS
+SLOT_EN_RESERVA = "Otra reserva está tomando ese horario"
+
+
+def _tomar_slot(db: Session, slot: datetime) -> bool:
+    return AppointmentRepository.lock_slot(
+        db, clave_slot(slot), settings.SLOT_LOCK_TIMEOUT_MS
+    )
+
+
+def _slot_ocupado(db: Session, slot: datetime, empleado, mensaje: str) -> dict:
+    motor = get_motor()
+    return {
+        "status": "slot_taken",
+        "message": mensaje,
+        "fecha": f"{slot:%Y-%m-%d %H:%M}",
+        "alternativas": DisponibilidadService.alternativas(
+            db, slot + motor.horario.slot, empleado
+        ),
+    }
+
+
+def _estado_lote(creados: int, total: int) -> str:
+    if creados == total:
+        return "success"
+    return "partial" if creados else "error"
+
+
+def _ocupar(ocupacion: dict, slot: datetime, empleado) -> Ocupacion:
+    actual = ocupacion.setdefault(slot, Ocupacion())
+    actual.total += 1
+    if empleado is not None:
+        actual.empleados[empleado] += 1
+    return actual
+
+
+def _repartir(horario: Horario, citas, ocupacion: dict) -> list[bool]:
+    """Ubica en orden las citas (slot, empleado) sobre `ocupacion`; False si no caben."""
+    caben = []
+    for slot, empleado in citas:
+        cabe = slot is None or horario.tiene_cupo(ocupacion.get(slot), empleado)
+        if cabe and slot is not None:
+            _ocupar(ocupacion, slot, empleado)
+        caben.append(cabe)
+    return caben
 
 
 class AppointmentService:
     @staticmethod
-    def crear_cita(db: Session, data: AppointmentCreate) -> str:
-        client = db.query(Client).filter(Client.id == data.clientId).first()
-        if not client:
-            return json.dumps(
-                {"status": "error", "message": "El cliente no existe"},
-                indent=2,
-                ensure_ascii=False,
-            )
-
-        cita = AppointmentScheduling(
-            appointmentDate=data.appointmentDate,
-            ubicacion=data.ubicacion,
-            details=data.details,
-            appointmentState=data.state,
-            clientId=data.clientId,
-            employedId=None,
-        )
+    def crear_cita(db: Session, data: AppointmentCreate) -> dict:
+        fecha = _fecha(data.appointmentDate)
+        valores = _valores(data, fecha)
+        motor = get_motor()
+        slot = motor.horario.slot_de(fecha)
 
-        cita = AppointmentRepository.create(db, cita)
+        # La FK garantiza que el cliente exista: no hace falta consultarlo antes
+        try:
+            if slot is None:
+                # Fuera de horario no hay cupos que controlar (la herramienta
+                # ya las rechaza antes de llegar aquí)
+                appointment_id = AppointmentRepository.insert(db, **valores)
+            else:
+                # Lock del slot + INSERT condicional: dos reservas concurrentes
+                # del mismo slot se serializan y la segunda ve la primera
+                if not _tomar_slot(db, slot):
+                    return _slot_ocupado(db, slot, data.employedId, SLOT_EN_RESERVA)
+                appointment_id = AppointmentRepository.insert_if_capacity(
+                    db,
+                    slot,
+                    slot + motor.horario.slot,
+                    motor.horario.capacidad,
+                    motor.horario.capacidad_empleado,
+                    **valores,
+                )
+                if appointment_id is None:
+                    # Slot lleno: si el índice en memoria lo daba por libre,
+                    # está desactualizado
+                    motor.invalidar(slot.date())
+                    return _slot_ocupado(
+                        db, slot, data.employedId, "Ese horario ya está ocupado"
+                    )
+        except IntegrityError as e:
+            if not es_violacion(e, FOREIGN_KEY_VIOLATION):
+                raise
+            return {"status": "error", "message": "El cliente no existe"}
 
-        return json.dumps(
-            {
-                "status": "success",
-                "message": "Cita creada correctamente",
-                "appointmentId": cita.id,
+        registrar_cambio(db, fecha, data.employedId, +1)
+        return {
+            "status": "success",
+            "message": "Cita creada correctamente",
+            "appointmentId": appointment_id,
+            # Se expone en /chat como datos_cita
+            "data": {
+                "id": appointment_id,
+                "date": str(fecha),
+                "ubicacion": data.ubicacion,
+                "details": data.details,
+                "state": data.state.value,
+                "clientId": data.clientId,
+                "employedId": data.employedId,
             },
-            indent=2,
-            ensure_ascii=False,
+        }
+
+    @staticmethod
+    def crear_citas_lote(db: Session, citas: list[AppointmentCreate]) -> dict:
+        """Crea varias citas con un solo INSERT; retorna un resultado por cita.
+
+        Los choques entre citas del mismo lote se resuelven en memoria (gana
+        la primera). Para las demás se toman los locks de sus slots, en orden
+        para no cruzarse con otro lote, y se cuentan con una consulta las
+        citas ya agendadas en ellos.
+        """
+        if not citas:
+            return {"status": "error", "message": "El lote no tiene citas"}
+
+        motor = get_motor()
+        horario = motor.horario
+        fechas = [_fecha(c.appointmentDate) for c in citas]
+        slots = [horario.slot_de(f) for f in fechas]
+        resultados: list[dict | None] = [None] * len(citas)
+
+        def sin_resultado() -> list[int]:
+            return [i for i, r in enumerate(resultados) if r is None]
+
+        # 1. Choques dentro del lote, sin ir a la base
+        caben = _repartir(
+            horario, [(s, c.employedId) for s, c in zip(slots, citas)], {}
         )
+        for i, cabe in enumerate(caben):
+            if not cabe:
+                resultados[i] = {
+                    "status": "slot_taken",
+                    "message": "Otra cita del lote ocupa ese horario",
+                }
+
+        clientes = existing_client_ids(db, (citas[i].clientId for i in sin_resultado()))
+        for i in sin_resultado():
+            if citas[i].clientId not in clientes:
+                resultados[i] = {"status": "error", "message": "El cliente no existe"}
+
+        # 2. Cupo real de los slots restantes, con sus locks tomados
+        en_horario = sorted({s for i in sin_resultado() if (s := slots[i])})
+        en_reserva = {slot for slot in en_horario if not _tomar_slot(db, slot)}
+        for i in sin_resultado():
+            if slots[i] in en_reserva:
+                resultados[i] = {"status": "slot_taken", "message": SLOT_EN_RESERVA}
+        en_horario = [slot for slot in en_horario if slot not in en_reserva]
+
+        restantes = sin_resultado()
+        ocupacion = {}
+        if en_horario:
+            for fecha, empleado in AppointmentRepository.list_in_slots(
+                db, en_horario, horario.slot
+            ):
+                if (slot := horario.slot_de(fecha)) is not None:
+                    _ocupar(ocupacion, slot, empleado)
+
+        caben = _repartir(
+            horario, [(slots[i], citas[i].employedId) for i in restantes], ocupacion
+        )
+        # Fuera de horario (slot None) siempre cabe: los slot_taken tienen slot
+        for i, cabe in zip(restantes, caben):
+            if not cabe and (slot := slots[i]) is not None:
+                motor.invalidar(slot.date())  # el índice lo daba por libre
+                resultados[i] = {
+                    "status": "slot_taken",
+                    "message": "Ese horario ya está ocupado",
+                }
+
+        # 3. Un solo INSERT para las que caben
+        aceptadas = sin_resultado()
+        ids = AppointmentRepository.insert_many(
+            db, [_valores(citas[i], fechas[i]) for i in aceptadas]
+        )
+        for i, appointment_id in zip(aceptadas, ids):
+            registrar_cambio(db, fechas[i], citas[i].employedId, +1)
+            resultados[i] = {
+                "status": "success",
+                "appointmentId": appointment_id,
+                "date": str(fechas[i]),
+                "clientId": citas[i].clientId,
+            }
+
+        # Las alternativas ya descuentan las citas recién creadas
+        for r, slot, cita in zip(resultados, slots, citas):
+            if r is not None and r["status"] == "slot_taken" and slot is not None:
+                r["fecha"] = f"{slot:%Y-%m-%d %H:%M}"
+                r["alternativas"] = DisponibilidadService.alternativas(
+                    db, slot + horario.slot, cita.employedId
+                )
+
+        creadas = len(aceptadas)
+        return {
+            "status": _estado_lote(creadas, len(citas)),
+            "message": f"{creadas} de {len(citas)} citas creadas",
+            "creadas": creadas,
+            "resultados": resultados,
+        }
 
     @staticmethod
-    def obtener_cita(db: Session, appointment_id: int) -> str:
+    def obtener_cita(db: Session, appointment_id: int) -> dict:
         cita = AppointmentRepository.get_by_id(db, appointment_id)
         if not cita:
-            return json.dumps(
-                {"status": "error", "message": "Cita no encontrada"},
-                indent=2,
-                ensure_ascii=False,
-            )
-
-        return json.dumps(
-            {
+            return {"status": "error", "message": "Cita no encontrada"}
+
+        return {
+            "status": "success",
+            "data": {
                 "id": cita.id,
                 "date": str(cita.appointmentDate),
                 "ubicacion": cita.ubicacion,
@@ -59,80 +272,134 @@ class AppointmentService:
                 "clientId": cita.clientId,
                 "employedId": cita.employedId,
             },
-            indent=2,
-            ensure_ascii=False,
-        )
+        }
 
     @staticmethod
-    def listar_citas(db: Session) -> str:
-        citas = AppointmentRepository.list(db)
+    def listar_citas(db: Session, cursor: int | None = None, limite: int = 50) -> dict:
+        limite = limitar(limite)
+        filas = AppointmentRepository.list_page(db, after_id=cursor, limit=limite + 1)
+        pagina, siguiente = paginar(filas, limite)
 
-        if not citas:
-            return json.dumps(
-                {"status": "success", "message": "No hay citas registradas"},
-                indent=2,
-                ensure_ascii=False,
-            )
-
-        return json.dumps(
-            [
-                {
-                    "id": c.id,
-                    "date": str(c.appointmentDate),
-                    "ubicacion": c.ubicacion,
-                    "state": c.appointmentState.value,
-                    "clientId": c.clientId,
-                }
-                for c in citas
-            ],
-            indent=2,
-            ensure_ascii=False,
-        )
+        if not pagina and cursor is None:
+            return {"status": "success", "message": "No hay citas registradas"}
+
+        return {
+            "status": "success",
+            "data": [_cita_listado(c) for c in pagina],
+            "siguiente_cursor": siguiente,
+        }
 
     @staticmethod
-    def eliminar_cita(db: Session, appointment_id: int) -> str:
-        ok = AppointmentRepository.delete(db, appointment_id)
-        if not ok:
-            return json.dumps(
-                {"status": "error", "message": "Cita no encontrada"},
-                indent=2,
-                ensure_ascii=False,
-            )
-
-        return json.dumps(
-            {"status": "success", "message": "Cita eliminada"},
-            indent=2,
-            ensure_ascii=False,
-        )
+    def exportar_citas(db: Session, lote: int = 1000):
+        """Genera todas las citas como dicts, en streaming."""
+        for fila in AppointmentRepository.iter_all(db, batch=lote):
+            yield _cita_listado(fila)
 
     @staticmethod
-    def obtener_citas_por_cliente(db: Session, client_id: int) -> str:
-        citas = AppointmentRepository.get_all_by_id(db, client_id)
+    def eliminar_cita(db: Session, appointment_id: int) -> dict:
+        cita = AppointmentRepository.delete(db, appointment_id)
+        if not cita:
+            return {"status": "error", "message": "Cita no encontrada"}
 
-        if not citas:
-            return json.dumps(
-                {
-                    "status": "success",
-                    "message": "El cliente no tiene citas registradas",
-                    "citas": [],
-                },
-                indent=2,
-                ensure_ascii=False,
-            )
-
-        return json.dumps(
-            [
+        if cita.appointmentState.value != AppointmentState.CANCELADA.value:
+            registrar_cambio(db, cita.appointmentDate, cita.employedId, -1)
+
+        return {"status": "success", "message": "Cita eliminada"}
+
+    @staticmethod
+    def obtener_citas_por_cliente(
+        db: Session,
+        client_id: int,
+        desde: datetime | None = None,
+        hasta: datetime | None = None,
+        cursor: str | None = None,
+        limite: int = 20,
+    ) -> dict:
+        """Historial de citas de un cliente por fecha, paginado con cursor."""
+        limite = limitar(limite)
+        try:
+            after = _leer_cursor_cita(cursor) if cursor else None
+        except ValueError:
+            return {"status": "error", "message": "Cursor inválido"}
+
+        filas = AppointmentRepository.list_by_client(
+            db, client_id, desde=desde, hasta=hasta, after=after, limit=limite + 1
+        )
+        citas, siguiente = paginar(filas, limite, clave=_cursor_cita)
+
+        if not citas and cursor is None:
+            return {
+                "status": "success",
+                "message": "El cliente no tiene citas registradas",
+                "citas": [],
+            }
+
+        return {
+            "status": "success",
+            "clientId": client_id,
+            "citas": [
                 {
                     "id": c.id,
                     "date": str(c.appointmentDate),
                     "ubicacion": c.ubicacion,
                     "details": c.details,
                     "state": c.appointmentState.value,
-                    "clientId": c.clientId,
                     "employedId": c.employedId,
                 }
                 for c in citas
             ],
-            indent=2,
-            ensure_ascii=False,
+            "siguiente_cursor": siguiente,
+        }
+
+
+class AsyncAppointmentService:
+    """Versión asíncrona de AppointmentService sobre una AsyncSession."""
+
+    @staticmethod
+    async def crear_cita(db: AsyncSession, data: AppointmentCreate) -> dict:
+        return await db.run_sync(AppointmentService.crear_cita, data)
+
+    @staticmethod
+    async def crear_citas_lote(
+        db: AsyncSession, citas: list[AppointmentCreate]
+    ) -> dict:
+        return await db.run_sync(AppointmentService.crear_citas_lote, citas)
+
+    @staticmethod
+    async def obtener_cita(db: AsyncSession, appointment_id: int) -> dict:
+        return await db.run_sync(AppointmentService.obtener_cita, appointment_id)
+
+    @staticmethod
+    async def listar_citas(
+        db: AsyncSession, cursor: int | None = None, limite: int = 50
+    ) -> dict:
+        return await db.run_sync(AppointmentService.listar_citas, cursor, limite)
+
+    @staticmethod
+    async def exportar_citas(db: AsyncSession, lote: int = 1000):
+        """Streaming con cursor del lado del servidor sobre el driver asíncrono."""
+        stmt = AppointmentRepository.list_query().execution_options(yield_per=lote)
+        async for fila in await db.stream(stmt):
+            yield _cita_listado(fila)
+
+    @staticmethod
+    async def eliminar_cita(db: AsyncSession, appointment_id: int) -> dict:
+        return await db.run_sync(AppointmentService.eliminar_cita, appointment_id)
+
+    @staticmethod
+    async def obtener_citas_por_cliente(
+        db: AsyncSession,
+        client_id: int,
+        desde: datetime | None = None,
+        hasta: datetime | None = None,
+        cursor: str | None = None,
+        limite: int = 20,
+    ) -> dict:
+        return await db.run_sync(
+            AppointmentService.obtener_citas_por_cliente,
+            client_id,
+            desde,
+            hasta,
+            cursor,
+            limite,
         )
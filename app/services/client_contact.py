@@ -1,34 +1,77 @@
-import json
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.schemas.client_contact import ClientContactCreate
 from app.models.modelos import ClientContact
-from app.repository.contact_repo import create_client_contact
+from app.repository.client_repo import existing_client_ids
+from app.repository.contact_repo import insert_client_contact, insert_client_contacts
+from app.repository.errors import FOREIGN_KEY_VIOLATION, es_violacion
 
 
 class ClientContactService:
     @staticmethod
-    def crear_contacto(db: Session, data: ClientContactCreate) -> str:
+    def crear_contacto(db: Session, data: ClientContactCreate) -> dict:
         """Crea un dato de contacto para un cliente."""
         try:
-            contacto = create_client_contact(db, data)
+            contact_id = insert_client_contact(db, data)
 
-            return json.dumps(
-                {
-                    "status": "success",
-                    "message": "Contacto registrado correctamente",
-                    "contactId": contacto.id,
-                    "clientId": contacto.clientId,
-                },
-                indent=2,
-                ensure_ascii=False,
+            return {
+                "status": "success",
+                "message": "Contacto registrado correctamente",
+                "contactId": contact_id,
+                "clientId": data.clientId,
+            }
+
+        except IntegrityError as e:
+            mensaje = (
+                "El cliente no existe"
+                if es_violacion(e, FOREIGN_KEY_VIOLATION)
+                else f"Error creando contacto: {str(e.orig)}"
             )
+            return {"status": "error", "message": mensaje}
 
         except Exception as e:
-            db.rollback()
-            return f"Error creando contacto: {str(e)}"
+            return {"status": "error", "message": f"Error creando contacto: {str(e)}"}
 
     @staticmethod
-    def obtener_contacto(db: Session, contact_id: int) -> str:
+    def crear_contactos_lote(db: Session, contactos: list[ClientContactCreate]) -> dict:
+        """Crea varios contactos con un solo INSERT; un resultado por contacto."""
+        if not contactos:
+            return {"status": "error", "message": "El lote no tiene contactos"}
+        try:
+            clientes = existing_client_ids(db, (c.clientId for c in contactos))
+            validos = [c for c in contactos if c.clientId in clientes]
+            ids = iter(insert_client_contacts(db, validos))
+
+            resultados = [
+                (
+                    {
+                        "status": "success",
+                        "contactId": next(ids),
+                        "clientId": c.clientId,
+                    }
+                    if c.clientId in clientes
+                    else {"status": "error", "message": "El cliente no existe"}
+                )
+                for c in contactos
+            ]
+            creados = len(validos)
+            if creados == len(contactos):
+                status = "success"
+            else:
+                status = "partial" if creados else "error"
+            return {
+                "status": status,
+                "message": f"{creados} de {len(contactos)} contactos registrados",
+                "creados": creados,
+                "resultados": resultados,
+            }
+
+        except Exception as e:
+            return {"status": "error", "message": f"Error creando contactos: {str(e)}"}
+
+    @staticmethod
+    def obtener_contacto(db: Session, contact_id: int) -> dict:
         """Obtiene un contacto por ID."""
         try:
             contacto = (
@@ -36,11 +79,7 @@ class ClientContactService:
             )
 
             if not contacto:
-                return json.dumps(
-                    {"status": "error", "message": "Contacto no encontrado"},
-                    indent=2,
-                    ensure_ascii=False,
-                )
+                return {"status": "error", "message": "Contacto no encontrado"}
 
             data = {
                 "id": contacto.id,
@@ -52,13 +91,16 @@ class ClientContactService:
                 "updatedAt": str(contacto.updatedAt),
             }
 
-            return json.dumps(data, indent=2, ensure_ascii=False)
+            return {"status": "success", "data": data}
 
         except Exception as e:
-            return f"Error obteniendo contacto: {str(e)}"
+            return {
+                "status": "error",
+                "message": f"Error obteniendo contacto: {str(e)}",
+            }
 
     @staticmethod
-    def listar_contactos(db: Session, client_id: int) -> str:
+    def listar_contactos(db: Session, client_id: int) -> dict:
         """
         Lista contactos.
         Si `client_id` viene, filtra por cliente.
@@ -72,11 +114,7 @@ class ClientContactService:
             contactos = query.all()
 
             if not contactos:
-                return json.dumps(
-                    {"status": "success", "message": "No hay contactos registrados"},
-                    indent=2,
-                    ensure_ascii=False,
-                )
+                return {"status": "success", "message": "No hay contactos registrados"}
 
             resultado = [
                 {
@@ -89,13 +127,13 @@ class ClientContactService:
                 for c in contactos
             ]
 
-            return json.dumps(resultado, indent=2, ensure_ascii=False)
+            return {"status": "success", "data": resultado}
 
         except Exception as e:
-            return f"Error listando contactos: {str(e)}"
+            return {"status": "error", "message": f"Error listando contactos: {str(e)}"}
 
     @staticmethod
-    def eliminar_contacto(db: Session, contact_id: int) -> str:
+    def eliminar_contacto(db: Session, contact_id: int) -> dict:
         """Elimina un contacto por ID."""
         try:
             contacto = (
@@ -103,21 +141,41 @@ class ClientContactService:
             )
 
             if not contacto:
-                return json.dumps(
-                    {"status": "error", "message": "El contacto no existe"},
-                    indent=2,
-                    ensure_ascii=False,
-                )
+                return {"status": "error", "message": "El contacto no existe"}
 
             db.delete(contacto)
-            db.commit()
+            db.flush()
 
-            return json.dumps(
-                {"status": "success", "message": "Contacto eliminado exitosamente"},
-                indent=2,
-                ensure_ascii=False,
-            )
+            return {"status": "success", "message": "Contacto eliminado exitosamente"}
 
         except Exception as e:
-            db.rollback()
-            return f"Error eliminando contacto: {str(e)}"
+            return {
+                "status": "error",
+                "message": f"Error eliminando contacto: {str(e)}",
+            }
+
+
+class AsyncClientContactService:
+    """Versión asíncrona de ClientContactService sobre una AsyncSession."""
+
+    @staticmethod
+    async def crear_contacto(db: AsyncSession, data: ClientContactCreate) -> dict:
+        return await db.run_sync(ClientContactService.crear_contacto, data)
+
+    @staticmethod
+    async def crear_contactos_lote(
+        db: AsyncSession, contactos: list[ClientContactCreate]
+    ) -> dict:
+        return await db.run_sync(ClientContactService.crear_contactos_lote, contactos)
+
+    @staticmethod
+    async def obtener_contacto(db: AsyncSession, contact_id: int) -> dict:
+        return await db.run_sync(ClientContactService.obtener_contacto, contact_id)
+
+    @staticmethod
+    async def listar_contactos(db: AsyncSession, client_id: int) -> dict:
+        return await db.run_sync(ClientContactService.listar_contactos, client_id)
+
+    @staticmethod
+    async def eliminar_contacto(db: AsyncSession, contact_id: int) -> dict:
+        return await db.run_sync(ClientContactService.eliminar_contacto, contact_id)
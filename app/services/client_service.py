@@ -1,16 +1,46 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.fechas import ahora_colombia
 from app.schemas.client import ClientCreate
 from app.repository.client_repo import (
-    create_client,
+    insert_client,
     get_client_by_id,
     get_client_by_identified,
+    get_client_profile,
+    active_clients_query,
+    iter_active_clients,
+    list_active_clients,
 )
+from app.services.cache_clientes import get_cache_clientes, invalidar_cliente
+from app.services.paginacion import limitar, paginar
+
+
+def _sin_vacios(**campos) -> dict:
+    return {k: v for k, v in campos.items() if v not in (None, "")}
 
 
 class ClienteService:
     @staticmethod
     def buscar_cliente(db: Session, identified: str):
-        """Busca un cliente por identificación usando el repository."""
+        """Busca un cliente por identificación (caché read-through)."""
+        cacheado = get_cache_clientes().leer(db, identified)
+        if cacheado is not None:
+            return cacheado
+        return ClienteService._consultar_cliente(db, identified)
+
+    @staticmethod
+    def _consultar_cliente(db: Session, identified: str):
+        """Busca en la base y deja el resultado en el caché."""
+        cache = get_cache_clientes()
+        # Antes del SELECT: si alguien confirma un cambio mientras tanto,
+        # el resultado (posiblemente viejo) no se guarda
+        generacion = cache.generacion(identified)
+        resultado = ClienteService._buscar_en_base(db, identified)
+        cache.guardar(db, identified, resultado, generacion)
+        return resultado
+
+    @staticmethod
+    def _buscar_en_base(db: Session, identified: str):
         try:
             cliente = get_client_by_identified(db, identified)
 
@@ -33,54 +63,132 @@ class ClienteService:
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    @staticmethod
+    def perfil_cliente(db: Session, identified: str, max_citas: int = 5):
+        """Cliente, contactos y próximas citas (dos consultas).
+
+        Pensado para el prompt: sin fechas de auditoría ni campos vacíos.
+        """
+        try:
+            encontrado = get_client_profile(db, identified, ahora_colombia(), max_citas)
+            if encontrado is None:
+                return {"status": "not_found", "message": "Cliente no encontrado"}
+
+            cliente, citas, total_citas = encontrado
+            perfil = {
+                "id": cliente.id,
+                "nombre": f"{cliente.fullName} {cliente.fullSurname}",
+                "identified": cliente.identified,
+                "activo": cliente.clientState,
+                "contactos": [
+                    _sin_vacios(
+                        telefono=c.phoneNumber, email=c.email, direccion=c.address
+                    )
+                    for c in sorted(cliente.clientContact, key=lambda c: c.id)
+                ],
+                "proximas_citas": [
+                    _sin_vacios(
+                        id=c.id,
+                        fecha=c.appointmentDate.strftime("%Y-%m-%d %H:%M"),
+                        ubicacion=c.ubicacion,
+                        estado=c.appointmentState.value,
+                        details=c.details,
+                        employedId=c.employedId,
+                    )
+                    for c in citas
+                ],
+            }
+            if total_citas > max_citas:
+                # El resto, con citas_cliente
+                perfil["citas_sin_listar"] = total_citas - max_citas
+
+            return {"status": "success", "data": perfil}
+
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
     @staticmethod
     def registrar_cliente(db: Session, data: ClientCreate):
         """Registra un nuevo cliente usando el repository."""
         try:
-            # Validar existente
-            existing = get_client_by_identified(db, data.identified)
-            if existing:
+            # Un solo INSERT: la restricción UNIQUE decide si ya existe
+            client_id = insert_client(db, data)
+            if client_id is None:
                 return {
                     "status": "exists",
                     "message": f"El cliente con identificación {data.identified} ya está registrado",
                 }
 
-            # Crear cliente en el repo
-            nuevo_cliente = create_client(db, data)
-
+            # INSERT de Core: los eventos del ORM no lo ven
+            invalidar_cliente(db, data.identified)
             return {
                 "status": "success",
                 "message": "Cliente registrado exitosamente",
-                "clientId": nuevo_cliente.id,
+                "clientId": client_id,
             }
 
         except Exception as e:
-            db.rollback()
             return {"status": "error", "message": str(e)}
 
     @staticmethod
-    def listar_clientes(db: Session):
-        """Lista todos los clientes activos."""
+    def listar_clientes(db: Session, cursor: int | None = None, limite: int = 50):
+        """Lista clientes activos, una página a la vez (cursor = último id visto)."""
         try:
-            from app.models.modelos import Client
+            limite = limitar(limite)
+            filas = list_active_clients(db, after_id=cursor, limit=limite + 1)
+            pagina, siguiente = paginar(filas, limite)
 
-            clientes = db.query(Client).filter(Client.clientState == True).all()
-
-            if not clientes:
+            if not pagina and cursor is None:
                 return {"status": "empty", "message": "No hay clientes registrados"}
 
-            resultado = [
-                {
-                    "id": c.id,
-                    "fullName": c.fullName,
-                    "fullSurname": c.fullSurname,
-                    "identified": c.identified,
-                    "createdAt": c.createdAt,
-                }
-                for c in clientes
-            ]
-
-            return {"status": "success", "data": resultado}
+            return {
+                "status": "success",
+                "data": [fila._asdict() for fila in pagina],
+                "siguiente_cursor": siguiente,
+            }
 
         except Exception as e:
             return {"status": "error", "message": str(e)}
+
+    @staticmethod
+    def exportar_clientes(db: Session, lote: int = 1000):
+        """Genera todos los clientes activos como dicts, en streaming."""
+        for fila in iter_active_clients(db, batch=lote):
+            yield fila._asdict()
+
+
+class AsyncClienteService:
+    """Versión asíncrona de ClienteService sobre una AsyncSession.
+
+    Reutiliza la misma lógica síncrona mediante `run_sync`, que la ejecuta
+    sobre el driver asíncrono sin bloquear el event loop.
+    """
+
+    @staticmethod
+    async def buscar_cliente(db: AsyncSession, identified: str):
+        # Un acierto del caché no necesita conexión ni salto al greenlet
+        cacheado = get_cache_clientes().leer(db.sync_session, identified)
+        if cacheado is not None:
+            return cacheado
+        return await db.run_sync(ClienteService._consultar_cliente, identified)
+
+    @staticmethod
+    async def perfil_cliente(db: AsyncSession, identified: str, max_citas: int = 5):
+        return await db.run_sync(ClienteService.perfil_cliente, identified, max_citas)
+
+    @staticmethod
+    async def registrar_cliente(db: AsyncSession, data: ClientCreate):
+        return await db.run_sync(ClienteService.registrar_cliente, data)
+
+    @staticmethod
+    async def listar_clientes(
+        db: AsyncSession, cursor: int | None = None, limite: int = 50
+    ):
+        return await db.run_sync(ClienteService.listar_clientes, cursor, limite)
+
+    @staticmethod
+    async def exportar_clientes(db: AsyncSession, lote: int = 1000):
+        """Streaming con cursor del lado del servidor sobre el driver asíncrono."""
+        stmt = active_clients_query().execution_options(yield_per=lote)
+        async for fila in await db.stream(stmt):
+            yield fila._asdict()
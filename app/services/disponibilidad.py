@@ -0,0 +1,361 @@
+"""
+Motor de disponibilidad del taller.
+
+La agenda se divide en slots de duración fija dentro del horario de
+atención (configurable en Settings). Un slot tiene cupo si hay menos citas
+que `capacidad` y, si se pide un empleado, si ese empleado tiene menos de
+`capacidad_empleado` citas en él.
+
+La ocupación se indexa en memoria por día (slot → citas), cargando cada día
+de la base con una sola consulta por rango. El índice se actualiza de forma
+incremental al crear o eliminar citas, una vez confirmada la transacción,
+y cada día se vuelve a leer de la base pasado `ttl` segundos para recoger
+cambios hechos por otros procesos.
+"""
+
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from time import monotonic
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.fechas import DIAS, ahora_colombia
+from app.core.lru import LRUTTL
+from app.db.al_confirmar import al_confirmar, diferir, pendientes
+from app.db.connect import settings
+from app.repository.appointment_repo import AppointmentRepository
+
+# Rango máximo de una consulta de disponibilidad
+MAX_DIAS_CONSULTA = 31
+
+
+def parsear_horario(texto: str) -> dict[int, tuple[time, time]]:
+    """'0-4=08:00-18:00,5=08:00-14:00' → {0: (08:00, 18:00), …, 5: (08:00, 14:00)}"""
+    horario = {}
+    for tramo in texto.split(","):
+        dias, horas = tramo.strip().split("=")
+        apertura, cierre = (time.fromisoformat(h) for h in horas.split("-"))
+        if apertura >= cierre:
+            raise ValueError(f"Horario inválido: {tramo}")
+        primero, _, ultimo = dias.partition("-")
+        for dia in range(int(primero), int(ultimo or primero) + 1):
+            horario[dia] = (apertura, cierre)
+    return horario
+
+
+def _plural(dia: str) -> str:
+    return dia if dia.endswith("s") else dia + "s"
+
+
+@dataclass(frozen=True)
+class Horario:
+    dias: dict[int, tuple[time, time]]
+    slot: timedelta = timedelta(hours=1)
+    capacidad: int = 1
+    capacidad_empleado: int = 1
+
+    @classmethod
+    def desde_settings(cls) -> "Horario":
+        return cls(
+            dias=parsear_horario(settings.TALLER_HORARIO),
+            slot=timedelta(minutes=settings.TALLER_SLOT_MINUTOS),
+            capacidad=settings.TALLER_CAPACIDAD,
+            capacidad_empleado=settings.TALLER_CAPACIDAD_EMPLEADO,
+        )
+
+    def describir(self) -> list[str]:
+        """Líneas del horario de atención agrupando días consecutivos iguales:
+        ['Lunes a viernes: 08:00 - 18:00', 'Sábados: 08:00 - 14:00', 'Domingos: cerrado']
+        """
+        grupos: list[list] = []  # [primer día, último día, tramo]
+        for dia in range(7):
+            tramo = self.dias.get(dia)
+            if grupos and grupos[-1][2] == tramo:
+                grupos[-1][1] = dia
+            else:
+                grupos.append([dia, dia, tramo])
+
+        lineas = []
+        for primero, ultimo, tramo in grupos:
+            if primero == ultimo:
+                dias = _plural(DIAS[primero])
+            elif ultimo == primero + 1:
+                dias = f"{_plural(DIAS[primero])} y {_plural(DIAS[ultimo])}"
+            else:
+                dias = f"{DIAS[primero]} a {DIAS[ultimo]}"
+            horas = f"{tramo[0]:%H:%M} - {tramo[1]:%H:%M}" if tramo else "cerrado"
+            lineas.append(f"{dias.capitalize()}: {horas}")
+        return lineas
+
+    def slot_de(self, fecha: datetime) -> datetime | None:
+        """Inicio del slot que contiene `fecha`, o None si está fuera de horario."""
+        tramo = self.dias.get(fecha.weekday())
+        if tramo is None:
+            return None
+        apertura = datetime.combine(fecha.date(), tramo[0])
+        if not apertura <= fecha < datetime.combine(fecha.date(), tramo[1]):
+            return None
+        return apertura + ((fecha - apertura) // self.slot) * self.slot
+
+    def slots_del_dia(self, dia: date) -> list[datetime]:
+        tramo = self.dias.get(dia.weekday())
+        if tramo is None:
+            return []
+        inicio = datetime.combine(dia, tramo[0])
+        cierre = datetime.combine(dia, tramo[1])
+        slots = []
+        while inicio + self.slot <= cierre:
+            slots.append(inicio)
+            inicio += self.slot
+        return slots
+
+    def validar(self, fecha: datetime) -> str | None:
+        """Mensaje de error si `fecha` cae fuera del horario de atención."""
+        dia = DIAS[fecha.weekday()]
+        tramo = self.dias.get(fecha.weekday())
+        if tramo is None:
+            return (
+                f"El taller está cerrado los {_plural(dia)}. Por favor elija otro día."
+            )
+        if self.slot_de(fecha) is None:
+            return (
+                f"Los {_plural(dia)} atendemos de {tramo[0]:%H:%M} a {tramo[1]:%H:%M}. "
+                "Por favor elija otra hora."
+            )
+        return None
+
+    def tiene_cupo(self, ocupacion: "Ocupacion | None", empleado=None) -> bool:
+        if ocupacion is None:
+            return True
+        if ocupacion.total >= self.capacidad:
+            return False
+        return (
+            empleado is None or ocupacion.empleados[empleado] < self.capacidad_empleado
+        )
+
+
+@dataclass
+class Ocupacion:
+    total: int = 0
+    empleados: Counter = field(default_factory=Counter)
+
+
+@dataclass
+class _Dia:
+    cargado: float
+    slots: dict[datetime, Ocupacion] = field(default_factory=dict)
+
+
+class MotorDisponibilidad:
+    def __init__(self, horario: Horario, ttl: float = 60.0, reloj=monotonic):
+        self.horario = horario
+        self.ttl = ttl
+        self._reloj = reloj
+        self._dias = LRUTTL(max_items=2 * 366, ttl=max(ttl, 1.0))
+        self._lock = threading.Lock()
+
+    # ==== Índice en memoria ====
+    def _sumar(self, slots: dict, fecha: datetime, empleado, delta: int):
+        slot = self.horario.slot_de(fecha)
+        if slot is None:
+            return  # citas fuera de horario no ocupan slots
+        ocupacion = slots.setdefault(slot, Ocupacion())
+        ocupacion.total += delta
+        if empleado is not None:
+            ocupacion.empleados[empleado] += delta
+
+    def _construir(self, dias: list[date], citas) -> dict[date, _Dia]:
+        nuevos = {dia: _Dia(cargado=self._reloj()) for dia in dias}
+        for fecha, empleado in citas:
+            dia = nuevos.get(fecha.date())
+            if dia is not None:
+                self._sumar(dia.slots, fecha, empleado, 1)
+        return nuevos
+
+    def precargar(self, dias: list[date], citas) -> None:
+        """Reemplaza la ocupación de `dias` a partir de filas (fecha, empleado)."""
+        for dia, ocupacion in self._construir(dias, citas).items():
+            self._dias.set(dia, ocupacion)
+
+    def _ocupacion(self, db: Session, desde: date, hasta: date) -> dict[date, _Dia]:
+        dias = [desde + timedelta(days=n) for n in range((hasta - desde).days)]
+        # Días con cambios propios sin confirmar: se leen de la sesión (que sí
+        # los ve) y no se guardan, para no dejar en el índice filas que aún
+        # pueden revertirse
+        propios = {cambio[0].date() for cambio in pendientes(db, _CAMBIOS)}
+        ahora = self._reloj()
+        cache: dict[date, _Dia] = {}
+        for dia in dias:
+            c = self._dias.get(dia)
+            if c is not None and dia not in propios and ahora - c.cargado < self.ttl:
+                cache[dia] = c
+        faltantes = [dia for dia in dias if dia not in cache]
+
+        if faltantes:
+            # Una sola consulta por rango (índice ix_cita_fecha)
+            inicio = datetime.combine(faltantes[0], time())
+            fin = datetime.combine(faltantes[-1] + timedelta(days=1), time())
+            leidos = self._construir(
+                faltantes, AppointmentRepository.list_in_range(db, inicio, fin)
+            )
+            for dia, ocupacion in leidos.items():
+                if dia not in propios:
+                    self._dias.set(dia, ocupacion)
+            cache.update(leidos)
+        return {dia: cache[dia] for dia in dias}  # en orden de fecha
+
+    def registrar(self, fecha: datetime, empleado, delta: int) -> None:
+        """Actualiza un día ya cargado (+1 al crear una cita, -1 al eliminarla)."""
+        dia = self._dias.get(fecha.date())
+        if dia is None:
+            return  # no está en memoria: se leerá de la base cuando se consulte
+        with self._lock:
+            self._sumar(dia.slots, fecha, empleado, delta)
+
+    def invalidar(self, dia: date) -> None:
+        """Descarta un día para que la próxima consulta lo lea de la base."""
+        self._dias.pop(dia)
+
+    def limpiar(self) -> None:
+        self._dias = LRUTTL(max_items=2 * 366, ttl=max(self.ttl, 1.0))
+
+    # ==== Consultas ====
+    def slots_libres(
+        self,
+        db: Session,
+        desde: datetime,
+        hasta: datetime,
+        empleado: int | None = None,
+        limite: int | None = None,
+    ) -> list[datetime]:
+        """Inicios de slot con cupo en [desde, hasta), en orden."""
+        ultimo = (hasta - timedelta(microseconds=1)).date()
+        ocupacion = self._ocupacion(db, desde.date(), ultimo + timedelta(days=1))
+        libres = []
+        for dia, cache in ocupacion.items():
+            for slot in self.horario.slots_del_dia(dia):
+                if desde <= slot < hasta and self.horario.tiene_cupo(
+                    cache.slots.get(slot), empleado
+                ):
+                    libres.append(slot)
+                    if limite and len(libres) >= limite:
+                        return libres
+        return libres
+
+    def slot_libre(self, db: Session, fecha: datetime, empleado=None) -> bool:
+        slot = self.horario.slot_de(fecha)
+        if slot is None:
+            return False
+        dia = slot.date()
+        cache = self._ocupacion(db, dia, dia + timedelta(days=1))[dia]
+        return self.horario.tiene_cupo(cache.slots.get(slot), empleado)
+
+
+# Espacio de claves de los advisory locks de la agenda (primer argumento)
+LOCK_AGENDA = 1403
+
+_EPOCA = datetime(2000, 1, 1)
+
+
+def clave_slot(slot: datetime) -> tuple[int, int]:
+    """Clave (espacio, minuto) del advisory lock de un slot; cabe en dos int4."""
+    return LOCK_AGENDA, int((slot - _EPOCA).total_seconds() // 60)
+
+
+@lru_cache
+def get_motor() -> MotorDisponibilidad:
+    return MotorDisponibilidad(Horario.desde_settings(), settings.DISPONIBILIDAD_TTL)
+
+
+# ==== Actualización del índice al confirmar la transacción ====
+# Los cambios se aplican al índice solo con el commit de la transacción
+# exterior; si su transacción (o savepoint) se revierte, se descartan.
+_CAMBIOS = "disponibilidad"
+
+
+def registrar_cambio(db: Session, fecha: datetime, empleado, delta: int) -> None:
+    diferir(db, _CAMBIOS, (fecha, empleado, delta))
+
+
+@al_confirmar(_CAMBIOS)
+def _aplicar_cambios(cambios: list) -> None:
+    motor = get_motor()
+    for fecha, empleado, delta in cambios:
+        motor.registrar(fecha, empleado, delta)
+
+
+# ==== Servicio ====
+def _formatear(slots: list[datetime]) -> dict[str, list[str]]:
+    """Agrupa por día en formato compacto para el prompt: {'2025-01-02': ['08:00', …]}"""
+    por_dia: dict[str, list[str]] = {}
+    for slot in slots:
+        por_dia.setdefault(f"{slot:%Y-%m-%d}", []).append(f"{slot:%H:%M}")
+    return por_dia
+
+
+class DisponibilidadService:
+    @staticmethod
+    def consultar(
+        db: Session,
+        desde: datetime,
+        hasta: datetime | None = None,
+        empleado: int | None = None,
+        limite: int = 20,
+    ) -> dict:
+        """Slots libres en [desde, hasta). Sin `hasta`, hasta el fin del día."""
+        hasta = hasta or datetime.combine(desde.date() + timedelta(days=1), time())
+        if hasta <= desde:
+            return {
+                "status": "error",
+                "message": "'hasta' debe ser posterior a 'desde'",
+            }
+        if hasta - desde > timedelta(days=MAX_DIAS_CONSULTA):
+            return {
+                "status": "error",
+                "message": f"El rango máximo es de {MAX_DIAS_CONSULTA} días",
+            }
+
+        # Nunca ofrecer horarios que ya pasaron
+        desde = max(desde, ahora_colombia())
+        motor = get_motor()
+        libres = motor.slots_libres(db, desde, hasta, empleado, limite)
+
+        if not libres:
+            return {
+                "status": "empty",
+                "message": "No hay horarios disponibles en ese rango",
+            }
+        return {
+            "status": "success",
+            "duracion_minutos": int(motor.horario.slot.total_seconds() // 60),
+            "disponibles": _formatear(libres),
+        }
+
+    @staticmethod
+    def alternativas(
+        db: Session, fecha: datetime, empleado: int | None = None, n: int = 3
+    ) -> dict[str, list[str]]:
+        """Próximos slots libres a partir de `fecha` (para sugerir al cliente)."""
+        desde = max(fecha, ahora_colombia())
+        libres = get_motor().slots_libres(
+            db, desde, desde + timedelta(days=7), empleado, n
+        )
+        return _formatear(libres)
+
+
+class AsyncDisponibilidadService:
+    """Versión asíncrona de DisponibilidadService sobre una AsyncSession."""
+
+    @staticmethod
+    async def consultar(
+        db: AsyncSession,
+        desde: datetime,
+        hasta: datetime | None = None,
+        empleado: int | None = None,
+        limite: int = 20,
+    ) -> dict:
+        return await db.run_sync(
+            DisponibilidadService.consultar, desde, hasta, empleado, limite
+        )
@@ -0,0 +1,359 @@
+"""
+Importación masiva de clientes, contactos y citas desde CSV o JSONL.
+
+    python -m app.services.importacion clientes clientes.csv [--lote 1000]
+    python -m app.services.importacion contactos contactos.jsonl
+    python -m app.services.importacion citas citas.csv [--errores rechazos.jsonl]
+
+El archivo se lee en streaming y se procesa por lotes. Cada lote:
+- valida las filas con los schemas de Pydantic de la API,
+- escribe las válidas con un INSERT por lote (executemany, que SQLAlchemy
+  agrupa en INSERT ... VALUES de varias filas) y confirma su transacción,
+- reporta filas/s.
+
+Los clientes se deduplican por `identified` con ON CONFLICT DO NOTHING:
+los que ya existen (en la base o antes en el archivo) se rechazan. Los
+contactos y las citas pueden traer `clientId` o la `identified` del
+cliente. Las citas se cargan tal cual, sin validar horario ni cupo: son
+el historial de otro sistema.
+
+Cada fila rechazada va al archivo de errores (JSONL, por defecto
+`<archivo>.errores.jsonl`) con su número de línea y el motivo. Si el INSERT
+de un lote falla (p. ej. un valor más largo que la columna), el lote se
+reintenta fila a fila en SAVEPOINTs para rechazar solo las culpables.
+"""
+
+import argparse
+import csv
+import json
+import time
+from datetime import datetime
+from itertools import batched
+from pathlib import Path
+from typing import TypeVar
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app.core.serializacion import a_json
+from app.db import config
+from app.models.modelos import AppointmentScheduling, AppointmentState
+from app.models.modelos import Client, ClientContact
+from app.schemas.appointment import AppointmentCreate
+from app.schemas.client import ClientCreate
+from app.schemas.client_contact import ClientContactCreate
+from app.services.cache_clientes import invalidar_cliente
+from app.services.disponibilidad import registrar_cambio
+
+M = TypeVar("M", bound=BaseModel)
+# (línea, fila leída, fila validada con el schema M)
+Fila = tuple[int, dict, M]
+# (línea, fila leída, motivo)
+Rechazo = tuple[int, dict, str]
+
+
+# ==== Lectura ====
+def _leer(ruta: Path):
+    """Genera (línea, fila) de un CSV con encabezado o de un JSONL."""
+    with open(ruta, newline="", encoding="utf-8-sig") as archivo:
+        if ruta.suffix.lower() == ".csv":
+            lector = csv.DictReader(archivo)
+            for fila in lector:
+                yield lector.line_num, fila
+            return
+
+        for linea, texto in enumerate(archivo, start=1):
+            if not texto.strip():
+                continue
+            try:
+                fila = json.loads(texto)
+            except json.JSONDecodeError as e:
+                fila = {"_texto": texto.rstrip("\n"), "_error": f"JSON inválido: {e}"}
+            if not isinstance(fila, dict):
+                fila = {"_texto": texto.rstrip("\n"), "_error": "no es un objeto JSON"}
+            yield linea, fila
+
+
+def _limpiar(fila: dict) -> dict:
+    """Quita espacios y descarta vacíos: así aplican los valores por defecto."""
+    limpia = {}
+    for clave, valor in fila.items():
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if clave and valor not in (None, ""):
+            limpia[clave.strip()] = valor
+    return limpia
+
+
+def _motivo(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, e['loc'])) or 'fila'}: {e['msg']}" for e in error.errors()
+    )
+
+
+def _validar(
+    schema: type[M], filas: list[tuple[int, dict, dict]]
+) -> tuple[list[Fila[M]], list[Rechazo]]:
+    validas: list[Fila[M]] = []
+    rechazos: list[Rechazo] = []
+    for linea, cruda, datos in filas:
+        if "_error" in cruda:
+            rechazos.append((linea, cruda, cruda["_error"]))
+            continue
+        try:
+            validas.append((linea, cruda, schema(**datos)))
+        except ValidationError as e:
+            rechazos.append((linea, cruda, _motivo(e)))
+    return validas, rechazos
+
+
+def _resolver_clientes(db: Session, filas: list[tuple[int, dict, dict]]):
+    """Completa `clientId` desde `identified` y descarta clientes inexistentes."""
+    identificaciones = {
+        d["identified"]
+        for _, _, d in filas
+        if "clientId" not in d and "identified" in d
+    }
+    ids = {str(d["clientId"]) for _, _, d in filas if "clientId" in d}
+    existentes = db.execute(
+        select(Client.id, Client.identified).where(
+            or_(
+                Client.identified.in_(identificaciones),
+                Client.id.in_([int(i) for i in ids if i.isdigit()]),
+            )
+        )
+    ).all()
+    por_identificacion = {ident: id_ for id_, ident in existentes}
+    validos = {str(id_) for id_, _ in existentes}
+
+    # Lo que no es un id ni una identificación lo rechaza después Pydantic
+    resueltas, rechazos = [], []
+    for linea, cruda, datos in filas:
+        client_id = str(datos.get("clientId", ""))
+        if client_id.isdigit() and client_id not in validos:
+            motivo = f"clientId {client_id} no existe"
+        elif "clientId" in datos or "identified" not in datos:
+            motivo = None
+        elif datos["identified"] in por_identificacion:
+            datos = {**datos, "clientId": por_identificacion[datos["identified"]]}
+            motivo = None
+        else:
+            motivo = f"no existe el cliente con identified {datos['identified']}"
+
+        if motivo:
+            rechazos.append((linea, cruda, motivo))
+        else:
+            resueltas.append((linea, cruda, datos))
+    return resueltas, rechazos
+
+
+# ==== Por tipo: preparar (validar) y escribir un lote ====
+def _preparar_clientes(db: Session, filas):
+    return _validar(ClientCreate, filas)
+
+
+def _escribir_clientes(db: Session, filas: list[Fila[ClientCreate]]) -> list[Rechazo]:
+    ahora = datetime.utcnow()
+    stmt = (
+        pg_insert(Client)
+        .on_conflict_do_nothing(index_elements=[Client.identified])
+        .returning(Client.identified)
+    )
+    valores = [{**c.model_dump(), "updatedAt": ahora} for _, _, c in filas]
+    insertados = set(db.execute(stmt, valores).scalars())
+
+    rechazos = []
+    for linea, cruda, cliente in filas:
+        if cliente.identified in insertados:
+            # Solo la primera aparición: una repetición en el lote se rechaza
+            insertados.discard(cliente.identified)
+            invalidar_cliente(db, cliente.identified)
+        else:
+            rechazos.append(
+                (linea, cruda, f"identified {cliente.identified} ya está registrado")
+            )
+    return rechazos
+
+
+def _preparar_contactos(db: Session, filas):
+    filas, sin_cliente = _resolver_clientes(db, filas)
+    validas, rechazos = _validar(ClientContactCreate, filas)
+    return validas, sin_cliente + rechazos
+
+
+def _escribir_contactos(
+    db: Session, filas: list[Fila[ClientContactCreate]]
+) -> list[Rechazo]:
+    ahora = datetime.utcnow()
+    db.execute(
+        insert(ClientContact),
+        [
+            {**c.model_dump(), "createAt": ahora, "updatedAt": ahora}
+            for _, _, c in filas
+        ],
+    )
+    return []
+
+
+def _preparar_citas(db: Session, filas):
+    filas, sin_cliente = _resolver_clientes(db, filas)
+    validas, rechazos = _validar(AppointmentCreate, filas)
+
+    # El schema acepta la fecha como str: aquí tiene que ser una fecha real
+    fechadas = []
+    for linea, cruda, cita in validas:
+        if isinstance(cita.appointmentDate, str):
+            try:
+                cita.appointmentDate = datetime.fromisoformat(cita.appointmentDate)
+            except ValueError:
+                rechazos.append((linea, cruda, "appointmentDate: fecha inválida"))
+                continue
+        fechadas.append((linea, cruda, cita))
+    return fechadas, sin_cliente + rechazos
+
+
+def _escribir_citas(db: Session, filas: list[Fila[AppointmentCreate]]) -> list[Rechazo]:
+    valores = []
+    for _, _, cita in filas:
+        fecha = cita.appointmentDate
+        assert isinstance(fecha, datetime)  # _preparar_citas ya la convirtió
+        estado = AppointmentState(cita.state.value)
+        valores.append(
+            {
+                "clientId": cita.clientId,
+                "appointmentDate": fecha,
+                "ubicacion": cita.ubicacion,
+                "details": cita.details,
+                "appointmentState": estado,
+                "employedId": cita.employedId,
+            }
+        )
+        if estado != AppointmentState.CANCELADA:
+            registrar_cambio(db, fecha, cita.employedId, +1)
+    db.execute(insert(AppointmentScheduling), valores)
+    return []
+
+
+TIPOS = {
+    "clientes": (_preparar_clientes, _escribir_clientes),
+    "contactos": (_preparar_contactos, _escribir_contactos),
+    "citas": (_preparar_citas, _escribir_citas),
+}
+
+
+# ==== Importación ====
+def _fila_a_fila(db: Session, escribir, filas: list[Fila]) -> list[Rechazo]:
+    """Reintento de un lote fallido: cada fila en su SAVEPOINT."""
+    rechazos = []
+    for fila in filas:
+        try:
+            with db.begin_nested():
+                rechazos += escribir(db, [fila])
+        except DBAPIError as e:
+            motivo = str(e.orig).strip().splitlines()[0]
+            rechazos.append((fila[0], fila[1], f"base de datos: {motivo}"))
+    return rechazos
+
+
+def _importar_lote(tipo: str, lote: tuple[tuple[int, dict], ...]) -> list[Rechazo]:
+    preparar, escribir = TIPOS[tipo]
+    filas = [(linea, cruda, _limpiar(cruda)) for linea, cruda in lote]
+
+    with config.SessionLocal() as db:
+        validas, rechazos = preparar(db, filas)
+        if validas:
+            try:
+                rechazos += escribir(db, validas)
+                db.commit()
+            except DBAPIError:
+                db.rollback()
+                rechazos += _fila_a_fila(db, escribir, validas)
+                db.commit()
+        else:
+            db.commit()
+    return sorted(rechazos, key=lambda r: r[0])
+
+
+class _ArchivoErrores:
+    """Se crea con el primer rechazo: una importación limpia no deja archivo."""
+
+    def __init__(self, ruta: Path):
+        self.ruta = ruta
+        self._archivo = None
+
+    def escribir(self, rechazos: list[Rechazo]) -> None:
+        if not rechazos:
+            return
+        if self._archivo is None:
+            self._archivo = open(self.ruta, "w", encoding="utf-8")
+        for linea, cruda, motivo in rechazos:
+            registro = {"linea": linea, "motivo": motivo, "fila": cruda}
+            self._archivo.write(a_json(registro) + "\n")
+
+    def cerrar(self) -> None:
+        if self._archivo is not None:
+            self._archivo.close()
+
+
+def importar(
+    tipo: str,
+    ruta: str | Path,
+    lote: int = 1000,
+    errores: str | Path | None = None,
+    reportar=print,
+) -> dict:
+    """Importa `ruta` por lotes. Retorna el resumen de la importación."""
+    if tipo not in TIPOS:
+        return {"status": "error", "message": f"Tipo desconocido: {tipo}"}
+    ruta = Path(ruta)
+    archivo_errores = _ArchivoErrores(
+        Path(errores) if errores else ruta.with_name(ruta.name + ".errores.jsonl")
+    )
+
+    leidas = rechazadas = 0
+    inicio = time.perf_counter()
+    filas = _leer(ruta)
+    try:
+        for numero, bloque in enumerate(batched(filas, lote), start=1):
+            inicio_lote = time.perf_counter()
+            rechazos = _importar_lote(tipo, bloque)
+            archivo_errores.escribir(rechazos)
+
+            segundos = time.perf_counter() - inicio_lote
+            leidas += len(bloque)
+            rechazadas += len(rechazos)
+            reportar(
+                f"lote {numero}: {len(bloque)} filas, {len(rechazos)} rechazadas, "
+                f"{segundos:.2f} s ({len(bloque) / segundos:,.0f} filas/s)"
+            )
+    finally:
+        archivo_errores.cerrar()
+
+    segundos = time.perf_counter() - inicio
+    resumen = {
+        "status": "success",
+        "leidas": leidas,
+        "importadas": leidas - rechazadas,
+        "rechazadas": rechazadas,
+        "segundos": round(segundos, 3),
+        "filas_por_segundo": round(leidas / segundos) if segundos else 0,
+        "errores": str(archivo_errores.ruta) if rechazadas else None,
+    }
+    reportar(
+        f"{tipo}: {resumen['importadas']} importadas, {rechazadas} rechazadas "
+        f"de {leidas} en {segundos:.1f} s ({resumen['filas_por_segundo']:,} filas/s)"
+    )
+    return resumen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(__doc__ or "").split("\n\n")[0].strip()
+    )
+    parser.add_argument("tipo", choices=list(TIPOS))
+    parser.add_argument("archivo", help="CSV con encabezado o JSONL (por extensión)")
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--errores", help="por defecto <archivo>.errores.jsonl")
+    args = parser.parse_args()
+    importar(args.tipo, args.archivo, args.lote, args.errores)
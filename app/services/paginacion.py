@@ -0,0 +1,19 @@
+from collections.abc import Sequence
+
+# Tope de filas por página para cualquier listado
+MAX_PAGINA = 200
+
+
+def limitar(limite: int, maximo: int = MAX_PAGINA) -> int:
+    return max(1, min(limite, maximo))
+
+
+def paginar(filas: Sequence, limite: int, clave=lambda fila: fila.id):
+    """Recibe hasta `limite + 1` filas en el orden del cursor.
+
+    Retorna la página y el cursor para pedir la siguiente (None si no hay
+    más). `clave` arma el cursor a partir de la última fila de la página.
+    """
+    pagina = filas[:limite]
+    siguiente = clave(pagina[-1]) if len(filas) > limite else None
+    return pagina, siguiente
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+RAIZ = Path(__file__).resolve().parents[2]
+
+# Solo se necesitan al usarlos: la API no debe cargarlos al importarse
+PESADOS = ("openai", "fastmcp", "asyncpg", "psycopg2")
+
+SCRIPT = """
+from app.db import config
+import app.main_api
+print("motores", config.get_engine.cache_info().currsize
+      + config.get_async_engine.cache_info().currsize)
+try:
+    config.get_engine()
+except ValueError as e:
+    print("error", e)
+"""
+
+
+def _importar_sin_entorno(tmp_path):
+    """Importa la API en un proceso limpio, sin DATABASE_URL ni OPENAI_API_KEY."""
+    entorno = {
+        k: v
+        for k, v in os.environ.items()
+        if k not in ("DATABASE_URL", "OPENAI_API_KEY")
+    }
+    entorno["PYTHONPATH"] = str(RAIZ)
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", SCRIPT],
+        cwd=tmp_path,  # sin .env a la vista
+        env=entorno,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proceso.returncode == 0, proceso.stderr[-2000:]
+
+    # "import time: self | acumulado | módulo" (µs), uno por módulo importado
+    acumulado = {}
+    for linea in proceso.stderr.splitlines():
+        if linea.startswith("import time:") and "|" in linea:
+            _, total, modulo = linea.split("|")
+            if total.strip().isdigit():
+                acumulado[modulo.strip()] = int(total)
+    return proceso.stdout, acumulado
+
+
+def test_importar_la_api_no_construye_nada(tmp_path):
+    salida, acumulado = _importar_sin_entorno(tmp_path)
+
+    assert "motores 0" in salida
+    assert "error DATABASE_URL no está definida" in salida
+    assert not [m for m in acumulado if m.split(".")[0] in PESADOS]
+
+    # Presupuesto relativo al framework, para no depender de la máquina:
+    # lo propio de la app no puede costar más que fastapi + sqlalchemy
+    framework = acumulado["fastapi"] + acumulado["sqlalchemy"]
+    assert acumulado["app.main_api"] < 2 * framework
+
+
+def test_lifespan_construye_y_cierra_los_motores():
+    from app.db import config
+    from app.main_api import app
+
+    with TestClient(app) as client:
+        assert config.get_async_engine.cache_info().currsize == 1
+        assert client.get("/health/db").json()["status"] == "success"
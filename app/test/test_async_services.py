@@ -0,0 +1,27 @@
+import asyncio
+from app.db.config import AsyncSessionLocal, async_engine
+from app.mcp.agent import _buscar_cliente_logic, _buscar_cliente_logic_async
+from app.services.client_service import AsyncClienteService
+
+
+def test_buscar_cliente_async():
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await AsyncClienteService.buscar_cliente(db, "000-no-existe")
+        finally:
+            await async_engine.dispose()
+
+    resp = asyncio.run(run())
+
+    assert resp["status"] == "not_found"
+
+
+def test_logica_async_igual_a_sync():
+    async def run():
+        try:
+            return await _buscar_cliente_logic_async("000-no-existe")
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(run()) == _buscar_cliente_logic("000-no-existe")
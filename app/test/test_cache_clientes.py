@@ -0,0 +1,146 @@
+import threading
+import uuid
+from app.db.config import SessionLocal
+from app.db.unit_of_work import ejecutar_en_sesion_sync
+from app.models.modelos import Client
+from app.observability.metricas import CACHE_CLIENTES
+from app.schemas.client import ClientCreate
+from app.services.cache_clientes import BackendMemoria, get_cache_clientes
+from app.services.client_service import ClienteService
+
+
+def _identificacion() -> str:
+    return f"cache-{uuid.uuid4().hex[:12]}"
+
+
+def _borrar(identified: str):
+    db = SessionLocal()
+    try:
+        for cliente in db.query(Client).filter_by(identified=identified):
+            db.delete(cliente)  # por el ORM, para que invalide
+        db.commit()
+    finally:
+        db.close()
+
+
+def _buscar(identified: str) -> dict:
+    db = SessionLocal()
+    try:
+        return ClienteService.buscar_cliente(db, identified)
+    finally:
+        db.close()
+
+
+def test_lectura_iniciada_antes_de_invalidar_no_se_guarda():
+    backend = BackendMemoria(100, 60)
+    generacion = backend.generacion("1")  # empieza la lectura lenta
+    backend.invalidar(["1"])  # otro confirma un cambio
+
+    assert not backend.guardar("1", {"status": "not_found"}, generacion)
+    assert backend.obtener("1") is None
+    assert backend.guardar("1", {"status": "not_found"}, backend.generacion("1"))
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_entrada_leida_sin_parar_expira_igual():
+    # Un cambio hecho en otro proceso no invalida este caché: solo el TTL
+    reloj = Reloj()
+    backend = BackendMemoria(100, 60, reloj)
+    backend.guardar("1", {"status": "not_found"}, backend.generacion("1"))
+    backend.guardar("2", {"status": "not_found"}, backend.generacion("2"))
+
+    for segundo in range(0, 60, 10):
+        reloj.ahora = segundo
+        assert backend.obtener("1") == {"status": "not_found"}
+
+    reloj.ahora = 60
+    assert backend.obtener("1") is None
+    assert len(backend) == 0
+
+
+def test_alta_invalida_el_no_encontrado_al_confirmar():
+    identified = _identificacion()
+    datos = ClientCreate(fullName="Ana", fullSurname="Ruiz", identified=identified)
+    try:
+        assert _buscar(identified)["status"] == "not_found"
+        aciertos = CACHE_CLIENTES.valores.get(("acierto",), 0)
+        assert _buscar(identified)["status"] == "not_found"
+        assert CACHE_CLIENTES.valores[("acierto",)] == aciertos + 1
+
+        db = SessionLocal()
+        try:
+            ClienteService.registrar_cliente(db, datos)
+            # La propia sesión ve su alta; las demás siguen con el caché
+            assert ClienteService.buscar_cliente(db, identified)["status"] == "success"
+            assert _buscar(identified)["status"] == "not_found"
+            db.commit()
+        finally:
+            db.close()
+
+        assert _buscar(identified)["data"]["fullName"] == "Ana"
+    finally:
+        _borrar(identified)
+
+
+def test_rollback_no_invalida():
+    identified = _identificacion()
+    assert _buscar(identified)["status"] == "not_found"
+
+    db = SessionLocal()
+    try:
+        datos = ClientCreate(fullName="X", fullSurname="Y", identified=identified)
+        ClienteService.registrar_cliente(db, datos)
+        db.rollback()
+        # Leído tras el rollback sin cambios propios: vuelve a usar el caché
+        assert ClienteService.buscar_cliente(db, identified)["status"] == "not_found"
+    finally:
+        db.close()
+
+    assert get_cache_clientes().backend.obtener(identified) is not None
+
+
+def test_lecturas_concurrentes_con_escrituras():
+    identified = _identificacion()
+    datos = ClientCreate(fullName="Luis", fullSurname="Gil", identified=identified)
+    terminar = threading.Event()
+    errores = []
+
+    def leer():
+        while not terminar.is_set():
+            resultado = _buscar(identified)
+            if resultado["status"] not in ("success", "not_found"):
+                errores.append(resultado)
+
+    lectores = [threading.Thread(target=leer) for _ in range(4)]
+    for lector in lectores:
+        lector.start()
+    try:
+        ejecutar_en_sesion_sync(ClienteService.registrar_cliente, datos)
+        creado = _buscar(identified)
+
+        for nombre in ("Luis Alberto", "Luis Carlos", "Luis Eduardo"):
+            db = SessionLocal()
+            try:
+                cliente = db.query(Client).filter_by(identified=identified).one()
+                cliente.fullName = nombre  # UPDATE del ORM
+                db.commit()
+            finally:
+                db.close()
+            assert _buscar(identified)["data"]["fullName"] == nombre
+    finally:
+        terminar.set()
+        for lector in lectores:
+            lector.join()
+        _borrar(identified)
+
+    assert creado["status"] == "success"
+    assert errores == []
+    # El DELETE del ORM también invalida
+    assert _buscar(identified)["status"] == "not_found"
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+from sqlalchemy import text
+from app.chat.loop import MENSAJE_TIEMPO_AGOTADO, ejecutar_turno, ejecutar_turno_eventos
+from app.db.config import async_engine
+from app.db.unit_of_work import ejecutar_en_sesion, unidad_de_trabajo
+from app.mcp.agent import _buscar_cliente_logic_async, _crear_cliente_logic_async
+
+
+def _chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def _respuesta(contenido=None, llamadas=()):
+    """Chunks de un completion en streaming, con los argumentos fragmentados."""
+    chunks = [
+        _chunk(content=palabra) for palabra in re.findall(r"\S+\s*", contenido or "")
+    ]
+    for i, (nombre, args) in enumerate(llamadas):
+        arguments = json.dumps(args)
+        mitad = len(arguments) // 2
+        funcion = SimpleNamespace(name=nombre, arguments=arguments[:mitad])
+        chunks.append(
+            _chunk(
+                tool_calls=[SimpleNamespace(index=i, id=f"call_{i}", function=funcion)]
+            )
+        )
+        funcion = SimpleNamespace(name=None, arguments=arguments[mitad:])
+        chunks.append(
+            _chunk(tool_calls=[SimpleNamespace(index=i, id=None, function=funcion)])
+        )
+    return chunks
+
+
+class StreamFalso:
+    def __init__(self, chunks, demora):
+        self.chunks = iter(chunks)
+        self.demora = demora
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(self.demora)
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        pass
+
+
+class ClienteFalso:
+    """Devuelve respuestas guionizadas en orden."""
+
+    def __init__(self, respuestas, demora=0.0):
+        self.respuestas = list(respuestas)
+        self.demora = demora
+        self.llamadas = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.llamadas.append(kwargs)
+        return StreamFalso(self.respuestas.pop(0), self.demora)
+
+
+def test_encadena_pasos_y_paraleliza_llamadas():
+    client = ClienteFalso(
+        [
+            _respuesta(llamadas=[("buscar_cliente", {"identified": "1"})] * 3),
+            _respuesta(llamadas=[("crear_cita", {"clientId": 1})]),
+            _respuesta("Listo, tu cita quedó agendada."),
+        ]
+    )
+
+    async def ejecutar(nombre, args):
+        await asyncio.sleep(0.2)
+        return {"status": "success"}
+
+    historial = [{"role": "user", "content": "Hola"}]
+    inicio = time.perf_counter()
+    resultado = asyncio.run(ejecutar_turno(client, historial, [], ejecutar))
+    duracion = time.perf_counter() - inicio
+
+    assert resultado.respuesta == "Listo, tu cita quedó agendada."
+    assert resultado.pasos == 3
+    assert resultado.cita_creada
+    assert len(resultado.herramientas_usadas) == 4
+    assert resultado.herramientas_usadas[0]["parametros"] == {"identified": "1"}
+    # 2 rondas de 0.2 s: las 3 búsquedas de la primera ronda corren juntas
+    assert duracion < 0.6
+    assert [m["role"] for m in historial].count("tool") == 4
+
+
+def test_eventos_en_orden():
+    client = ClienteFalso(
+        [
+            _respuesta(llamadas=[("buscar_cliente", {"identified": "1"})]),
+            _respuesta("Hola Juan"),
+        ]
+    )
+
+    async def ejecutar(nombre, args):
+        return {"status": "success"}
+
+    async def run():
+        return [e async for e in ejecutar_turno_eventos(client, [], [], ejecutar)]
+
+    tipos = [e["tipo"] for e in asyncio.run(run())]
+
+    assert tipos == ["herramienta_inicio", "herramienta_fin", "delta", "delta", "fin"]
+
+
+def test_limite_de_pasos_fuerza_respuesta_sin_herramientas():
+    client = ClienteFalso(
+        [_respuesta(llamadas=[("buscar_cliente", {})])] * 2 + [_respuesta("Fin")]
+    )
+
+    async def ejecutar(nombre, args):
+        return {"status": "not_found"}
+
+    resultado = asyncio.run(ejecutar_turno(client, [], [], ejecutar, max_pasos=2))
+
+    assert resultado.respuesta == "Fin"
+    assert "tools" not in client.llamadas[-1]
+
+
+def test_limite_de_tiempo():
+    client = ClienteFalso([_respuesta("tarde")], demora=1)
+
+    async def ejecutar(nombre, args):
+        return {}
+
+    resultado = asyncio.run(ejecutar_turno(client, [], [], ejecutar, max_segundos=0.1))
+
+    assert resultado.respuesta == MENSAJE_TIEMPO_AGOTADO
+
+
+def test_limite_de_tiempo_corta_herramientas_lentas():
+    client = ClienteFalso(
+        [_respuesta(llamadas=[("crear_cita", {"clientId": 1})]), _respuesta("tarde")]
+    )
+
+    async def ejecutar(nombre, args):
+        await asyncio.sleep(5)  # p. ej. esperando un lock
+        return {"status": "success"}
+
+    historial = []
+    inicio = time.perf_counter()
+    resultado = asyncio.run(
+        ejecutar_turno(client, historial, [], ejecutar, max_segundos=0.3)
+    )
+
+    assert time.perf_counter() - inicio < 1
+    assert resultado.respuesta == MENSAJE_TIEMPO_AGOTADO
+    # La tool_call queda respondida: el historial sigue siendo válido
+    assert historial[1]["role"] == "tool"
+    assert json.loads(historial[1]["content"])["status"] == "error"
+
+
+def test_limite_de_tiempo_con_herramienta_en_la_base():
+    # Cortar una consulta en curso invalida la conexión del turno: la ronda se
+    # revierte completa y el turno responde sin error en vez de un 500
+    identified = f"loop-{time.time_ns()}"
+    client = ClienteFalso(
+        [
+            _respuesta(
+                llamadas=[
+                    ("crear_cliente", {}),
+                    ("consulta_lenta", {}),
+                    ("consulta_lenta", {}),
+                ]
+            ),
+            _respuesta("tarde"),
+        ]
+    )
+
+    async def lenta(sesion):
+        await sesion.execute(text("SELECT pg_sleep(5)"))
+        return {"status": "success"}
+
+    async def ejecutar(nombre, args):
+        if nombre == "crear_cliente":
+            return await _crear_cliente_logic_async("Lia", "Paz", identified)
+        return await ejecutar_en_sesion(lenta)
+
+    async def turno():
+        try:
+            historial = []
+            async with unidad_de_trabajo():
+                resultado = await ejecutar_turno(
+                    client, historial, [], ejecutar, max_segundos=0.5
+                )
+            return resultado, historial, await _buscar_cliente_logic_async(identified)
+        finally:
+            await async_engine.dispose()
+
+    inicio = time.perf_counter()
+    resultado, historial, buscado = asyncio.run(turno())
+
+    assert time.perf_counter() - inicio < 3
+    assert resultado.respuesta == MENSAJE_TIEMPO_AGOTADO
+    assert all(
+        h["resultado"]["status"] == "error" for h in resultado.herramientas_usadas
+    )
+    assert [m["role"] for m in historial[1:4]] == ["tool"] * 3
+    assert buscado["status"] == "not_found"
+
+
+def test_resultado_se_serializa_una_vez_y_expone_datos_cita():
+    client = ClienteFalso(
+        [
+            _respuesta(llamadas=[("crear_cita", {"clientId": 1})]),
+            _respuesta("Cita creada"),
+        ]
+    )
+    salida = {"status": "success", "appointmentId": 5, "data": {"id": 5}}
+
+    async def ejecutar(nombre, args):
+        return salida
+
+    historial = []
+    resultado = asyncio.run(ejecutar_turno(client, historial, [], ejecutar))
+    tool = next(m for m in historial if m["role"] == "tool")
+
+    assert resultado.datos_cita == {"id": 5}
+    assert resultado.herramientas_usadas[0]["resultado"] is salida
+    assert json.loads(tool["content"]) == salida
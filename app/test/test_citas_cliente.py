@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.db.config import SessionLocal, async_engine
+from app.db.unit_of_work import unidad_de_trabajo
+from app.mcp.agent import (
+    _citas_cliente_logic_async,
+    _crear_cita_logic_async,
+    _crear_cliente_logic_async,
+    _rango_disponibilidad,
+)
+from app.schemas.appointment import AppointmentCreate
+from app.schemas.client import ClientCreate
+from app.services.citas_service import AppointmentService
+from app.services.client_service import ClienteService
+
+BASE = datetime(2030, 3, 4, 9, 0)  # lunes
+
+
+def _cliente_con_citas(db, identified: str, n: int, hora: int = 9) -> int:
+    data = ClientCreate(fullName="Hist", fullSurname="Citas", identified=identified)
+    client_id = ClienteService.registrar_cliente(db, data)["clientId"]
+    for i in range(n):
+        cita = AppointmentCreate(
+            clientId=client_id,
+            # insertadas en desorden
+            appointmentDate=BASE.replace(hour=hora) + timedelta(days=n - i),
+            ubicacion="Taller",
+        )
+        AppointmentService.crear_cita(db, cita)
+    return client_id
+
+
+def test_filtra_por_cliente_y_ordena_por_fecha():
+    db = SessionLocal()
+    try:
+        cliente = _cliente_con_citas(db, "hist-1", 5)
+        otro = _cliente_con_citas(db, "hist-2", 3, hora=11)
+        resp = AppointmentService.obtener_citas_por_cliente(db, cliente)
+        vacio = AppointmentService.obtener_citas_por_cliente(db, 999_999)
+    finally:
+        db.rollback()
+        db.close()
+
+    fechas = [c["date"] for c in resp["citas"]]
+    assert len(fechas) == 5
+    assert fechas == sorted(fechas)
+    assert resp["clientId"] == cliente != otro
+    assert vacio["citas"] == []
+
+
+def test_rango_de_fechas_y_paginacion():
+    db = SessionLocal()
+    try:
+        cliente = _cliente_con_citas(db, "hist-3", 9)
+        rango = AppointmentService.obtener_citas_por_cliente(
+            db,
+            cliente,
+            desde=BASE + timedelta(days=3),
+            hasta=BASE + timedelta(days=6),
+        )
+
+        vistas, cursor = [], None
+        while True:
+            pagina = AppointmentService.obtener_citas_por_cliente(
+                db, cliente, cursor=cursor, limite=4
+            )
+            vistas += [c["id"] for c in pagina["citas"]]
+            cursor = pagina["siguiente_cursor"]
+            if cursor is None:
+                break
+        invalido = AppointmentService.obtener_citas_por_cliente(db, cliente, cursor="x")
+    finally:
+        db.rollback()
+        db.close()
+
+    assert len(rango["citas"]) == 3
+    assert len(vistas) == len(set(vistas)) == 9
+    assert invalido["status"] == "error"
+
+
+def test_herramienta_citas_cliente():
+    async def turno():
+        try:
+            async with unidad_de_trabajo():
+                creado = await _crear_cliente_logic_async("Tool", "Citas", "hist-4")
+                cliente = creado["clientId"]
+                await _crear_cita_logic_async(cliente, "2030-03-05 10:00:00", "Taller")
+                resp = await _citas_cliente_logic_async(cliente, desde="2030-03-01")
+                # 'hasta' sin hora incluye ese día, igual que en disponibilidad
+                dia = await _citas_cliente_logic_async(
+                    cliente, desde="2030-03-05", hasta="2030-03-05"
+                )
+                antes = await _citas_cliente_logic_async(
+                    cliente, desde="2030-03-05", hasta="2030-03-05 10:00:00"
+                )
+                error = await _citas_cliente_logic_async(cliente, desde="mañana")
+                raise LookupError  # revierte todo lo creado en la prueba
+        except LookupError:
+            return resp, dia, antes, error
+        finally:
+            await async_engine.dispose()
+
+    resp, dia, antes, error = asyncio.run(turno())
+
+    assert resp["status"] == "success"
+    assert [c["date"] for c in resp["citas"]] == ["2030-03-05 10:00:00"]
+    assert [c["date"] for c in dia["citas"]] == ["2030-03-05 10:00:00"]
+    assert antes["citas"] == []  # con hora, 'hasta' es exclusivo
+    assert error["status"] == "error"
+    assert _rango_disponibilidad("2030-03-05", "2030-03-05") == (
+        datetime(2030, 3, 5),
+        datetime(2030, 3, 6),
+    )
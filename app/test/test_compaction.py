@@ -0,0 +1,118 @@
+import json
+from app.chat.compaction import compactar, estimar_tokens
+from app.observability.metricas import COMPACTACION_TOKENS
+
+
+def _turno(n: int, resultado: dict | None = None) -> list[dict]:
+    mensajes = [{"role": "user", "content": f"mensaje {n}"}]
+    if resultado is not None:
+        mensajes += [
+            {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {
+                        "id": f"call_{n}",
+                        "type": "function",
+                        "function": {"name": "buscar_cliente", "arguments": "{}"},
+                    }
+                ],
+            },
+            {
+                "role": "tool",
+                "tool_call_id": f"call_{n}",
+                "content": json.dumps(resultado),
+            },
+        ]
+    mensajes.append({"role": "assistant", "content": f"respuesta {n}"})
+    return mensajes
+
+
+SISTEMA = {"role": "system", "content": "prompt de sistema"}
+
+
+def test_conserva_sistema_y_ultimos_turnos():
+    historial = []
+    for n in range(10):
+        historial += _turno(n)
+
+    mensajes = compactar(
+        historial, [SISTEMA], presupuesto=10_000, turnos=3, resumidor=None
+    )
+
+    assert mensajes[0] == SISTEMA
+    assert mensajes[1] == {"role": "user", "content": "mensaje 7"}
+    assert len(mensajes) == 1 + 3 * 2
+
+
+def test_recorta_resultados_de_turnos_anteriores():
+    grande = {"status": "success", "data": "x" * 5000}
+    historial = _turno(0, grande) + _turno(1, grande)
+
+    mensajes = compactar(
+        historial, [SISTEMA], presupuesto=10_000, turnos=5, max_chars_tool=100
+    )
+    tools = [m for m in mensajes if m["role"] == "tool"]
+
+    assert len(tools[0]["content"]) < 200
+    assert tools[1]["content"] == json.dumps(grande)
+
+
+def test_respeta_presupuesto_sin_separar_tool_calls():
+    historial = []
+    for n in range(6):
+        historial += _turno(n, {"status": "success", "clientId": n, "x": "y" * 800})
+
+    def ahorrados():
+        valores = COMPACTACION_TOKENS.valores
+        return valores.get(("antes",), 0) - valores.get(("despues",), 0)
+
+    antes = ahorrados()
+    mensajes = compactar(
+        historial, [SISTEMA], presupuesto=300, turnos=6, max_chars_tool=2000
+    )
+
+    usuarios = [m for m in mensajes if m["role"] == "user"]
+
+    assert usuarios == [{"role": "user", "content": "mensaje 5"}]
+    assert mensajes[2]["role"] == "user"
+    assert "clientId" in mensajes[1]["content"]  # resumen extractivo
+    assert ahorrados() > antes
+
+
+def test_el_resumen_cuenta_en_el_presupuesto():
+    historial = []
+    for n in range(200):
+        historial += _turno(n, {"status": "success", "clientId": n})
+
+    mensajes = compactar(
+        historial, [SISTEMA], presupuesto=400, turnos=10, max_chars_tool=2000
+    )
+
+    assert sum(estimar_tokens(m) for m in mensajes) <= 400
+    resumen = mensajes[1]["content"]
+    assert resumen.startswith("Resumen de la conversación anterior:")
+    # Sin espacio para todo, se conserva lo más reciente
+    assert "mensaje 0\n" not in resumen and 'clientId": 189' in resumen
+
+
+def test_el_prompt_de_sistema_cuenta_en_el_presupuesto():
+    historial = []
+    for n in range(8):
+        historial += _turno(n)
+    prompt = {"role": "system", "content": "p" * 1200}  # ~300 tokens
+    # El historial solo cabe en 350 tokens; junto al prompt, no
+    assert sum(estimar_tokens(m) for m in historial) <= 350
+    assert compactar(historial, presupuesto=350, turnos=10) == historial
+
+    mensajes = compactar(historial, [prompt], presupuesto=350, turnos=10)
+
+    assert mensajes[0] is prompt
+    assert sum(estimar_tokens(m) for m in mensajes) <= 350
+    assert mensajes[-2:] == historial[-2:]
+    assert len(mensajes) - 1 < len(historial)
+
+
+def test_historial_corto_no_cambia():
+    historial = _turno(0)
+    assert compactar(historial, [SISTEMA], resumidor=None) == [SISTEMA] + historial
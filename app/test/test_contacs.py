@@ -1,7 +1,6 @@
 from app.services.client_contact import ClientContactService
 from app.db.config import get_db
 from app.schemas.client_contact import ClientContactCreate
-import json
 
 
 def test_create_cliente_contact():
@@ -15,7 +14,6 @@ def test_create_cliente_contact():
     )
 
     resp = ClientContactService.crear_contacto(db, data)
-    resp_dict = json.loads(resp)
 
-    assert resp_dict["status"] == "success"
-    assert "contactId" in resp_dict
+    assert resp["status"] == "success"
+    assert "contactId" in resp
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from app.chat.llm import get_llm_client
+from app.chat.store import MemoryConversationStore, SQLConversationStore
+from app.db.config import async_engine
+from app.schemas.chat import MensajeRequest
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_memory_store_expulsa_lru():
+    store = MemoryConversationStore(max_items=2, ttl=60)
+
+    async def run():
+        await store.save("a", [{"role": "user", "content": "1"}])
+        await store.save("b", [])
+        await store.get("a")  # "a" pasa a ser la más reciente
+        await store.save("c", [])
+        return await store.list_ids()
+
+    assert sorted(asyncio.run(run())) == ["a", "c"]
+
+
+def test_memory_store_expira_por_ttl():
+    reloj = Reloj()
+    store = MemoryConversationStore(max_items=10, ttl=60, reloj=reloj)
+
+    async def run():
+        await store.save("a", [])
+        reloj.ahora = 59
+        vigente = await store.get("a")
+        reloj.ahora = 59 + 60
+        return vigente, await store.get("a"), await store.count()
+
+    assert asyncio.run(run()) == ([], None, 0)
+
+
+def test_ids_unicos():
+    store = MemoryConversationStore(max_items=10, ttl=60)
+    ids = {store.new_id() for _ in range(1000)}
+    assert len(ids) == 1000
+
+
+def test_sql_store_guarda_y_elimina():
+    store = SQLConversationStore(ttl=60)
+    conv_id = store.new_id()
+    mensajes = [{"role": "user", "content": "Hola"}]
+
+    async def run():
+        try:
+            await store.save(conv_id, mensajes)
+            guardado = await store.get(conv_id)
+            eliminado = await store.delete(conv_id)
+            return guardado, eliminado, await store.get(conv_id)
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(run()) == (mensajes, True, None)
+
+
+def test_conversacion_id_invalido_se_rechaza_antes_del_store():
+    # Conversation.id es String(64): más largo llegaba a la base y era un 500
+    assert MensajeRequest(mensaje="hola", conversacion_id="conv_" + "a" * 59)
+    for invalido in ("x" * 65, "conv 1", "conv/../1", ""):
+        with pytest.raises(ValidationError):
+            MensajeRequest(mensaje="hola", conversacion_id=invalido)
+
+    from app.main_api import app
+
+    app.dependency_overrides[get_llm_client] = lambda: None
+    try:
+        with TestClient(app) as client:
+            chat = client.post(
+                "/api/chat", json={"mensaje": "hola", "conversacion_id": "x" * 100}
+            )
+            reset = client.post(f"/api/reset/{'x' * 100}")
+    finally:
+        app.dependency_overrides.pop(get_llm_client)
+
+    assert chat.status_code == 422 and reset.status_code == 422
@@ -0,0 +1,131 @@
+from datetime import date, datetime, timedelta
+from app.db.config import SessionLocal
+from app.db.unit_of_work import ejecutar_en_sesion_sync
+from app.mcp.agent import _consultar_disponibilidad_logic, herramientas
+from app.schemas.appointment import AppointmentCreate
+from app.services.citas_service import AppointmentService
+from app.services.disponibilidad import (
+    Horario,
+    MotorDisponibilidad,
+    get_motor,
+    parsear_horario,
+)
+from app.test.test_single_statement_writes import contar_sentencias
+
+MARTES = datetime(2030, 3, 5)
+
+
+def _cita(fecha: datetime, employedId: int | None = None) -> AppointmentCreate:
+    return AppointmentCreate(
+        clientId=1, appointmentDate=fecha, ubicacion="Taller", employedId=employedId
+    )
+
+
+def test_horario_configurable():
+    horario = Horario(parsear_horario("0-4=08:00-18:00,5=08:00-14:00"))
+
+    assert len(horario.slots_del_dia(MARTES.date())) == 10
+    assert len(horario.slots_del_dia(date(2030, 3, 9))) == 6  # sábado
+    assert horario.slots_del_dia(date(2030, 3, 10)) == []  # domingo
+    assert horario.slot_de(MARTES.replace(hour=9, minute=40)) == MARTES.replace(hour=9)
+    assert horario.slot_de(MARTES.replace(hour=18)) is None
+
+    assert horario.validar(MARTES.replace(hour=10)) is None
+    assert "domingos" in horario.validar(datetime(2030, 3, 10, 10))
+    assert "sábados" in horario.validar(datetime(2030, 3, 9, 15))
+
+    assert horario.describir() == [
+        "Lunes a viernes: 08:00 - 18:00",
+        "Sábados: 08:00 - 14:00",
+        "Domingos: cerrado",
+    ]
+    assert Horario(parsear_horario("0-2=07:00-17:00,4=09:00-12:00")).describir() == [
+        "Lunes a miércoles: 07:00 - 17:00",
+        "Jueves: cerrado",
+        "Viernes: 09:00 - 12:00",
+        "Sábados y domingos: cerrado",
+    ]
+
+
+def test_capacidad_por_slot_y_por_empleado():
+    horario = Horario(
+        parsear_horario("0-4=08:00-12:00"), capacidad=2, capacidad_empleado=1
+    )
+    motor = MotorDisponibilidad(horario)
+    a = MARTES.replace(hour=9)
+    b = MARTES.replace(hour=10)
+    motor.precargar([MARTES.date()], [(a, 7), (b, 7), (b, 8)])
+
+    db = SessionLocal()
+    try:
+        fin = MARTES + timedelta(days=1)
+        with contar_sentencias() as sentencias:
+            todos = motor.slots_libres(db, MARTES, fin)
+            empleado_7 = motor.slots_libres(db, MARTES, fin, empleado=7)
+    finally:
+        db.close()
+
+    assert [s.hour for s in todos] == [8, 9, 11]
+    assert [s.hour for s in empleado_7] == [8, 11]
+    assert sentencias == []  # servido desde el índice en memoria
+
+
+def test_crear_cita_en_slot_ocupado():
+    fecha = datetime(2030, 3, 7, 10, 0)
+    db = SessionLocal()
+    try:
+        primera = AppointmentService.crear_cita(db, _cita(fecha))
+        repetida = AppointmentService.crear_cita(db, _cita(fecha))
+    finally:
+        db.rollback()
+        db.close()
+
+    assert primera["status"] == "success"
+    assert repetida["status"] == "slot_taken"
+    assert repetida["alternativas"]["2030-03-07"][0] == "11:00"
+
+
+def test_indice_se_actualiza_al_confirmar():
+    motor = get_motor()
+    fecha = datetime(2030, 3, 8, 15, 0)
+    db = SessionLocal()
+    try:
+        assert motor.slot_libre(db, fecha)
+
+        # Un savepoint revertido no toca el índice
+        with db.begin_nested():
+            AppointmentService.crear_cita(db, _cita(fecha))
+            db.get_nested_transaction().rollback()
+        db.commit()
+        assert motor.slot_libre(db, fecha)
+
+        creada = ejecutar_en_sesion_sync(AppointmentService.crear_cita, _cita(fecha))
+        with contar_sentencias() as sentencias:
+            ocupado = not motor.slot_libre(db, fecha)
+
+        ejecutar_en_sesion_sync(
+            AppointmentService.eliminar_cita, creada["appointmentId"]
+        )
+        liberado = motor.slot_libre(db, fecha)
+    finally:
+        db.close()
+
+    assert ocupado and sentencias == []
+    assert liberado
+
+
+def test_herramienta_consultar_disponibilidad():
+    sabado = _consultar_disponibilidad_logic("2030-03-09")
+    semana = _consultar_disponibilidad_logic(
+        "2030-03-09", hasta="2030-03-11", limite=50
+    )
+    domingo = _consultar_disponibilidad_logic("2030-03-10")
+    invalida = _consultar_disponibilidad_logic("sábado")
+
+    assert sabado["disponibles"] == {
+        "2030-03-09": [f"{h:02d}:00" for h in range(8, 14)]
+    }
+    assert list(semana["disponibles"]) == ["2030-03-09", "2030-03-11"]
+    assert domingo["status"] == "empty"
+    assert invalida["status"] == "error"
+    assert "consultar_disponibilidad" in herramientas.nombres()
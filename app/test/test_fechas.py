@@ -0,0 +1,71 @@
+from datetime import datetime
+import pytest
+import pytz
+from app.core.fechas import TZ_COLOMBIA, FechaInvalida, _analizar, interpretar_fecha
+from app.mcp.agent import _preparar_cita
+
+LUNES = datetime(2025, 12, 1, 9, 30)  # lunes 1 de diciembre, 9:30 en Bogotá
+
+
+def test_formatos_aceptados():
+    casos = {
+        "2025-12-01 15:00:00": datetime(2025, 12, 1, 15),
+        "2025-12-01T15:00": datetime(2025, 12, 1, 15),
+        "2025-12-02T20:00:00Z": datetime(2025, 12, 2, 15),  # UTC → Bogotá
+        "02/12/2025 14:00": datetime(2025, 12, 2, 14),
+        "2/12 2:30 p.m.": datetime(2025, 12, 2, 14, 30),
+        "15 de marzo a las 3 de la tarde": datetime(2026, 3, 15, 15),
+        "martes 16 de diciembre de 2025 a las 8:30 a. m.": datetime(
+            2025, 12, 16, 8, 30
+        ),
+        "mañana a las 3 PM": datetime(2025, 12, 2, 15),
+        "Mañana 3pm": datetime(2025, 12, 2, 15),
+        "pasado mañana al mediodía": datetime(2025, 12, 3, 12),
+        "en 3 días a las 9 y media": datetime(2025, 12, 4, 9, 30),
+        "hoy a las 5 de la tarde": datetime(2025, 12, 1, 17),
+        "el lunes 10:00": datetime(2025, 12, 1, 10),
+        "el próximo lunes a las 10": datetime(2025, 12, 8, 10),
+        "el próximo martes a las 10 de la mañana": datetime(2025, 12, 2, 10),
+        "viernes que viene 11:00": datetime(2025, 12, 5, 11),
+        "3 pm": datetime(2025, 12, 1, 15),
+        "mañana a las 3": datetime(2025, 12, 2, 15),  # sin am/pm: de la tarde
+        "mañana a las 4:30": datetime(2025, 12, 2, 16, 30),
+        "mañana a las 8": datetime(2025, 12, 2, 8),
+    }
+    for texto, esperada in casos.items():
+        assert interpretar_fecha(texto, LUNES) == esperada, texto
+
+
+def test_rechaza_pasadas_incompletas_y_desconocidas():
+    casos = {
+        "2024-05-01 10:00": "ya pasó",
+        "hoy a las 8": "ya pasó",
+        "01/12 03:00": "ya pasó",  # con cero inicial es 24 horas
+        "2025-12-01": "Falta la hora",
+        "31/02 10:00": "no existe",
+        "13 pm": "Hora inválida",
+        "lunes 16 de diciembre de 2025 10:00": "es martes",
+        "el martes de la otra semana 10am": "No se reconoce",
+    }
+    for texto, motivo in casos.items():
+        with pytest.raises(FechaInvalida, match=motivo):
+            interpretar_fecha(texto, LUNES)
+
+
+def test_ahora_con_zona_y_cache_del_analisis():
+    # 2025-12-02 01:00 UTC es todavía el 1 de diciembre en Bogotá
+    ahora = TZ_COLOMBIA.localize(datetime(2025, 12, 1, 20)).astimezone(pytz.utc)
+    assert interpretar_fecha("mañana 8 am", ahora) == datetime(2025, 12, 2, 8)
+
+    _analizar.cache_clear()
+    interpretar_fecha("mañana 8 am", LUNES)
+    interpretar_fecha("MAÑANA  8 a.m.", datetime(2026, 1, 5))
+    assert _analizar.cache_info().hits == 1  # mismo texto normalizado
+
+
+def test_herramienta_no_mueve_fechas_pasadas_de_anio():
+    error = _preparar_cita(1, "2020-03-05 10:00:00", "Taller")
+    assert error["status"] == "error" and "ya pasó" in error["message"]
+
+    cita = _preparar_cita(1, "2031-06-03 10:00", "Taller")
+    assert cita.appointmentDate == datetime(2031, 6, 3, 10)
@@ -0,0 +1,137 @@
+import json
+import uuid
+from sqlalchemy import delete, func, select
+from app.db.config import SessionLocal
+from app.models.modelos import AppointmentScheduling, Client, ClientContact
+from app.services.client_service import ClienteService
+from app.services.importacion import importar
+
+
+def _leer_errores(ruta) -> list[dict]:
+    return [json.loads(l) for l in open(ruta, encoding="utf-8")]
+
+
+def _borrar(prefijo: str):
+    db = SessionLocal()
+    try:
+        ids = select(Client.id).where(Client.identified.startswith(prefijo))
+        db.execute(
+            delete(AppointmentScheduling).where(AppointmentScheduling.clientId.in_(ids))
+        )
+        db.execute(delete(ClientContact).where(ClientContact.clientId.in_(ids)))
+        db.execute(delete(Client).where(Client.identified.startswith(prefijo)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_importa_clientes_contactos_y_citas(tmp_path):
+    p = f"imp-{uuid.uuid4().hex[:8]}-"
+    clientes = tmp_path / "clientes.csv"
+    clientes.write_text(
+        "fullName,fullSurname,identified\n"
+        f"Ana,Ruiz,{p}1\n"
+        f"Luis,Gil,{p}2\n"
+        f",Sin Nombre,{p}3\n"  # rechazada por el schema
+        f"Ana,Repetida,{p}1\n"  # repetida en el archivo (otro lote)
+        f"Eva,Larga,{p}{'x' * 60}\n"  # excede la columna: rechazada por la base
+        f"Sol,Vega,{p}4\n",
+        encoding="utf-8",
+    )
+    contactos = tmp_path / "contactos.jsonl"
+    contactos.write_text(
+        "\n".join(
+            [
+                json.dumps(
+                    {"identified": f"{p}1", "phoneNumber": "300", "email": "a@x"}
+                ),
+                json.dumps(
+                    {"identified": f"{p}9", "phoneNumber": "301", "email": "b@x"}
+                ),
+                "{no es json",
+                json.dumps({"identified": f"{p}2", "phoneNumber": "302"}),
+            ]
+        ),
+        encoding="utf-8",
+    )
+    citas = tmp_path / "citas.csv"
+    citas.write_text(
+        "identified,appointmentDate,ubicacion,state,details\n"
+        f"{p}1,2019-04-02 10:00,Taller,COMPLETADA,Cambio de aceite\n"
+        f"{p}2,2031-06-03 09:00,Taller,,\n"
+        f"{p}2,el martes,Taller,,\n",
+        encoding="utf-8",
+    )
+
+    # Un "no encontrado" en caché no sobrevive a la importación
+    db = SessionLocal()
+    try:
+        assert ClienteService.buscar_cliente(db, f"{p}4")["status"] == "not_found"
+    finally:
+        db.close()
+    try:
+        r_clientes = importar("clientes", clientes, lote=3, reportar=lambda _: None)
+        r_contactos = importar("contactos", contactos, reportar=lambda _: None)
+        r_citas = importar("citas", citas, reportar=lambda _: None)
+
+        db = SessionLocal()
+        try:
+            cargados = db.scalars(
+                select(Client.identified)
+                .where(Client.identified.startswith(p))
+                .order_by(Client.identified)
+            ).all()
+            n_contactos, n_citas = (
+                db.scalar(
+                    select(func.count())
+                    .select_from(modelo)
+                    .join(Client)
+                    .where(Client.identified.startswith(p))
+                )
+                for modelo in (ClientContact, AppointmentScheduling)
+            )
+            encontrado = ClienteService.buscar_cliente(db, f"{p}4")
+        finally:
+            db.close()
+    finally:
+        _borrar(p)
+
+    assert cargados == [f"{p}1", f"{p}2", f"{p}4"]
+    assert (r_clientes["importadas"], r_clientes["rechazadas"]) == (3, 3)
+    motivos = {e["linea"]: e["motivo"] for e in _leer_errores(r_clientes["errores"])}
+    assert motivos[4].startswith("fullName:")
+    assert "ya está registrado" in motivos[5]
+    assert motivos[6].startswith("base de datos:")
+    assert encontrado["status"] == "success"
+
+    assert (r_contactos["importadas"], n_contactos) == (1, 1)
+    motivos = [e["motivo"] for e in _leer_errores(r_contactos["errores"])]
+    assert "no existe el cliente" in motivos[0]
+    assert motivos[1].startswith("JSON inválido")
+    assert motivos[2].startswith("email:")
+
+    assert (r_citas["importadas"], n_citas) == (2, 2)
+    assert _leer_errores(r_citas["errores"])[0]["motivo"].startswith("appointmentDate")
+
+
+def test_importacion_limpia_no_deja_archivo_de_errores(tmp_path):
+    p = f"imp-{uuid.uuid4().hex[:8]}-"
+    archivo = tmp_path / "clientes.jsonl"
+    archivo.write_text(
+        "".join(
+            json.dumps({"fullName": "N", "fullSurname": "A", "identified": f"{p}{i}"})
+            + "\n"
+            for i in range(25)
+        ),
+        encoding="utf-8",
+    )
+    lotes = []
+    try:
+        resumen = importar("clientes", archivo, lote=10, reportar=lotes.append)
+    finally:
+        _borrar(p)
+
+    assert resumen["importadas"] == 25 and resumen["errores"] is None
+    assert not (tmp_path / "clientes.jsonl.errores.jsonl").exists()
+    assert len(lotes) == 4  # 3 lotes + resumen
+    assert "filas/s" in lotes[0]
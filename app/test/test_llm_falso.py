@@ -0,0 +1,40 @@
+import asyncio
+from openai import AsyncOpenAI
+from app.bench.llm_falso import Guion, ServidorLLM, llamadas_del_mensaje
+from app.chat.loop import ejecutar_turno
+
+
+def test_llamadas_del_mensaje():
+    mensaje = 'buscar_cliente {"identified": "1"}\nhola\ncrear_cita {"clientId": 2}'
+
+    assert llamadas_del_mensaje(mensaje) == [
+        ("buscar_cliente", {"identified": "1"}),
+        ("crear_cita", {"clientId": 2}),
+    ]
+    assert llamadas_del_mensaje("Hola, buenas tardes") == []
+
+
+def test_turno_completo_con_el_cliente_real():
+    llamadas = []
+
+    async def ejecutar(nombre, args):
+        llamadas.append((nombre, args))
+        return {"status": "success"}
+
+    tools = [
+        {
+            "type": "function",
+            "function": {"name": "buscar_cliente", "parameters": {"type": "object"}},
+        }
+    ]
+
+    with ServidorLLM(Guion(primer_token=0.01, respuesta="Cliente encontrado")) as llm:
+        client = AsyncOpenAI(api_key="prueba", base_url=llm.base_url)
+        historial = [{"role": "user", "content": 'buscar_cliente {"identified": "42"}'}]
+        resultado = asyncio.run(ejecutar_turno(client, historial, tools, ejecutar))
+
+        assert llm.completions == 2
+
+    assert llamadas == [("buscar_cliente", {"identified": "42"})]
+    assert resultado.respuesta.strip() == "Cliente encontrado"
+    assert resultado.pasos == 2
@@ -0,0 +1,122 @@
+import uuid
+from datetime import datetime
+from fastapi.testclient import TestClient
+from app.db.config import SessionLocal
+from app.db.unit_of_work import ejecutar_en_sesion_sync
+from app.models.modelos import Client
+from app.schemas.appointment import AppointmentCreate
+from app.schemas.client import ClientCreate
+from app.schemas.client_contact import ClientContactCreate
+from app.services.citas_service import AppointmentService
+from app.services.client_contact import ClientContactService
+from app.services.client_service import ClienteService
+from app.test.test_single_statement_writes import contar_sentencias
+
+MARTES = datetime(2033, 4, 5)
+
+
+def _cita(client_id: int, hora: int, **kw) -> AppointmentCreate:
+    return AppointmentCreate(
+        clientId=client_id,
+        appointmentDate=MARTES.replace(hour=hora),
+        ubicacion="Taller",
+        **kw,
+    )
+
+
+def test_lote_de_citas_un_insert_y_resultado_por_cita():
+    db = SessionLocal()
+    try:
+        data = ClientCreate(fullName="Flota", fullSurname="SAS", identified="lote-1")
+        cliente = ClienteService.registrar_cliente(db, data)["clientId"]
+        AppointmentService.crear_cita(db, _cita(cliente, 11))  # ya agendada
+
+        with contar_sentencias() as sentencias:
+            lote = AppointmentService.crear_citas_lote(
+                db,
+                [
+                    _cita(cliente, 9),
+                    _cita(cliente, 9, details="choca con la anterior"),
+                    _cita(cliente, 10),
+                    _cita(cliente, 11),
+                    _cita(999_999, 12),
+                ],
+            )
+    finally:
+        db.rollback()
+        db.close()
+
+    assert lote["status"] == "partial" and lote["creadas"] == 2
+    estados = [r["status"] for r in lote["resultados"]]
+    assert estados == ["success", "slot_taken", "success", "slot_taken", "error"]
+    assert "lote" in lote["resultados"][1]["message"]
+    assert lote["resultados"][3]["fecha"] == "2033-04-05 11:00"
+    # Las alternativas no ofrecen los slots que el propio lote acaba de ocupar
+    assert lote["resultados"][1]["alternativas"]["2033-04-05"][:2] == ["12:00", "13:00"]
+    assert len([s for s in sentencias if s.lstrip().startswith("INSERT")]) == 1
+
+
+def test_lote_de_contactos():
+    db = SessionLocal()
+    try:
+        data = ClientCreate(fullName="Flota", fullSurname="Dos", identified="lote-2")
+        cliente = ClienteService.registrar_cliente(db, data)["clientId"]
+        contactos = [
+            ClientContactCreate(clientId=cliente, phoneNumber="300", email="a@x.co"),
+            ClientContactCreate(clientId=999_999, phoneNumber="301", email="b@x.co"),
+            ClientContactCreate(clientId=cliente, phoneNumber="302", email="c@x.co"),
+        ]
+        with contar_sentencias() as sentencias:
+            lote = ClientContactService.crear_contactos_lote(db, contactos)
+        listados = ClientContactService.listar_contactos(db, cliente)["data"]
+    finally:
+        db.rollback()
+        db.close()
+
+    assert lote["status"] == "partial" and lote["creados"] == 2
+    assert [r["status"] for r in lote["resultados"]] == ["success", "error", "success"]
+    assert {c["id"] for c in listados} == {
+        lote["resultados"][0]["contactId"],
+        lote["resultados"][2]["contactId"],
+    }
+    assert len(sentencias) == 2  # verificar clientes + un INSERT
+
+
+def test_endpoint_rest_valida_cada_cita():
+    from app.main_api import app
+
+    identified = f"lote-{uuid.uuid4().hex[:8]}"
+    datos = ClientCreate(fullName="Flota", fullSurname="Tres", identified=identified)
+    cliente = ejecutar_en_sesion_sync(ClienteService.registrar_cliente, datos)
+    cliente = cliente["clientId"]
+    cuerpo = [
+        {
+            "clientId": cliente,
+            "appointmentDate": "2033-04-06 08:00:00",
+            "ubicacion": "T",
+        },
+        {
+            "clientId": cliente,
+            "appointmentDate": "2033-04-10 08:00:00",
+            "ubicacion": "T",
+        },
+    ]
+    try:
+        with TestClient(app) as client:
+            respuesta = client.post("/api/citas/lote", json=cuerpo).json()
+            invalida = client.post("/api/citas/lote", json=[{"clientId": cliente}])
+    finally:
+        db = SessionLocal()
+        try:
+            registro = db.get(Client, cliente)
+            for cita in registro.clientAppointment:
+                AppointmentService.eliminar_cita(db, cita.id)
+            db.delete(registro)
+            db.commit()
+        finally:
+            db.close()
+
+    assert respuesta["status"] == "partial"
+    assert respuesta["resultados"][0]["status"] == "success"
+    assert "domingos" in respuesta["resultados"][1]["message"]
+    assert invalida.status_code == 422
@@ -0,0 +1,131 @@
+import asyncio
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.chat.loop import ejecutar_turno
+from app.db.config import AsyncSessionLocal, async_engine
+from app.mcp.registry import ToolRegistry
+from app.observability import medir_turno
+from app.observability.metricas import (
+    LLAMADAS_HERRAMIENTA,
+    TOKENS_LLM,
+    Contador,
+    Histograma,
+)
+
+
+def test_formato_de_exposicion():
+    histograma = Histograma("latencia", "Latencia", ("ruta",), buckets=(0.1, 1))
+    histograma.observar(0.05, ruta="chat")
+    histograma.observar(0.1, ruta="chat")
+    histograma.observar(3, ruta="chat")
+    contador = Contador("errores_total", "Errores", ("detalle",))
+    contador.inc(detalle='dice "no"')
+    contador.inc(2, detalle='dice "no"')
+
+    assert histograma.lineas() == [
+        "# HELP latencia Latencia",
+        "# TYPE latencia histogram",
+        'latencia_bucket{ruta="chat",le="0.1"} 2',
+        'latencia_bucket{ruta="chat",le="1"} 2',
+        'latencia_bucket{ruta="chat",le="+Inf"} 3',
+        'latencia_sum{ruta="chat"} 3.15',
+        'latencia_count{ruta="chat"} 3',
+    ]
+    assert contador.lineas()[-1] == 'errores_total{detalle="dice \\"no\\""} 3'
+
+
+def test_turno_reparte_tiempo_por_componente():
+    registro = ToolRegistry()
+
+    @registro.tool("consultar", "Consulta la base")
+    async def consultar() -> dict:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT pg_sleep(0.05)"))
+        return {"status": "success"}
+
+    async def run():
+        try:
+            with medir_turno("prueba") as tiempos:
+                await registro.ejecutar("consultar", {})
+                await registro.ejecutar("inventada", {})
+            return tiempos
+        finally:
+            await async_engine.dispose()
+
+    tiempos = asyncio.run(run())
+
+    assert tiempos.db >= 0.05
+    assert tiempos.herramientas >= tiempos.db
+    assert tiempos.llm == 0
+    clave = ("consultar", "success")
+    assert LLAMADAS_HERRAMIENTA.valores[clave] == 1
+    assert LLAMADAS_HERRAMIENTA.valores[("desconocida", "error")] >= 1
+
+
+class _Stream:
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        pass
+
+
+def test_tokens_desde_usage():
+    delta = SimpleNamespace(content="Hola", tool_calls=None)
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None),
+        SimpleNamespace(
+            choices=[], usage=SimpleNamespace(prompt_tokens=50, completion_tokens=2)
+        ),
+    ]
+
+    async def create(**kwargs):
+        await asyncio.sleep(0.01)
+        return _Stream(chunks)
+
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+    async def ejecutar(nombre, args):
+        return {}
+
+    async def run():
+        with medir_turno("prueba") as tiempos:
+            await ejecutar_turno(client, [], [], ejecutar)
+        return tiempos
+
+    entrada = TOKENS_LLM.valores.get(("entrada",), 0)
+    salida = TOKENS_LLM.valores.get(("salida",), 0)
+    tiempos = asyncio.run(run())
+
+    assert TOKENS_LLM.valores[("entrada",)] == entrada + 50
+    assert TOKENS_LLM.valores[("salida",)] == salida + 2
+    assert tiempos.llm >= 0.01
+
+
+def test_endpoint_metrics():
+    from app.main_api import app
+
+    with medir_turno("chat"):
+        pass
+    with TestClient(app) as client:
+        respuesta = client.get("/metrics")
+    cuerpo = respuesta.text
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'taller_chat_duracion_segundos_count{ruta="chat",componente="db"}' in cuerpo
+    assert "taller_conversaciones " in cuerpo
+    assert 'taller_pool_conexiones{pool="async",estado="en_uso"}' in cuerpo
+    assert 'taller_pool_checkouts_total{pool="async"}' in cuerpo
@@ -0,0 +1,80 @@
+from sqlalchemy import text
+from app.db.config import Base, engine
+from app.db.migrations import (
+    INDICES_CONSULTAS,
+    MIGRACIONES,
+    Migracion,
+    _ejecutar,
+    aplicar,
+    pendientes,
+)
+
+
+def test_aplicar_es_idempotente():
+    aplicar()
+    assert pendientes() == []
+    assert aplicar() == []
+
+
+def test_indices_existen():
+    aplicar()
+    with engine.connect() as conn:
+        nombres = set(
+            conn.execute(
+                text("SELECT indexname FROM pg_indexes WHERE schemaname = 'public'")
+            ).scalars()
+        )
+
+    assert {
+        "ix_client_activos_id",
+        "ix_cita_cliente_fecha",
+        "ix_cita_fecha",
+        "ix_contacto_cliente",
+    } <= nombres
+
+
+def test_modelos_declaran_los_indices_de_la_migracion():
+    declarados = {
+        indice.name
+        for tabla in Base.metadata.tables.values()
+        for indice in tabla.indexes
+    }
+    for sentencia in INDICES_CONSULTAS:
+        nombre = sentencia.split("IF NOT EXISTS ")[1].split()[0]
+        assert nombre in declarados
+
+    ids = [m.id for m in MIGRACIONES]
+    assert ids == sorted(ids)
+
+
+def test_indice_invalido_se_reconstruye():
+    crear = "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_prueba_invalido ON prueba_indices (v)"
+    migracion = Migracion(
+        "9999_prueba", "Índice de prueba", (crear,), transaccional=False
+    )
+    valido = text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = 'ix_prueba_invalido'"
+    )
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.execute(text("DROP TABLE IF EXISTS prueba_indices"))
+        conn.execute(text("CREATE TABLE prueba_indices (v int)"))
+        conn.execute(text("INSERT INTO prueba_indices VALUES (1), (1)"))
+        try:
+            # Un build concurrente fallido deja el índice creado pero INVALID
+            try:
+                conn.execute(
+                    text(
+                        "CREATE UNIQUE INDEX CONCURRENTLY ix_prueba_invalido "
+                        "ON prueba_indices (v)"
+                    )
+                )
+            except Exception:
+                pass
+            assert conn.execute(valido).scalar() is False
+
+            _ejecutar(conn, migracion)
+            assert conn.execute(valido).scalar() is True
+        finally:
+            conn.execute(text("DROP TABLE prueba_indices"))
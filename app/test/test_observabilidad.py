@@ -0,0 +1,178 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import text
+from app.chat.loop import ejecutar_turno
+from app.db.config import SessionLocal
+from app.mcp.registry import ToolRegistry
+from app.observability import (
+    ExportadorJSONL,
+    ExportadorMemoria,
+    anotar,
+    configurar,
+    registrar,
+    restaurar,
+    span,
+    vaciar,
+)
+
+
+@pytest.fixture
+def spans():
+    """Registra todas las trazas en memoria durante la prueba."""
+    exportador = ExportadorMemoria()
+    anterior = configurar(exportador, muestreo=1.0)
+    yield exportador.spans
+    restaurar(anterior)
+
+
+def _por_nombre(spans, nombre):
+    return [s for s in spans if s["nombre"] == nombre]
+
+
+def test_spans_anidados_comparten_traza(spans):
+    with span("chat", conversacion="c1"):
+        with span("herramienta", herramienta="buscar_cliente"):
+            anotar(status="success")
+    vaciar()
+
+    (chat,) = _por_nombre(spans, "chat")
+    (herramienta,) = _por_nombre(spans, "herramienta")
+    assert chat["padre"] is None
+    assert herramienta["traza"] == chat["traza"]
+    assert herramienta["padre"] == chat["span"]
+    assert herramienta["atributos"] == {
+        "herramienta": "buscar_cliente",
+        "status": "success",
+    }
+    assert chat["duracion_ms"] >= herramienta["duracion_ms"]
+
+
+def test_error_queda_en_el_span(spans):
+    with pytest.raises(ValueError):
+        with span("chat"):
+            raise ValueError("fallo")
+    vaciar()
+
+    assert spans[0]["error"] == "ValueError: fallo"
+
+
+def test_sin_muestreo_no_exporta():
+    exportador = ExportadorMemoria()
+    anterior = configurar(exportador, muestreo=0.0)
+    try:
+        with span("chat") as raiz:
+            with span("herramienta") as hijo:
+                registrar("db.consulta", 0.01)
+        vaciar()
+    finally:
+        restaurar(anterior)
+
+    assert raiz is None and hijo is None
+    assert exportador.spans == []
+
+
+def test_registrar_fuera_de_traza_no_inicia_una(spans):
+    registrar("db.checkout", 0.002)
+    vaciar()
+
+    assert spans == []
+
+
+def test_consultas_db_dentro_de_la_traza(spans):
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))  # fuera de la traza: no se registra
+        with span("chat"):
+            db.execute(text("SELECT 2"))
+    finally:
+        db.close()
+    vaciar()
+
+    (chat,) = _por_nombre(spans, "chat")
+    consultas = _por_nombre(spans, "db.consulta")
+    assert [c["atributos"]["sql"] for c in consultas] == ["SELECT 2"]
+    assert consultas[0]["padre"] == chat["span"]
+
+
+def test_herramienta_del_registro(spans):
+    registro = ToolRegistry()
+
+    @registro.tool("eco", "Devuelve el texto")
+    async def eco(texto: str) -> dict:
+        return {"status": "success", "texto": texto}
+
+    asyncio.run(registro.ejecutar("eco", {"texto": "hola"}))
+    vaciar()
+
+    (herramienta,) = _por_nombre(spans, "herramienta")
+    assert herramienta["atributos"] == {"herramienta": "eco", "status": "success"}
+
+
+class _Stream:
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        pass
+
+
+def test_llamada_llm_con_tokens(spans):
+    delta = SimpleNamespace(content="Hola", tool_calls=None)
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None),
+        SimpleNamespace(
+            choices=[],
+            usage=SimpleNamespace(prompt_tokens=120, completion_tokens=3),
+        ),
+    ]
+
+    async def create(**kwargs):
+        return _Stream(chunks)
+
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+    async def ejecutar(nombre, args):
+        return {}
+
+    async def run():
+        with span("chat"):
+            return await ejecutar_turno(client, [], [], ejecutar)
+
+    resultado = asyncio.run(run())
+    vaciar()
+
+    assert resultado.respuesta == "Hola"
+    (llm,) = _por_nombre(spans, "llm")
+    assert llm["atributos"]["tokens_entrada"] == 120
+    assert llm["atributos"]["tokens_salida"] == 3
+    assert llm["atributos"]["primer_token_ms"] >= 0
+    assert llm["traza"] == _por_nombre(spans, "chat")[0]["traza"]
+
+
+def test_exportador_jsonl(tmp_path):
+    ruta = tmp_path / "trazas.jsonl"
+    anterior = configurar(ExportadorJSONL(str(ruta)), muestreo=1.0)
+    try:
+        with span("chat", conversacion="ñandú"):
+            with span("herramienta"):
+                pass
+        vaciar()
+    finally:
+        restaurar(anterior)
+
+    lineas = [json.loads(l) for l in ruta.read_text(encoding="utf-8").splitlines()]
+    assert [l["nombre"] for l in lineas] == ["herramienta", "chat"]
+    assert lineas[1]["atributos"]["conversacion"] == "ñandú"
@@ -0,0 +1,70 @@
+import asyncio
+from app.db.config import SessionLocal, async_engine, AsyncSessionLocal
+from app.mcp.agent import MAX_PAGINA_HERRAMIENTA, _listar_clientes_logic
+from app.schemas.client import ClientCreate
+from app.services.citas_service import AppointmentService
+from app.services.client_service import AsyncClienteService, ClienteService
+
+
+def _sembrar(db, n: int):
+    for i in range(n):
+        data = ClientCreate(fullName="Pag", fullSurname=str(i), identified=f"pag-{i}")
+        ClienteService.registrar_cliente(db, data)
+
+
+def test_recorre_todas_las_paginas_con_cursor():
+    db = SessionLocal()
+    try:
+        _sembrar(db, 25)
+        ids, cursor = [], None
+        while True:
+            pagina = ClienteService.listar_clientes(db, cursor=cursor, limite=7)
+            ids += [c["id"] for c in pagina["data"]]
+            cursor = pagina["siguiente_cursor"]
+            if cursor is None:
+                break
+        exportados = [c["id"] for c in ClienteService.exportar_clientes(db, lote=4)]
+    finally:
+        db.rollback()
+        db.close()
+
+    assert ids == sorted(set(ids))
+    assert ids == exportados
+    assert len(ids) >= 25
+
+
+def test_listado_solo_columnas_del_listado():
+    db = SessionLocal()
+    try:
+        _sembrar(db, 1)
+        pagina = ClienteService.listar_clientes(db, limite=1)
+        citas = AppointmentService.listar_citas(db, limite=5)
+    finally:
+        db.rollback()
+        db.close()
+
+    assert set(pagina["data"][0]) == {
+        "id",
+        "fullName",
+        "fullSurname",
+        "identified",
+        "createdAt",
+    }
+    assert citas["status"] == "success"
+
+
+def test_herramienta_respeta_el_tope():
+    resultado = _listar_clientes_logic(limite=10_000)
+    assert len(resultado.get("data", [])) <= MAX_PAGINA_HERRAMIENTA
+
+
+def test_exportacion_async_en_streaming():
+    async def exportar():
+        try:
+            async with AsyncSessionLocal() as db:
+                return [c async for c in AsyncClienteService.exportar_clientes(db, 2)]
+        finally:
+            await async_engine.dispose()
+
+    filas = asyncio.run(exportar())
+    assert [f["id"] for f in filas] == sorted(f["id"] for f in filas)
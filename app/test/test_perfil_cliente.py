@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from app.core.fechas import ahora_colombia
+from app.db.config import SessionLocal
+from app.models.modelos import AppointmentState
+from app.schemas.appointment import AppointmentCreate
+from app.schemas.client import ClientCreate
+from app.schemas.client_contact import ClientContactCreate
+from app.services.citas_service import AppointmentService
+from app.services.client_contact import ClientContactService
+from app.services.client_service import ClienteService
+from app.test.test_single_statement_writes import contar_sentencias
+
+
+def _cita(client_id: int, fecha: datetime, **kw) -> AppointmentCreate:
+    return AppointmentCreate(
+        clientId=client_id, appointmentDate=fecha, ubicacion="Taller", **kw
+    )
+
+
+def test_perfil_en_dos_consultas():
+    pronto = ahora_colombia().replace(second=0, microsecond=0) + timedelta(hours=2)
+    db = SessionLocal()
+    try:
+        data = ClientCreate(fullName="Eva", fullSurname="Mora", identified="perfil-1")
+        client_id = ClienteService.registrar_cliente(db, data)["clientId"]
+        for telefono in ("3001112233", "3004445566"):
+            ClientContactService.crear_contacto(
+                db,
+                ClientContactCreate(
+                    clientId=client_id, phoneNumber=telefono, email="eva@x.co"
+                ),
+            )
+        for fecha, kw in [
+            (datetime(2031, 5, 8, 10), {"details": "Mazda 3 2019"}),
+            (datetime(2031, 5, 6, 9), {}),
+            (datetime(2031, 5, 7, 9), {"state": AppointmentState.CANCELADA}),
+            (datetime(2020, 5, 5, 9), {}),  # pasada
+            # Dentro de unas horas (Bogotá): en un host UTC quedaba por fuera
+            (pronto, {}),
+        ]:
+            AppointmentService.crear_cita(db, _cita(client_id, fecha, **kw))
+        db.flush()
+
+        with contar_sentencias() as sentencias:
+            perfil = ClienteService.perfil_cliente(db, "perfil-1")
+            recortado = ClienteService.perfil_cliente(db, "perfil-1", max_citas=1)
+        inexistente = ClienteService.perfil_cliente(db, "perfil-no-existe")
+    finally:
+        db.rollback()
+        db.close()
+
+    assert len(sentencias) == 4  # cliente + contactos, citas con LIMIT
+    datos = perfil["data"]
+    assert datos["nombre"] == "Eva Mora"
+    assert datos["contactos"] == [
+        {"telefono": "3001112233", "email": "eva@x.co"},
+        {"telefono": "3004445566", "email": "eva@x.co"},
+    ]
+    assert [c["fecha"] for c in datos["proximas_citas"]] == [
+        f"{pronto:%Y-%m-%d %H:%M}",
+        "2031-05-06 09:00",
+        "2031-05-08 10:00",
+    ]
+    assert datos["proximas_citas"][2]["details"] == "Mazda 3 2019"
+    assert "citas_sin_listar" not in datos
+    assert len(recortado["data"]["proximas_citas"]) == 1
+    assert recortado["data"]["citas_sin_listar"] == 2
+    assert inexistente["status"] == "not_found"
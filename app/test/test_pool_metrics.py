@@ -0,0 +1,57 @@
+import asyncio
+from sqlalchemy import text
+from app.db.config import (
+    AsyncSessionLocal,
+    SessionLocal,
+    async_engine,
+    engine,
+    estado_pools,
+    metricas_pool,
+)
+from app.db.connect import settings
+
+
+def test_engine_configurado_desde_settings():
+    assert engine.echo == settings.DB_ECHO
+    assert engine.pool.size() == settings.DB_POOL_SIZE
+    assert async_engine.pool.size() == settings.DB_POOL_SIZE
+
+
+def test_checkout_registra_metricas():
+    antes = metricas_pool.checkouts
+    en_uso = estado_pools()["sync"]["en_uso"]
+
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+
+    estado = estado_pools()["sync"]
+    assert metricas_pool.checkouts == antes + 1
+    assert estado["espera_max_ms"] >= 0
+    assert estado["en_uso"] == en_uso
+
+
+def test_statement_timeout_en_ambos_motores():
+    esperado = settings.DB_STATEMENT_TIMEOUT_MS
+
+    db = SessionLocal()
+    try:
+        sync_valor = db.execute(text("SHOW statement_timeout")).scalar()
+    finally:
+        db.close()
+
+    async def consultar():
+        async with AsyncSessionLocal() as adb:
+            valor = (await adb.execute(text("SHOW statement_timeout"))).scalar()
+        await async_engine.dispose()
+        return valor
+
+    async_valor = asyncio.run(consultar())
+
+    if esperado:
+        assert sync_valor == async_valor != "0"
+    else:
+        assert sync_valor == async_valor == "0"
+    assert estado_pools()["async"]["checkouts"] >= 1
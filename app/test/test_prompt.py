@@ -0,0 +1,21 @@
+from datetime import datetime
+from app.chat.prompt import PROMPT_ESTATICO, TZ_COLOMBIA, mensajes_sistema
+from app.services.disponibilidad import Horario
+
+
+def test_prefijo_estatico_y_fecha_por_minuto():
+    t1 = TZ_COLOMBIA.localize(datetime(2025, 12, 1, 15, 4, 10))
+    t2 = TZ_COLOMBIA.localize(datetime(2025, 12, 1, 15, 4, 50))
+    t3 = TZ_COLOMBIA.localize(datetime(2025, 12, 1, 15, 5, 0))
+
+    a, b, c = mensajes_sistema(t1), mensajes_sistema(t2), mensajes_sistema(t3)
+
+    assert a[0] is PROMPT_ESTATICO and c[0] is PROMPT_ESTATICO
+    assert a[1] is b[1]  # mismo minuto: no se vuelve a renderizar
+    assert "lunes 01 de diciembre de 2025" in a[1]["content"]
+    assert "15:04" in a[1]["content"] and "15:05" in c[1]["content"]
+
+
+def test_horario_del_prompt_sale_de_settings():
+    for linea in Horario.desde_settings().describir():
+        assert f"- {linea}\n" in PROMPT_ESTATICO["content"]
@@ -0,0 +1,42 @@
+import asyncio
+from app.mcp.agent import get_agent, herramientas
+from app.mcp.registry import ToolRegistry
+
+registro = ToolRegistry()
+
+
+@registro.tool("sumar", "Suma dos números")
+async def sumar(a: int, b: int = 1, nota: str | None = None) -> dict:
+    return {"status": "success", "total": a + b, "nota": nota}
+
+
+def test_schema_desde_firma():
+    (tool,) = registro.openai_tools()
+    parametros = tool["function"]["parameters"]
+
+    assert tool["function"]["name"] == "sumar"
+    assert parametros["required"] == ["a"]
+    assert parametros["properties"]["a"] == {"type": "integer"}
+    assert parametros["properties"]["nota"] == {"type": "string"}
+
+
+def test_valida_y_convierte_argumentos():
+    resultado = asyncio.run(registro.ejecutar("sumar", {"a": "2", "extra": True}))
+    assert resultado["total"] == 3
+
+    error = asyncio.run(registro.ejecutar("sumar", {"a": "dos"}))
+    assert error["status"] == "error"
+    assert "a:" in error["message"]
+
+
+def test_herramienta_desconocida():
+    resultado = asyncio.run(registro.ejecutar("restar", {}))
+    assert resultado["status"] == "error"
+
+
+def test_mcp_y_openai_comparten_herramientas():
+    nombres_openai = [t["function"]["name"] for t in herramientas.openai_tools()]
+    nombres_mcp = list(asyncio.run(get_agent().get_tools()))
+
+    assert nombres_openai == herramientas.nombres()
+    assert sorted(nombres_mcp) == sorted(nombres_openai)
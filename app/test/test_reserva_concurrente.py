@@ -0,0 +1,102 @@
+import asyncio
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import func, select
+from app.db.config import async_engine, engine
+from app.db.connect import settings
+from app.db.unit_of_work import ejecutar_en_sesion_sync
+from app.mcp.agent import _crear_cita_logic_async
+from app.schemas.appointment import AppointmentCreate
+from app.services.citas_service import AppointmentService
+from app.services.disponibilidad import clave_slot, get_motor
+
+RESERVAS = 12
+
+
+def _reservar(fecha: datetime, employedId: int | None = None) -> dict:
+    cita = AppointmentCreate(
+        clientId=1, appointmentDate=fecha, ubicacion="Taller", employedId=employedId
+    )
+    return ejecutar_en_sesion_sync(AppointmentService.crear_cita, cita)
+
+
+def _eliminar(resultados: list[dict]):
+    for r in resultados:
+        if r["status"] == "success":
+            ejecutar_en_sesion_sync(
+                AppointmentService.eliminar_cita, r["appointmentId"]
+            )
+
+
+def test_reservas_paralelas_un_solo_ganador():
+    fecha = datetime(2031, 6, 3, 10, 0)
+    with ThreadPoolExecutor(RESERVAS) as pool:
+        resultados = list(pool.map(lambda _: _reservar(fecha), range(RESERVAS)))
+    _eliminar(resultados)
+
+    estados = sorted(r["status"] for r in resultados)
+    assert estados == ["slot_taken"] * (RESERVAS - 1) + ["success"]
+    perdedor = next(r for r in resultados if r["status"] == "slot_taken")
+    assert perdedor["fecha"] == "2031-06-03 10:00"
+    assert "10:00" not in perdedor["alternativas"].get("2031-06-03", [])
+
+
+def test_reservas_paralelas_por_herramienta_async():
+    async def todas():
+        try:
+            return await asyncio.gather(
+                *(
+                    _crear_cita_logic_async(1, "2031-06-04 15:30:00", "Taller")
+                    for _ in range(RESERVAS)
+                )
+            )
+        finally:
+            await async_engine.dispose()
+
+    resultados = asyncio.run(todas())
+    _eliminar(resultados)
+
+    assert [r["status"] for r in resultados].count("success") == 1
+
+
+def test_capacidad_por_slot_y_por_empleado_bajo_concurrencia():
+    motor = get_motor()
+    original = motor.horario
+    motor.horario = dataclasses.replace(original, capacidad=3, capacidad_empleado=1)
+    fecha = datetime(2031, 6, 5, 9, 0)
+    empleados = [7, 7, 7, 8, 8, 9, 9, 9]
+    resultados = []
+    try:
+        with ThreadPoolExecutor(len(empleados)) as pool:
+            resultados = list(pool.map(lambda e: _reservar(fecha, e), empleados))
+    finally:
+        motor.horario = original
+        _eliminar(resultados)
+
+    ganadores = sorted(
+        e for e, r in zip(empleados, resultados) if r["status"] == "success"
+    )
+    assert ganadores == [7, 8, 9]
+
+
+def test_lock_retenido_responde_slot_taken_sin_abortar():
+    fecha = datetime(2031, 6, 6, 11, 0)
+    original = settings.SLOT_LOCK_TIMEOUT_MS
+    settings.SLOT_LOCK_TIMEOUT_MS = 100
+    libre = None
+    try:
+        # Otra transacción (p. ej. un turno de /chat en curso) retiene el slot
+        with engine.connect() as otra, otra.begin():
+            otra.execute(select(func.pg_advisory_xact_lock(*clave_slot(fecha))))
+            bloqueada = _reservar(fecha)
+        libre = _reservar(fecha)
+    finally:
+        settings.SLOT_LOCK_TIMEOUT_MS = original
+        if libre is not None:
+            _eliminar([libre])
+
+    assert bloqueada["status"] == "slot_taken"
+    assert bloqueada["fecha"] == "2031-06-06 11:00"
+    assert bloqueada["alternativas"]  # la transacción sigue usable
+    assert libre is not None and libre["status"] == "success"
@@ -0,0 +1,18 @@
+import json
+from datetime import datetime
+from app.core.serializacion import a_json
+
+
+def test_salida_compacta_utf8_y_fechas_como_texto():
+    datos = {"fecha": datetime(2030, 3, 5, 10, 0), "nombre": "Muñoz", "ids": [1, 2]}
+
+    assert a_json(datos) == (
+        '{"fecha":"2030-03-05 10:00:00","nombre":"Muñoz","ids":[1,2]}'
+    )
+
+
+def test_misma_salida_que_json_estandar():
+    datos = {"status": "success", "data": {"id": 1, "details": None, "ok": True}}
+    estandar = json.dumps(datos, ensure_ascii=False, separators=(",", ":"))
+
+    assert a_json(datos) == estandar
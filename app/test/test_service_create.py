@@ -28,5 +28,5 @@ def test_crear_cita():
 
     resp = AppointmentService.crear_cita(db, data)
 
-    assert "success" in resp
+    assert resp["status"] == "success"
     assert "appointmentId" in resp
@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import event
+from app.db.config import SessionLocal, engine
+from app.schemas.appointment import AppointmentCreate
+from app.schemas.client import ClientCreate
+from app.schemas.client_contact import ClientContactCreate
+from app.services.citas_service import AppointmentService
+from app.services.client_contact import ClientContactService
+from app.services.client_service import ClienteService
+
+
+@contextmanager
+def contar_sentencias():
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+
+def test_registrar_cliente_una_sentencia():
+    db = SessionLocal()
+    try:
+        data = ClientCreate(fullName="Sol", fullSurname="Vega", identified="ins-1")
+        with contar_sentencias() as sentencias:
+            nuevo = ClienteService.registrar_cliente(db, data)
+            repetido = ClienteService.registrar_cliente(db, data)
+    finally:
+        db.rollback()
+        db.close()
+
+    assert nuevo["status"] == "success"
+    assert repetido["status"] == "exists"
+    assert len(sentencias) == 2
+    assert all("ON CONFLICT" in s for s in sentencias)
+
+
+def test_crear_cita_y_contacto_sin_select_previo():
+    db = SessionLocal()
+    try:
+        fecha = datetime(2030, 3, 5, 15, 0)
+        cita = AppointmentCreate(
+            clientId=1, appointmentDate=fecha, ubicacion="Taller Central"
+        )
+        contacto = ClientContactCreate(clientId=1, phoneNumber="1", email="a@b.co")
+        with contar_sentencias() as sentencias:
+            resp_cita = AppointmentService.crear_cita(db, cita)
+            resp_contacto = ClientContactService.crear_contacto(db, contacto)
+    finally:
+        db.rollback()
+        db.close()
+
+    assert resp_cita["status"] == "success"
+    assert resp_contacto["status"] == "success"
+    # Cita: lock del slot (en su SAVEPOINT) + INSERT condicional; contacto: un INSERT
+    assert len(sentencias) == 5
+    assert sentencias[0].startswith("SAVEPOINT") and sentencias[2].startswith("RELEASE")
+    assert "pg_advisory_xact_lock" in sentencias[1]
+    assert all(s.lstrip().upper().startswith("INSERT") for s in sentencias[3:])
+
+
+def test_cliente_inexistente_por_fk():
+    db = SessionLocal()
+    try:
+        cita = AppointmentCreate(
+            clientId=999_999, appointmentDate=datetime.now(), ubicacion="Taller"
+        )
+        resp = AppointmentService.crear_cita(db, cita)
+    finally:
+        db.rollback()
+        db.close()
+
+    assert resp == {"status": "error", "message": "El cliente no existe"}
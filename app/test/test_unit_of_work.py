@@ -0,0 +1,99 @@
+import asyncio
+import uuid
+from app.db.config import async_engine, metricas_pool_async
+from app.db.unit_of_work import confirmar_ronda, unidad_de_trabajo
+from app.mcp.agent import (
+    _buscar_cliente_logic_async,
+    _crear_cliente_logic_async,
+    _crear_contacto_logic_async,
+)
+
+
+def _identificacion() -> str:
+    return f"uow-{uuid.uuid4().hex[:12]}"
+
+
+def _run(corutina):
+    async def envolver():
+        try:
+            return await corutina
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(envolver())
+
+
+def test_herramientas_comparten_sesion_y_commit():
+    identified = _identificacion()
+
+    async def turno():
+        antes = metricas_pool_async.checkouts
+        async with unidad_de_trabajo() as uow:
+            creado = await _crear_cliente_logic_async("Ana", "Ruiz", identified)
+            encontrados = await asyncio.gather(
+                _buscar_cliente_logic_async(identified),
+                _buscar_cliente_logic_async(identified),
+            )
+        return creado, encontrados, uow, metricas_pool_async.checkouts - antes
+
+    creado, encontrados, uow, checkouts = _run(turno())
+
+    assert creado["status"] == "success"
+    assert all(r["status"] == "success" for r in encontrados)
+    assert uow.operaciones == 3
+    assert checkouts == 1
+    # Confirmado al cerrar la unidad de trabajo
+    assert _run(_buscar_cliente_logic_async(identified))["status"] == "success"
+
+
+def test_error_de_herramienta_solo_revierte_su_savepoint():
+    identified = _identificacion()
+
+    async def turno():
+        async with unidad_de_trabajo() as uow:
+            creado = await _crear_cliente_logic_async("Luis", "Mora", identified)
+            contacto = await _crear_contacto_logic_async(
+                999_999, "3000000000", "x@example.com"
+            )
+        return creado, contacto, uow
+
+    creado, contacto, uow = _run(turno())
+
+    assert contacto["status"] == "error"
+    assert uow.revertidas == 1
+    assert _run(_buscar_cliente_logic_async(identified))["status"] == "success"
+
+
+def test_fallo_del_turno_revierte_todo():
+    identified = _identificacion()
+
+    async def turno():
+        try:
+            async with unidad_de_trabajo():
+                await _crear_cliente_logic_async("Eva", "Soto", identified)
+                raise RuntimeError("fallo del LLM")
+        except RuntimeError:
+            pass
+
+    _run(turno())
+
+    assert _run(_buscar_cliente_logic_async(identified))["status"] == "not_found"
+
+
+def test_confirmar_ronda_sobrevive_al_fallo_posterior():
+    confirmado, revertido = _identificacion(), _identificacion()
+
+    async def turno():
+        try:
+            async with unidad_de_trabajo():
+                await _crear_cliente_logic_async("Ivan", "Paz", confirmado)
+                await confirmar_ronda()
+                await _crear_cliente_logic_async("Ines", "Paz", revertido)
+                raise RuntimeError("fallo del LLM")
+        except RuntimeError:
+            pass
+
+    _run(turno())
+
+    assert _run(_buscar_cliente_logic_async(confirmado))["status"] == "success"
+    assert _run(_buscar_cliente_logic_async(revertido))["status"] == "not_found"